@@ -0,0 +1,70 @@
+"""Bandwidth budget shared by all media downloads."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from usdb_syncer.cancellation import CancellationToken
+    from usdb_syncer.settings import YtdlpRateLimit
+
+# seconds of unused bandwidth that may be used at once after a quiet period
+BURST_SECS = 1.0
+
+
+class BandwidthBudget:
+    """Thread-safe token bucket capping the combined rate of all downloads.
+
+    Bytes are granted in order of arrival, so concurrent downloads get a fair share
+    of the total, while a single download may use all of it. The total can be changed
+    at any time and also applies to running downloads.
+    """
+
+    def __init__(self, rate: float | None = None) -> None:
+        self._lock = threading.Lock()
+        # bytes per second, or None for no limit
+        self._rate = rate
+        # time when all bytes granted so far have been used up at the current rate
+        self._next_slot = 0.0
+
+    @property
+    def rate(self) -> float | None:
+        return self._rate
+
+    def set_rate(self, rate: float | None) -> None:
+        with self._lock:
+            self._rate = rate
+            # bytes granted at the old rate do not delay others at the new one
+            self._next_slot = min(self._next_slot, time.monotonic())
+
+    def consume(self, nbytes: int, token: CancellationToken | None = None) -> None:
+        """Wait until `nbytes` more bytes may be transferred within the rate."""
+        with self._lock:
+            if not self._rate:
+                return
+            now = time.monotonic()
+            start = max(self._next_slot, now - BURST_SECS)
+            self._next_slot = start + nbytes / self._rate
+            delay = self._next_slot - now
+        if delay <= 0:
+            return
+        if token:
+            token.sleep(delay)
+        else:
+            time.sleep(delay)
+
+
+# A global, as the budget is shared by all downloads in the process.
+_budget = BandwidthBudget()
+
+
+def set_total_rate(limit: YtdlpRateLimit) -> None:
+    """Update the combined rate limit for all downloads."""
+    _budget.set_rate(limit.value)
+
+
+def consume(nbytes: int, token: CancellationToken | None = None) -> None:
+    """Wait until `nbytes` more bytes may be downloaded within the global budget."""
+    _budget.consume(nbytes, token)
@@ -0,0 +1,84 @@
+"""Cooperative pausing and aborting of long-running work."""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+from typing import TYPE_CHECKING
+
+from usdb_syncer import errors
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+class CancellationToken:
+    """Pause and abort state shared between a task and the threads doing its work.
+
+    Waiting threads are woken up as soon as the state changes, without polling.
+    Callbacks registered with `on_abort()` are run when the token is aborted, e.g.
+    to kill subprocesses.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._paused = False
+        self._aborted = False
+        self._callbacks: list[Callable[[], object]] = []
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @property
+    def aborted(self) -> bool:
+        return self._aborted
+
+    def set_paused(self, paused: bool) -> None:
+        with self._cond:
+            self._paused = paused
+            self._cond.notify_all()
+
+    def abort(self) -> None:
+        with self._cond:
+            if self._aborted:
+                return
+            self._aborted = True
+            callbacks = list(self._callbacks)
+            self._cond.notify_all()
+        for callback in callbacks:
+            callback()
+
+    def raise_if_aborted(self) -> None:
+        if self._aborted:
+            raise errors.AbortError
+
+    def sleep(self, secs: float) -> None:
+        """Sleep for `secs`, but raise AbortError as soon as aborted."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._aborted, secs)
+        self.raise_if_aborted()
+
+    def check(self) -> None:
+        """Block while paused, and raise AbortError if aborted."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._aborted or not self._paused)
+        self.raise_if_aborted()
+
+    @contextlib.contextmanager
+    def on_abort(self, callback: Callable[[], object]) -> Iterator[None]:
+        """Run `callback` if the token is aborted while in this context.
+
+        If it has already been aborted, the callback is run immediately.
+        """
+        with self._cond:
+            if not (aborted := self._aborted):
+                self._callbacks.append(callback)
+        if aborted:
+            callback()
+        try:
+            yield
+        finally:
+            with self._cond:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
@@ -11,6 +11,8 @@ from usdb_syncer import db
 class CustomData:
     """Dict of custom data."""
 
+    __slots__ = ("_data",)
+
     _data: dict[str, str]
     _options: ClassVar[defaultdict[str, builtins.set[str]] | None] = None
     FORBIDDEN_CHARACTERS = '?"<>|*.:/\\'
@@ -10,10 +10,9 @@ import threading
 import time
 from collections import defaultdict
 from enum import StrEnum, auto
-from typing import TYPE_CHECKING, Any, assert_never, cast
+from typing import TYPE_CHECKING, Any, assert_never
 
 import attrs
-from more_itertools import batched
 
 from usdb_syncer import SongId, SyncMetaId, errors
 from usdb_syncer.logger import logger
@@ -25,16 +24,8 @@ if TYPE_CHECKING:
     from pathlib import Path
 
 
-SCHEMA_VERSION = 10
-
-# https://www.sqlite.org/limits.html
-_SQL_VARIABLES_LIMIT = 32766
-
-# 1000 is the maximum expression tree depth. Since
-# an sqlite update could change this without us
-# noticing quickly, we're leaving some space.
-# Performance impact is negligible.
-_SQL_SMALLER_THAN_EXPRESSION_TREE = 980
+SCHEMA_VERSION = 14
+AUDIO_ONLY_VERDICT_MAX_AGE_SECS = 30 * 24 * 60 * 60
 
 _STATUS_COLUMN = """coalesce(
     session_usdb_song.status,
@@ -47,6 +38,31 @@ _STATUS_COLUMN = """coalesce(
 )"""
 
 
+@attrs.frozen
+class ConnectionTuning:
+    """Performance settings applied to new connections."""
+
+    # page cache per connection
+    cache_size_kib: int = 16 * 1024
+    # each connection maps the database separately; 0 disables memory-mapped I/O
+    mmap_size: int = 32 * 1024**2
+    # keep temporary tables and indices, e.g. for sorting, in memory
+    temp_store_memory: bool = True
+    # prepared statements kept per connection
+    statement_cache_size: int = 256
+
+    def apply(self, connection: sqlite3.Connection) -> None:
+        connection.execute(f"PRAGMA cache_size = {-self.cache_size_kib}")
+        connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        connection.execute(
+            f"PRAGMA temp_store = {'MEMORY' if self.temp_store_memory else 'DEFAULT'}"
+        )
+        if connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # in WAL mode, this is still safe from corruption and only loses the
+            # latest commits on power loss
+            connection.execute("PRAGMA synchronous = NORMAL")
+
+
 class _LocalConnection(threading.local):
     """A thread-local database connection."""
 
@@ -59,18 +75,24 @@ class _DbState:
     _local: _LocalConnection = _LocalConnection()
     in_transaction: bool = False
     trace_sql: bool = False
+    tuning: ConnectionTuning = ConnectionTuning()
 
     @classmethod
     def connect(cls, db_path: Path | str) -> None:
         if cls._local.connection:
             raise errors.AlreadyConnectedError()
         cls._local.connection = sqlite3.connect(
-            db_path, check_same_thread=False, isolation_level=None, timeout=60
+            db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=60,
+            cached_statements=cls.tuning.statement_cache_size,
         )
         logger.debug(f"Connected to database at '{db_path}'.")
         if cls.trace_sql:
             cls._local.connection.set_trace_callback(logger.debug)
         _validate_schema(cls._local.connection)
+        cls.tuning.apply(cls._local.connection)
 
     @classmethod
     def connection(cls) -> sqlite3.Connection:
@@ -103,6 +125,22 @@ def transaction(commit_on_error: bool = False) -> Generator[None, None, None]:
     _DbState.in_transaction = False
 
 
+@contextlib.contextmanager
+def savepoint(name: str) -> Generator[None, None, None]:
+    """Roll back all changes made inside the block if it raises.
+
+    Unlike `transaction`, this may be nested inside an open transaction.
+    """
+    _DbState.connection().execute(f"SAVEPOINT {name}")
+    try:
+        yield None
+    except BaseException:
+        _DbState.connection().execute(f"ROLLBACK TO {name}")
+        _DbState.connection().execute(f"RELEASE {name}")
+        raise
+    _DbState.connection().execute(f"RELEASE {name}")
+
+
 def _validate_schema(connection: sqlite3.Connection) -> None:
     meta_table = connection.execute(
         "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'"
@@ -150,6 +188,11 @@ def set_trace_sql(trace_sql: bool) -> None:
     _DbState.trace_sql = trace_sql
 
 
+def set_tuning(tuning: ConnectionTuning) -> None:
+    """Set performance settings for future connections."""
+    _DbState.tuning = tuning
+
+
 class JobStatus(StrEnum):
     """Status of a download job."""
 
@@ -267,7 +310,7 @@ class SongOrder(SongOrderBase, enum.Enum):
             case SongOrder.SAMPLE_URL:
                 return (
                     "CASE WHEN session_usdb_song.is_playing = true THEN 0"
-                    " WHEN audio.sync_meta_id IS NOT NULL THEN 1"
+                    " WHEN resources.audio_status IS NOT NULL THEN 1"
                     " WHEN usdb_song.sample_url != '' THEN 2 ELSE 3 END"
                 )
             case SongOrder.SONG_ID:
@@ -315,8 +358,8 @@ class SongOrder(SongOrderBase, enum.Enum):
             case SongOrder.STATUS:
                 return _STATUS_COLUMN
 
-    def order(self, alias: str) -> str:
-        """Return CASE SQL expression for resource_file status sorting."""
+    def order(self, kind: str) -> str:
+        """Return CASE SQL expression for resource status sorting."""
         statuses = [
             JobStatus.SKIPPED_DISABLED,
             JobStatus.SKIPPED_UNAVAILABLE,
@@ -328,13 +371,13 @@ class SongOrder(SongOrderBase, enum.Enum):
         ]
 
         when_clauses = [
-            f"WHEN {alias}.status = '{status}' THEN {i + 1}"
+            f"WHEN resources.{kind}_status = '{status}' THEN {i + 1}"
             for i, status in enumerate(statuses)
         ]
 
         return (
             "CASE "
-            f"WHEN {alias}.sync_meta_id IS NULL THEN 0 "
+            f"WHEN resources.{kind}_status IS NULL THEN 0 "
             f"{' '.join(when_clauses)} "
             f"ELSE {len(statuses) + 1} "
             "END"
@@ -400,26 +443,26 @@ class SearchBuilder:
             (self.statuses, _STATUS_COLUMN),
         ):
             if vals:
-                yield _in_values_clause(col, cast("list", vals))
+                yield _in_values_clause(col)
         if self.languages:
             yield (
                 "usdb_song.song_id IN (SELECT song_id FROM usdb_song_language WHERE"
-                f" {_in_values_clause('language', self.languages)})"
+                f" {_in_values_clause('language')})"
             )
         if self.genres:
             yield (
                 "usdb_song.song_id IN (SELECT song_id FROM usdb_song_genre WHERE"
-                f" {_in_values_clause('genre', self.genres)})"
+                f" {_in_values_clause('genre')})"
             )
         if self.creators:
             yield (
                 "usdb_song.song_id IN (SELECT song_id FROM usdb_song_creator WHERE"
-                f" {_in_values_clause('creator', self.creators)})"
+                f" {_in_values_clause('creator')})"
             )
         if self.custom_data:
             yield (
                 "sync_meta.sync_meta_id IN (SELECT sync_meta_id FROM custom_meta_data "
-                f"WHERE {_custom_data_clause(self.custom_data)})"
+                f"WHERE {_custom_data_clause(len(self.custom_data))})"
             )
         if self.views:
             yield _in_ranges_clause("usdb_song.views", self.views)
@@ -438,18 +481,22 @@ class SearchBuilder:
     def parameters(self) -> Iterator[str | float | int | bool]:
         if text := _fts5_phrases(self.text):
             yield text
-        yield from self.artists
-        yield from self.titles
-        yield from self.editions
-        yield from self.ratings
-        yield from self.years
-        yield from self.statuses
-        yield from self.languages
-        yield from self.genres
-        yield from self.creators
+        for vals in (
+            self.artists,
+            self.titles,
+            self.editions,
+            self.ratings,
+            self.years,
+            self.statuses,
+            self.languages,
+            self.genres,
+            self.creators,
+        ):
+            if vals:
+                yield _json_array(vals)
         for key, values in self.custom_data.items():
             yield key
-            yield from values
+            yield _json_array(values)
         for min_views, max_views in self.views:
             yield min_views
             if max_views is not None:
@@ -506,15 +553,23 @@ def _migrate_to_version_10() -> None:
         settings.set_default_saved_search(default[0])
 
 
-def _in_values_clause(attribute: str, values: list) -> str:
-    return f"{attribute} IN ({', '.join('?' * len(values))})"
+def _in_values_clause(attribute: str) -> str:
+    """Return a condition matching `attribute` against a `_json_array` parameter.
 
+    Unlike one placeholder per value, the statement does not depend on the number of
+    values, so it is reused from the statement cache and not subject to SQLite's
+    variable limit.
+    """
+    return f"{attribute} IN (SELECT json_each.value FROM json_each(?))"
 
-def _custom_data_clause(key_values: dict[str, list[str]]) -> str:
-    return " AND ".join(
-        f"(key = ? AND value IN ({', '.join('?' * len(vals))}))"
-        for vals in key_values.values()
-    )
+
+def _json_array(values: Iterable[Any]) -> str:
+    return json.dumps(list(values))
+
+
+def _custom_data_clause(n_keys: int) -> str:
+    clause = f"(key = ? AND {_in_values_clause('custom_meta_data.value')})"
+    return " AND ".join([clause] * n_keys)
 
 
 def _in_ranges_clause(attribute: str, values: list[tuple[int, int | None]]) -> str:
@@ -542,6 +597,14 @@ def get_usdb_song(song_id: SongId) -> tuple | None:
     return _DbState.connection().execute(stmt, (song_id,)).fetchone()
 
 
+def get_usdb_songs(ids: Iterable[SongId]) -> list[tuple]:
+    """Return the rows of all existing songs with the given ids, in no order."""
+    stmt = (
+        f"{Sql.SELECT_USDB_SONG.text()} WHERE {_in_values_clause('usdb_song.song_id')}"
+    )
+    return _DbState.connection().execute(stmt, (_json_array(ids),)).fetchall()
+
+
 def delete_usdb_song(song_id: SongId) -> None:
     _DbState.connection().execute("DELETE FROM usdb_song WHERE song_id = ?", (song_id,))
 
@@ -624,7 +687,8 @@ class LastUsdbUpdate:
 
 def delete_usdb_songs(ids: list[SongId]) -> None:
     _DbState.connection().execute(
-        f"DELETE FROM usdb_song WHERE {_in_values_clause('song_id', ids)}", ids
+        f"DELETE FROM usdb_song WHERE {_in_values_clause('song_id')}",
+        (_json_array(ids),),
     )
 
 
@@ -658,8 +722,8 @@ def delete_session_data() -> None:
 
 def upsert_usdb_songs_languages(params: list[tuple[SongId, Iterable[str]]]) -> None:
     _DbState.connection().execute(
-        f"DELETE FROM usdb_song_language WHERE {_in_values_clause('song_id', params)}",
-        tuple(t[0] for t in params),
+        f"DELETE FROM usdb_song_language WHERE {_in_values_clause('song_id')}",
+        (_json_array(t[0] for t in params),),
     )
     _DbState.connection().executemany(
         "INSERT INTO usdb_song_language (song_id, language) VALUES (?, ?)",
@@ -669,8 +733,8 @@ def upsert_usdb_songs_languages(params: list[tuple[SongId, Iterable[str]]]) -> N
 
 def upsert_usdb_songs_genres(params: list[tuple[SongId, Iterable[str]]]) -> None:
     _DbState.connection().execute(
-        f"DELETE FROM usdb_song_genre WHERE {_in_values_clause('song_id', params)}",
-        tuple(t[0] for t in params),
+        f"DELETE FROM usdb_song_genre WHERE {_in_values_clause('song_id')}",
+        (_json_array(t[0] for t in params),),
     )
     _DbState.connection().executemany(
         "INSERT INTO usdb_song_genre (song_id, genre) VALUES (?, ?)",
@@ -680,8 +744,8 @@ def upsert_usdb_songs_genres(params: list[tuple[SongId, Iterable[str]]]) -> None
 
 def upsert_usdb_songs_creators(params: list[tuple[SongId, Iterable[str]]]) -> None:
     _DbState.connection().execute(
-        f"DELETE FROM usdb_song_creator WHERE {_in_values_clause('song_id', params)}",
-        tuple(t[0] for t in params),
+        f"DELETE FROM usdb_song_creator WHERE {_in_values_clause('song_id')}",
+        (_json_array(t[0] for t in params),),
     )
     _DbState.connection().executemany(
         "INSERT INTO usdb_song_creator (song_id, creator) VALUES (?, ?)",
@@ -827,22 +891,18 @@ def delete_sync_meta(sync_meta_id: SyncMetaId) -> None:
 
 
 def delete_sync_metas(ids: tuple[SyncMetaId, ...]) -> None:
-    for batch in batched(ids, _SQL_VARIABLES_LIMIT):
-        id_str = ", ".join("?" for _ in range(len(batch)))
-        _DbState.connection().execute(
-            f"DELETE FROM sync_meta WHERE sync_meta_id IN ({id_str})", batch
-        )
+    _DbState.connection().execute(
+        f"DELETE FROM sync_meta WHERE {_in_values_clause('sync_meta_id')}",
+        (_json_array(ids),),
+    )
 
 
 def delete_sync_metas_in_folder(folder: Path, ids: tuple[SyncMetaId, ...]) -> None:
-    path = folder.as_posix()
-    for batch in batched(ids, _SQL_VARIABLES_LIMIT - 1):
-        id_str = ", ".join("?" for _ in range(len(batch)))
-        _DbState.connection().execute(
-            f"DELETE FROM sync_meta WHERE sync_meta_id IN ({id_str}) AND "
-            "path GLOB ? || '/*'",
-            (*batch, path),
-        )
+    _DbState.connection().execute(
+        f"DELETE FROM sync_meta WHERE {_in_values_clause('sync_meta_id')} AND "
+        "path GLOB ? || '/*'",
+        (_json_array(ids), folder.as_posix()),
+    )
 
 
 @attrs.define(frozen=True, slots=False)
@@ -860,11 +920,10 @@ def upsert_custom_meta_data(params: Iterable[CustomMetaDataParams]) -> None:
 
 
 def delete_custom_meta_data(ids: Iterable[SyncMetaId]) -> None:
-    for batch in batched(ids, _SQL_VARIABLES_LIMIT):
-        id_str = ", ".join("?" for _ in range(len(batch)))
-        _DbState.connection().execute(
-            f"DELETE FROM custom_meta_data WHERE sync_meta_id IN ({id_str})", batch
-        )
+    _DbState.connection().execute(
+        f"DELETE FROM custom_meta_data WHERE {_in_values_clause('sync_meta_id')}",
+        (_json_array(ids),),
+    )
 
 
 def get_custom_data(sync_meta_id: SyncMetaId) -> dict[str, str]:
@@ -913,14 +972,12 @@ class ResourceParams:
 
 
 def delete_resources(ids: Iterable[tuple[SyncMetaId, ResourceKind]]) -> None:
-    for batch in batched(ids, _SQL_SMALLER_THAN_EXPRESSION_TREE):
-        if not batch:
-            continue
-        conditions = " OR ".join("(sync_meta_id = ? AND kind = ?)" for _ in batch)
-        params = tuple(param for i, k in batch for param in (int(i), k.value))
-        _DbState.connection().execute(
-            f"DELETE FROM resource_file WHERE {conditions}", params
-        )
+    _DbState.connection().execute(
+        "DELETE FROM resource_file WHERE (sync_meta_id, kind) IN (SELECT"
+        " json_extract(json_each.value, '$[0]'), json_extract(json_each.value, '$[1]')"
+        " FROM json_each(?))",
+        (_json_array(ids),),
+    )
 
 
 def upsert_resources(params: Iterable[ResourceParams]) -> None:
@@ -940,3 +997,103 @@ def maybe_insert_discord_notification(song_id: SongId, resource: str) -> bool:
         "INSERT OR IGNORE INTO discord_notification (song_id, resource) VALUES (?, ?)"
     )
     return _DbState.connection().execute(stmt, (song_id, resource)).rowcount > 0
+
+
+# Resumable downloads
+
+
+def upsert_pending_download(
+    song_id: SongId, priority: int, force_redownload: bool
+) -> None:
+    stmt = (
+        "INSERT INTO pending_download (song_id, priority, force_redownload) "
+        "VALUES (?, ?, ?) ON CONFLICT (song_id) DO UPDATE SET "
+        "priority = excluded.priority, force_redownload = excluded.force_redownload"
+    )
+    _DbState.connection().execute(stmt, (song_id, priority, force_redownload))
+
+
+def delete_pending_download(song_id: SongId) -> None:
+    """Delete a pending download together with its checkpoints."""
+    for table in ("pending_download", "download_checkpoint"):
+        _DbState.connection().execute(
+            f"DELETE FROM {table} WHERE song_id = ?", (song_id,)
+        )
+
+
+def pending_downloads() -> list[tuple[SongId, int, bool]]:
+    """Return song id, priority and redownload flag of all pending downloads."""
+    stmt = "SELECT song_id, priority, force_redownload FROM pending_download"
+    return [
+        (SongId(song_id), priority, bool(force_redownload))
+        for song_id, priority, force_redownload in _DbState.connection().execute(stmt)
+    ]
+
+
+def upsert_download_checkpoint(
+    song_id: SongId,
+    job: str,
+    fingerprint: str,
+    status: JobStatus,
+    files: list[tuple[str | None, str | None]],
+) -> None:
+    """Record a finished job. `files` are pairs of resource and file name."""
+    stmt = (
+        "INSERT INTO download_checkpoint (song_id, job, fingerprint, status, files) "
+        "VALUES (?, ?, ?, ?, ?) ON CONFLICT (song_id, job) DO UPDATE SET "
+        "fingerprint = excluded.fingerprint, status = excluded.status, "
+        "files = excluded.files"
+    )
+    _DbState.connection().execute(
+        stmt, (song_id, job, fingerprint, status.value, json.dumps(files))
+    )
+
+
+def download_checkpoints(
+    song_id: SongId, fingerprint: str
+) -> dict[str, tuple[JobStatus, list[tuple[str | None, str | None]]]]:
+    """Return status and files of finished jobs, by job name.
+
+    Only checkpoints with a matching fingerprint are returned.
+    """
+    stmt = (
+        "SELECT job, status, files FROM download_checkpoint "
+        "WHERE song_id = ? AND fingerprint = ?"
+    )
+    return {
+        job: (JobStatus(status), [tuple(file) for file in json.loads(files)])
+        for job, status, files in _DbState.connection().execute(
+            stmt, (song_id, fingerprint)
+        )
+    }
+
+
+# Audio-only detection
+
+
+def audio_only_verdicts(resources: list[str]) -> dict[str, bool]:
+    """Return whether resources are audio-only, for those checked recently.
+
+    Uploads may be replaced, so verdicts expire after `AUDIO_ONLY_VERDICT_MAX_AGE_SECS`.
+    """
+    stmt = (
+        "SELECT resource, audio_only FROM audio_only_verdict "
+        f"WHERE {_in_values_clause('resource')} AND checked_at > ?"
+    )
+    rows = _DbState.connection().execute(
+        stmt,
+        (_json_array(resources), int(time.time()) - AUDIO_ONLY_VERDICT_MAX_AGE_SECS),
+    )
+    return {resource: bool(audio_only) for resource, audio_only in rows}
+
+
+def upsert_audio_only_verdicts(verdicts: dict[str, bool]) -> None:
+    stmt = (
+        "INSERT INTO audio_only_verdict (resource, audio_only, checked_at) "
+        "VALUES (?, ?, ?) ON CONFLICT (resource) DO UPDATE SET "
+        "audio_only = excluded.audio_only, checked_at = excluded.checked_at"
+    )
+    now = int(time.time())
+    _DbState.connection().executemany(
+        stmt, ((resource, audio_only, now) for resource, audio_only in verdicts.items())
+    )
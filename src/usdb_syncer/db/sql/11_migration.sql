@@ -0,0 +1,22 @@
+BEGIN;
+
+CREATE TABLE pending_download (
+    song_id INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    force_redownload BOOLEAN NOT NULL,
+    PRIMARY KEY (song_id),
+    FOREIGN KEY (song_id) REFERENCES usdb_song (song_id) ON DELETE CASCADE
+);
+
+CREATE TABLE download_checkpoint (
+    song_id INTEGER NOT NULL,
+    job TEXT NOT NULL,
+    -- hash of the USDB version and options the downloaded files depend on
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    files TEXT NOT NULL,
+    PRIMARY KEY (song_id, job),
+    FOREIGN KEY (song_id) REFERENCES usdb_song (song_id) ON DELETE CASCADE
+);
+
+COMMIT;
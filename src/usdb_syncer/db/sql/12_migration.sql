@@ -0,0 +1,9 @@
+BEGIN;
+
+CREATE TABLE audio_only_verdict (
+    resource TEXT NOT NULL,
+    audio_only BOOLEAN NOT NULL,
+    PRIMARY KEY (resource)
+);
+
+COMMIT;
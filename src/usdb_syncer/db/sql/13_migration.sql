@@ -0,0 +1,141 @@
+BEGIN;
+
+-- all resources of a sync meta in a single row, kept in sync with resource_file by
+-- the triggers below, so songs can be loaded without joining once per kind
+CREATE TABLE sync_meta_resources (
+    sync_meta_id INTEGER NOT NULL,
+    txt_fname TEXT,
+    txt_mtime INTEGER,
+    txt_resource TEXT,
+    txt_status TEXT,
+    audio_fname TEXT,
+    audio_mtime INTEGER,
+    audio_resource TEXT,
+    audio_status TEXT,
+    vocals_fname TEXT,
+    vocals_mtime INTEGER,
+    vocals_resource TEXT,
+    vocals_status TEXT,
+    instrumental_fname TEXT,
+    instrumental_mtime INTEGER,
+    instrumental_resource TEXT,
+    instrumental_status TEXT,
+    video_fname TEXT,
+    video_mtime INTEGER,
+    video_resource TEXT,
+    video_status TEXT,
+    cover_fname TEXT,
+    cover_mtime INTEGER,
+    cover_resource TEXT,
+    cover_status TEXT,
+    background_fname TEXT,
+    background_mtime INTEGER,
+    background_resource TEXT,
+    background_status TEXT,
+    PRIMARY KEY (sync_meta_id),
+    FOREIGN KEY (sync_meta_id) REFERENCES sync_meta (sync_meta_id) ON DELETE CASCADE
+);
+
+-- sync metas being deleted are excluded, as their rows are removed by the cascade
+CREATE VIEW sync_meta_resources_view AS
+SELECT
+    file.sync_meta_id,
+    max(CASE WHEN file.kind = 'txt' THEN file.fname END) AS txt_fname,
+    max(CASE WHEN file.kind = 'txt' THEN file.mtime END) AS txt_mtime,
+    max(CASE WHEN file.kind = 'txt' THEN file.resource END) AS txt_resource,
+    max(CASE WHEN file.kind = 'txt' THEN file.status END) AS txt_status,
+    max(CASE WHEN file.kind = 'audio' THEN file.fname END) AS audio_fname,
+    max(CASE WHEN file.kind = 'audio' THEN file.mtime END) AS audio_mtime,
+    max(CASE WHEN file.kind = 'audio' THEN file.resource END) AS audio_resource,
+    max(CASE WHEN file.kind = 'audio' THEN file.status END) AS audio_status,
+    max(CASE WHEN file.kind = 'vocals' THEN file.fname END) AS vocals_fname,
+    max(CASE WHEN file.kind = 'vocals' THEN file.mtime END) AS vocals_mtime,
+    max(CASE WHEN file.kind = 'vocals' THEN file.resource END) AS vocals_resource,
+    max(CASE WHEN file.kind = 'vocals' THEN file.status END) AS vocals_status,
+    max(CASE WHEN file.kind = 'instrumental' THEN file.fname END) AS instrumental_fname,
+    max(CASE WHEN file.kind = 'instrumental' THEN file.mtime END) AS instrumental_mtime,
+    max(CASE WHEN file.kind = 'instrumental' THEN file.resource END) AS instrumental_resource,
+    max(CASE WHEN file.kind = 'instrumental' THEN file.status END) AS instrumental_status,
+    max(CASE WHEN file.kind = 'video' THEN file.fname END) AS video_fname,
+    max(CASE WHEN file.kind = 'video' THEN file.mtime END) AS video_mtime,
+    max(CASE WHEN file.kind = 'video' THEN file.resource END) AS video_resource,
+    max(CASE WHEN file.kind = 'video' THEN file.status END) AS video_status,
+    max(CASE WHEN file.kind = 'cover' THEN file.fname END) AS cover_fname,
+    max(CASE WHEN file.kind = 'cover' THEN file.mtime END) AS cover_mtime,
+    max(CASE WHEN file.kind = 'cover' THEN file.resource END) AS cover_resource,
+    max(CASE WHEN file.kind = 'cover' THEN file.status END) AS cover_status,
+    max(CASE WHEN file.kind = 'background' THEN file.fname END) AS background_fname,
+    max(CASE WHEN file.kind = 'background' THEN file.mtime END) AS background_mtime,
+    max(CASE WHEN file.kind = 'background' THEN file.resource END) AS background_resource,
+    max(CASE WHEN file.kind = 'background' THEN file.status END) AS background_status
+FROM
+    resource_file AS file
+    JOIN sync_meta ON file.sync_meta_id = sync_meta.sync_meta_id
+GROUP BY
+    file.sync_meta_id;
+
+INSERT INTO
+    sync_meta_resources
+SELECT
+    *
+FROM
+    sync_meta_resources_view;
+
+CREATE TRIGGER sync_meta_resources_insert
+AFTER
+    INSERT ON resource_file BEGIN
+DELETE FROM
+    sync_meta_resources
+WHERE
+    sync_meta_id = new.sync_meta_id;
+
+INSERT INTO
+    sync_meta_resources
+SELECT
+    *
+FROM
+    sync_meta_resources_view
+WHERE
+    sync_meta_id = new.sync_meta_id;
+
+END;
+
+CREATE TRIGGER sync_meta_resources_update
+AFTER
+    UPDATE ON resource_file BEGIN
+DELETE FROM
+    sync_meta_resources
+WHERE
+    sync_meta_id IN (old.sync_meta_id, new.sync_meta_id);
+
+INSERT INTO
+    sync_meta_resources
+SELECT
+    *
+FROM
+    sync_meta_resources_view
+WHERE
+    sync_meta_id IN (old.sync_meta_id, new.sync_meta_id);
+
+END;
+
+CREATE TRIGGER sync_meta_resources_delete
+AFTER
+    DELETE ON resource_file BEGIN
+DELETE FROM
+    sync_meta_resources
+WHERE
+    sync_meta_id = old.sync_meta_id;
+
+INSERT INTO
+    sync_meta_resources
+SELECT
+    *
+FROM
+    sync_meta_resources_view
+WHERE
+    sync_meta_id = old.sync_meta_id;
+
+END;
+
+COMMIT;
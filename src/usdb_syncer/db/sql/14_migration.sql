@@ -0,0 +1,8 @@
+BEGIN;
+
+-- verdicts stored so far may stem from metadata or keyframes alone
+DELETE FROM audio_only_verdict;
+
+ALTER TABLE audio_only_verdict ADD COLUMN checked_at INTEGER NOT NULL DEFAULT 0;
+
+COMMIT;
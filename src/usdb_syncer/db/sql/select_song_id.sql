@@ -7,18 +7,5 @@ FROM
     AND active_sync_meta.rank = 1
     LEFT JOIN sync_meta ON sync_meta.sync_meta_id = active_sync_meta.sync_meta_id
     AND usdb_song.song_id = sync_meta.song_id
-    LEFT JOIN resource_file AS txt ON txt.kind = 'txt'
-    AND sync_meta.sync_meta_id = txt.sync_meta_id
-    LEFT JOIN resource_file AS audio ON audio.kind = 'audio'
-    AND sync_meta.sync_meta_id = audio.sync_meta_id
-    LEFT JOIN resource_file AS vocals ON vocals.kind = 'vocals'
-    AND sync_meta.sync_meta_id = vocals.sync_meta_id
-    LEFT JOIN resource_file AS instrumental ON instrumental.kind = 'instrumental'
-    AND sync_meta.sync_meta_id = instrumental.sync_meta_id
-    LEFT JOIN resource_file AS video ON video.kind = 'video'
-    AND sync_meta.sync_meta_id = video.sync_meta_id
-    LEFT JOIN resource_file AS cover ON cover.kind = 'cover'
-    AND sync_meta.sync_meta_id = cover.sync_meta_id
-    LEFT JOIN resource_file AS background ON background.kind = 'background'
-    AND sync_meta.sync_meta_id = background.sync_meta_id
+    LEFT JOIN sync_meta_resources AS resources ON sync_meta.sync_meta_id = resources.sync_meta_id
     LEFT JOIN custom_meta_data ON sync_meta.sync_meta_id = custom_meta_data.sync_meta_id
\ No newline at end of file
@@ -30,34 +30,34 @@ SELECT
     sync_meta.mtime,
     sync_meta.meta_tags,
     sync_meta.pinned,
-    txt.fname,
-    txt.mtime,
-    txt.resource,
-    txt.status,
-    audio.fname,
-    audio.mtime,
-    audio.resource,
-    audio.status,
-    vocals.fname,
-    vocals.mtime,
-    vocals.resource,
-    vocals.status,
-    instrumental.fname,
-    instrumental.mtime,
-    instrumental.resource,
-    instrumental.status,
-    video.fname,
-    video.mtime,
-    video.resource,
-    video.status,
-    cover.fname,
-    cover.mtime,
-    cover.resource,
-    cover.status,
-    background.fname,
-    background.mtime,
-    background.resource,
-    background.status
+    resources.txt_fname,
+    resources.txt_mtime,
+    resources.txt_resource,
+    resources.txt_status,
+    resources.audio_fname,
+    resources.audio_mtime,
+    resources.audio_resource,
+    resources.audio_status,
+    resources.vocals_fname,
+    resources.vocals_mtime,
+    resources.vocals_resource,
+    resources.vocals_status,
+    resources.instrumental_fname,
+    resources.instrumental_mtime,
+    resources.instrumental_resource,
+    resources.instrumental_status,
+    resources.video_fname,
+    resources.video_mtime,
+    resources.video_resource,
+    resources.video_status,
+    resources.cover_fname,
+    resources.cover_mtime,
+    resources.cover_resource,
+    resources.cover_status,
+    resources.background_fname,
+    resources.background_mtime,
+    resources.background_resource,
+    resources.background_status
 FROM
     usdb_song
     LEFT JOIN session_usdb_song ON usdb_song.song_id = session_usdb_song.song_id
@@ -65,17 +65,4 @@ FROM
     AND active_sync_meta.rank = 1
     LEFT JOIN sync_meta ON sync_meta.sync_meta_id = active_sync_meta.sync_meta_id
     AND usdb_song.song_id = sync_meta.song_id
-    LEFT JOIN resource_file AS txt ON txt.kind = 'txt'
-    AND sync_meta.sync_meta_id = txt.sync_meta_id
-    LEFT JOIN resource_file AS audio ON audio.kind = 'audio'
-    AND sync_meta.sync_meta_id = audio.sync_meta_id
-    LEFT JOIN resource_file AS vocals ON vocals.kind = 'vocals'
-    AND sync_meta.sync_meta_id = vocals.sync_meta_id
-    LEFT JOIN resource_file AS instrumental ON instrumental.kind = 'instrumental'
-    AND sync_meta.sync_meta_id = instrumental.sync_meta_id
-    LEFT JOIN resource_file AS video ON video.kind = 'video'
-    AND sync_meta.sync_meta_id = video.sync_meta_id
-    LEFT JOIN resource_file AS cover ON cover.kind = 'cover'
-    AND sync_meta.sync_meta_id = cover.sync_meta_id
-    LEFT JOIN resource_file AS background ON background.kind = 'background'
-    AND sync_meta.sync_meta_id = background.sync_meta_id
\ No newline at end of file
+    LEFT JOIN sync_meta_resources AS resources ON sync_meta.sync_meta_id = resources.sync_meta_id
\ No newline at end of file
@@ -30,7 +30,6 @@ class AudioOptions:
     separation: bool
     separation_executable: str
     separation_model: str
-    rate_limit: settings.YtdlpRateLimit
 
     def ytdl_format(self) -> str:
         return self.format.ytdl_format()
@@ -45,7 +44,8 @@ class VideoOptions:
     max_resolution: settings.VideoResolution
     max_fps: settings.VideoFps
     embed_artwork: bool
-    rate_limit: settings.YtdlpRateLimit
+    # prefer streams without audio, if the audio is downloaded separately anyway
+    video_only: bool = False
 
     def ytdl_format(self) -> str:
         container = f"[ext={self.format.ytdl_ext()}]" if self.format.ytdl_ext() else ""
@@ -59,6 +59,8 @@ class VideoOptions:
             fmt.insert(0, f"bestvideo*{container}")
         if codec:
             fmt.insert(0, f"bestvideo*{container}{codec}")
+        if self.video_only:
+            fmt = [f.replace("bestvideo*", "bestvideo") for f in fmt] + fmt
         width = f"[width<={self.max_resolution.width()}]"
         height = f"[height<={self.max_resolution.height()}]"
         fps = f"[fps<={self.max_fps.value}]"
@@ -137,7 +139,6 @@ def _audio_options() -> AudioOptions | None:
         separation=settings.get_audio_separation(),
         separation_executable=settings.get_audio_separation_executable(),
         separation_model=settings.get_audio_separation_model(),
-        rate_limit=settings.get_ytdlp_rate_limit(),
     )
 
 
@@ -152,7 +153,6 @@ def _video_options() -> VideoOptions | None:
         max_resolution=settings.get_video_resolution(),
         max_fps=settings.get_video_fps(),
         embed_artwork=settings.get_video_embed_artwork(),
-        rate_limit=settings.get_ytdlp_rate_limit(),
     )
 
 
@@ -145,6 +145,10 @@ class AbortError(UsdbSyncerError):
     """Raised when the user requests to abort an operation."""
 
 
+class PauseError(UsdbSyncerError):
+    """Raised when an operation stops early to be resumed later, as it was paused."""
+
+
 # files
 
 
@@ -22,6 +22,7 @@ from PySide6.QtCore import Qt, qInstallMessageHandler
 import usdb_syncer
 from usdb_syncer import (
     addons,
+    bandwidth,
     constants,
     data,
     db,
@@ -29,6 +30,8 @@ from usdb_syncer import (
     logger,
     settings,
     song_routines,
+    usdb_async_client,
+    usdb_scraper,
     utils,
 )
 from usdb_syncer import sync_meta as sync_meta
@@ -72,6 +75,10 @@ class CliArgs:
     profile: bool = False
     skip_pyside: bool = not constants.IS_SOURCE
     trace_sql: bool = False
+    db_cache_size: int | None = None
+    db_mmap_size: int | None = None
+    lxml_detail_parser: bool = False
+    async_usdb_client: bool = False
     healthcheck: bool = False
 
     # preview
@@ -112,6 +119,28 @@ class CliArgs:
         dev_options.add_argument(
             "--trace-sql", action="store_true", help="Trace SQL statements."
         )
+        dev_options.add_argument(
+            "--db-cache-size",
+            type=int,
+            metavar="KIB",
+            help="SQLite page cache per database connection in KiB.",
+        )
+        dev_options.add_argument(
+            "--db-mmap-size",
+            type=int,
+            metavar="MIB",
+            help="Memory-mapped I/O per database connection in MiB. 0 disables it.",
+        )
+        dev_options.add_argument(
+            "--lxml-detail-parser",
+            action="store_true",
+            help="Parse USDB song pages with the experimental lxml parser.",
+        )
+        dev_options.add_argument(
+            "--async-usdb-client",
+            action="store_true",
+            help="Prefetch USDB data with the experimental asynchronous client.",
+        )
         dev_options.add_argument(
             "--profile", action="store_true", help="Run with profiling."
         )
@@ -167,6 +196,14 @@ class CliArgs:
 
             tools.generate_pyside_files.main()
         db.set_trace_sql(self.trace_sql)
+        tuning = db.ConnectionTuning()
+        if self.db_cache_size is not None:
+            tuning = attrs.evolve(tuning, cache_size_kib=self.db_cache_size)
+        if self.db_mmap_size is not None:
+            tuning = attrs.evolve(tuning, mmap_size=self.db_mmap_size * 1024**2)
+        db.set_tuning(tuning)
+        usdb_scraper.set_lxml_detail_parser(self.lxml_detail_parser)
+        usdb_async_client.set_enabled(self.async_usdb_client)
 
 
 def main() -> None:
@@ -217,6 +254,7 @@ def _run_main() -> None:
     from usdb_syncer.gui.mw import MainWindow
 
     separation.set_max_concurrent(settings.get_audio_separation_threads())
+    bandwidth.set_total_rate(settings.get_ytdlp_rate_limit())
     mw = MainWindow()
     mw_logger = _TextEditLogger(mw)
     mw_logger.setFormatter(logger.GUI_FORMATTER)
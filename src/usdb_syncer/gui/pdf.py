@@ -205,10 +205,8 @@ def _build_pdf_content(
 ) -> list:
     content: list = []
     artist_map: dict[str, list[UsdbSong]] = defaultdict(list)
-    for song_id in songs:
-        song = UsdbSong.get(song_id)
-        if song:
-            artist_map[song.artist].append(song)
+    for song in UsdbSong.get_many(songs):
+        artist_map[song.artist].append(song)
 
     initial_map: dict[str, dict[str, list[UsdbSong]]] = defaultdict(dict)
     for artist, artist_songs in artist_map.items():
@@ -143,7 +143,7 @@ class Previewer(Ui_MainWindow, QtWidgets.QMainWindow):
         if txt_path := song.txt_path():
             txt = SongTxt.try_from_file(txt_path, logger)
         else:
-            txt_str = usdb_scraper.get_notes(song.song_id, logger)
+            txt_str = usdb_scraper.get_notes(song.song_id, logger, song.usdb_mtime)
             txt = SongTxt.try_parse(txt_str, logger)
         if not txt:
             QtWidgets.QMessageBox.warning(None, "Aborted", "Txt file is invalid!")
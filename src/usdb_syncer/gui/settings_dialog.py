@@ -11,7 +11,7 @@ import platformdirs
 from PySide6 import QtWidgets
 from PySide6.QtWidgets import QDialog, QDialogButtonBox, QFileDialog, QWidget
 
-from usdb_syncer import SongId, events, path_template, separation, settings
+from usdb_syncer import SongId, bandwidth, events, path_template, separation, settings
 from usdb_syncer.gui import gui_utils, icons, notification, theme
 from usdb_syncer.gui.forms.SettingsDialog import Ui_Dialog
 from usdb_syncer.path_template import PathTemplate
@@ -476,7 +476,9 @@ class SettingsDialog(Ui_Dialog, QDialog):
         settings.set_fix_spaces(self.comboBox_fix_spaces.currentData())
         settings.set_fix_quotation_marks(self.checkBox_fix_quotation_marks.isChecked())
         settings.set_throttling_threads(self.spinBox_throttling_threads.value())
-        settings.set_ytdlp_rate_limit(self.comboBox_ytdlp_rate_limit.currentData())
+        rate_limit = self.comboBox_ytdlp_rate_limit.currentData()
+        settings.set_ytdlp_rate_limit(rate_limit)
+        bandwidth.set_total_rate(rate_limit)
         settings.set_audio(self.groupBox_audio.isChecked())
         settings.set_audio_format(self.comboBox_audio_format.currentData())
         settings.set_audio_bitrate(self.comboBox_audio_bitrate.currentData())
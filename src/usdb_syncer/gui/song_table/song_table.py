@@ -424,11 +424,7 @@ class SongTable:
         return None
 
     def selected_songs(self) -> Iterator[UsdbSong]:
-        return (
-            song
-            for song_id in self._model.ids_for_rows(self._selected_rows())
-            if (song := UsdbSong.get(song_id))
-        )
+        return iter(UsdbSong.get_many(self._model.ids_for_rows(self._selected_rows())))
 
     def _selected_rows(self) -> Iterable[int]:
         return (idx.row() for idx in self._view.selectionModel().selectedRows())
@@ -23,6 +23,8 @@ from usdb_syncer.usdb_song import UsdbSong
 
 QIndex = QModelIndex | QPersistentModelIndex
 _SINGLE_ROW_UPDATE_THRESHOLD = 100
+# rows whose songs are loaded from the database together
+_PREFETCH_ROWS = 200
 
 
 class TableModel(QAbstractTableModel):
@@ -131,10 +133,14 @@ class TableModel(QAbstractTableModel):
     def _get_song(self, index: QIndex) -> UsdbSong | None:
         if not index.isValid():
             return None
-        song_id = self._ids[index.row()]
-        if song := UsdbSong.get(song_id):
+        row = index.row()
+        song_id = self._ids[row]
+        if song := UsdbSong.get_cached(song_id):
             return song
-        return None
+        # the view will most likely ask for the surrounding rows next
+        start = row - row % _PREFETCH_ROWS
+        songs = UsdbSong.get_many(self._ids[start : start + _PREFETCH_ROWS])
+        return next((song for song in songs if song.song_id == song_id), None)
 
     def headerData(  # noqa: N802
         self,
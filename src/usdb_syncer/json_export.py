@@ -100,9 +100,8 @@ class JsonSongList:
     ) -> JsonSongList:
         song_list = [
             song_data
-            for song_id in songs
-            if (song := UsdbSong.get(song_id))
-            and (song_data := SongExportData.from_usdb_song(song))
+            for song in UsdbSong.get_many(songs)
+            if (song_data := SongExportData.from_usdb_song(song))
         ]
         return cls(songs=song_list, date=str(date))
 
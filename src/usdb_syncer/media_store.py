@@ -0,0 +1,154 @@
+"""Bounded cache of downloaded media shared by all songs.
+
+Songs using the same resource with the same download options get a copy of the same
+stored file, so it is only downloaded and processed once. A fresh download is
+hard-linked into the store and must be unshared before it is modified in place, so
+stored files never change.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+from typing import TYPE_CHECKING
+
+from usdb_syncer import utils
+from usdb_syncer.download_options import AudioOptions
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from usdb_syncer.cancellation import CancellationToken
+    from usdb_syncer.download_options import VideoOptions
+
+# the oldest stored files are deleted beyond this
+MAX_BYTES = 2 * 1024**3
+
+_cond = threading.Condition()
+_in_flight: set[str] = set()
+
+
+def content_key(resource: str, options: AudioOptions | VideoOptions) -> str:
+    """Key identifying a resource processed with the options affecting its content."""
+    params: tuple[object, ...]
+    if isinstance(options, AudioOptions):
+        params = ("audio", options.format, options.bitrate, options.normalization)
+    else:
+        params = ("video", options.ytdl_format(), options.reencode_format)
+    return hashlib.sha256(repr((resource, *params)).encode()).hexdigest()
+
+
+@contextlib.contextmanager
+def reserve(key: str, token: CancellationToken) -> Iterator[None]:
+    """Wait until no other thread is producing the file for `key`, then claim it.
+
+    This way, songs with the same resource downloaded at the same time do not both
+    download it.
+    """
+
+    def wake() -> None:
+        with _cond:
+            _cond.notify_all()
+
+    with token.on_abort(wake), _cond:
+        _cond.wait_for(lambda: key not in _in_flight or token.aborted)
+        token.raise_if_aborted()
+        _in_flight.add(key)
+    try:
+        yield
+    finally:
+        with _cond:
+            _in_flight.discard(key)
+            _cond.notify_all()
+
+
+def fetch(key: str, path_stem: Path) -> Path | None:
+    """Copy the stored file for `key` to `path_stem` with the file's extension.
+
+    Return the copied path, or None if there is no such file.
+    """
+    if not (blob := _find(key)):
+        return None
+    path = path_stem.with_name(f"{path_stem.name}{blob.suffix}")
+    try:
+        shutil.copyfile(blob, path)
+        # mark as recently used, so it is evicted last
+        os.utime(blob)
+    except FileNotFoundError:
+        # evicted by a concurrent prune
+        path.unlink(missing_ok=True)
+        return None
+    return path
+
+
+def add(key: str, path: Path) -> None:
+    """Store the file at `path` under `key` and evict old files.
+
+    The file is hard-linked if possible, so `unshare` must be called before modifying
+    it in place.
+    """
+    root = utils.AppPaths.media_store
+    root.mkdir(parents=True, exist_ok=True)
+    if old := _find(key):
+        old.unlink(missing_ok=True)
+    blob = root / f"{key}{path.suffix}"
+    partial = blob.with_name(f"{blob.name}.part")
+    partial.unlink(missing_ok=True)
+    _link_or_copy(path, partial)
+    partial.replace(blob)
+    prune(MAX_BYTES)
+
+
+def unshare(path: Path) -> None:
+    """Replace `path` with a copy if it is linked to a stored file.
+
+    Must be called before modifying a file in place, as the stored file would be
+    modified otherwise.
+    """
+    if path.stat().st_nlink < 2:
+        return
+    copy = path.with_name(f"{path.name}.copy")
+    shutil.copy2(path, copy)
+    copy.replace(path)
+
+
+def prune(max_bytes: int) -> None:
+    """Delete the least recently used files until at most `max_bytes` are left."""
+    if not (root := utils.AppPaths.media_store).exists():
+        return
+    stored: list[tuple[Path, os.stat_result]] = []
+    for path in root.iterdir():
+        if path.suffix == ".part":
+            continue
+        try:
+            stored.append((path, path.stat()))
+        except FileNotFoundError:
+            # removed by a concurrent add or prune
+            continue
+    stored.sort(key=lambda entry: entry[1].st_mtime, reverse=True)
+    total = 0
+    for path, stat in stored:
+        total += stat.st_size
+        if total > max_bytes:
+            # may fail if the file is being fetched on Windows
+            with contextlib.suppress(OSError):
+                path.unlink(missing_ok=True)
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        # e.g. different file systems or no hard link support
+        shutil.copyfile(source, target)
+
+
+def _find(key: str) -> Path | None:
+    root = utils.AppPaths.media_store
+    return next(
+        (path for path in root.glob(f"{key}.*") if path.suffix != ".part"), None
+    )
@@ -0,0 +1,254 @@
+"""Rate limiting, retrying and circuit breaking for requests to a single server."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Protocol, TypeVar
+
+import attrs
+import requests
+from requests.adapters import HTTPAdapter
+
+from usdb_syncer.logger import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Collection
+
+    from requests import PreparedRequest, Response
+
+# requests per second
+MAX_RATE = 10.0
+MIN_RATE = 0.5
+# number of requests that may be sent at once after a quiet period
+BURST = 5
+# additive increase after a success and multiplicative decrease after a failure
+RATE_INCREASE = 0.5
+RATE_DECREASE_FACTOR = 0.5
+# consecutive failures after which no more requests are sent for a while
+FAILURE_THRESHOLD = 5
+COOLDOWN_SECS = 30.0
+# attempts per request, and bounds of the exponential backoff between them
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECS = 1.0
+BACKOFF_CAP_SECS = 30.0
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+# requests with other methods may have had an effect, so they are not sent again
+RETRY_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"))
+
+
+class _Response(Protocol):
+    @property
+    def status_code(self) -> int: ...
+
+
+_ResponseT = TypeVar("_ResponseT", bound=_Response)
+
+
+@attrs.frozen
+class RequestSchedulerStats:
+    """Snapshot of a RequestScheduler's state."""
+
+    # permitted requests per second
+    rate: float
+    # number of requests waiting for their turn
+    queue_depth: int
+    circuit_open: bool
+
+
+class RequestScheduler:
+    """Thread-safe token bucket whose rate adapts to the server's health.
+
+    Successful requests slowly raise the rate, failures quickly lower it. After too
+    many consecutive failures the circuit opens: all requests are held back for a
+    cooldown period and are then let through at the minimum rate until one succeeds.
+    Callers wait rather than fail, so throughput degrades gracefully.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._lock = threading.Lock()
+        self._rate = MAX_RATE
+        # theoretical arrival time of the next request if there were no burst
+        self._next_slot = 0.0
+        self._queue_depth = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+
+    def stats(self) -> RequestSchedulerStats:
+        with self._lock:
+            return RequestSchedulerStats(
+                rate=self._rate,
+                queue_depth=self._queue_depth,
+                circuit_open=self._consecutive_failures >= FAILURE_THRESHOLD,
+            )
+
+    def acquire(self) -> None:
+        """Block until the calling thread may send its request."""
+        if (delay := self._reserve()) <= 0:
+            return
+        try:
+            time.sleep(delay)
+        finally:
+            self._dequeue()
+
+    async def acquire_async(self) -> None:
+        """Wait until the calling task may send its request, without blocking."""
+        if (delay := self._reserve()) <= 0:
+            return
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._dequeue()
+
+    async def send_async(
+        self,
+        send: Callable[[], Awaitable[_ResponseT]],
+        method: str,
+        retry_on: tuple[type[Exception], ...],
+        retry_methods: Collection[str] = RETRY_METHODS,
+    ) -> _ResponseT:
+        """Await `send` when scheduled, retrying like ScheduledHTTPAdapter.
+
+        `method` is the HTTP method of the request `send` sends, and `retry_on` are
+        the exceptions of the underlying client that indicate a transient failure.
+        """
+        attempts = MAX_ATTEMPTS if method.upper() in retry_methods else 1
+        for attempt in range(attempts - 1):
+            try:
+                response = await self._send_scheduled_async(send, retry_on)
+            except retry_on as error:
+                logger.debug(f"Request to {self._name} failed: {error}")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                logger.debug(
+                    f"Request to {self._name} failed with {response.status_code}."
+                )
+            await asyncio.sleep(backoff_delay(attempt))
+        return await self._send_scheduled_async(send, retry_on)
+
+    async def _send_scheduled_async(
+        self,
+        send: Callable[[], Awaitable[_ResponseT]],
+        retry_on: tuple[type[Exception], ...],
+    ) -> _ResponseT:
+        await self.acquire_async()
+        try:
+            response = await send()
+        except retry_on:
+            self.report_failure()
+            raise
+        if response.status_code in RETRY_STATUS_CODES:
+            self.report_failure()
+        else:
+            self.report_success()
+        return response
+
+    def _reserve(self) -> float:
+        """Reserve the next slot and return the time to wait for it.
+
+        If there is a delay, the caller is counted as queued until `_dequeue()`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = 1 / self._rate
+            next_slot = max(self._next_slot, now, self._open_until)
+            slot = max(now, self._open_until, next_slot - (BURST - 1) * interval)
+            self._next_slot = next_slot + interval
+            if (delay := slot - now) > 0:
+                self._queue_depth += 1
+            return delay
+
+    def _dequeue(self) -> None:
+        with self._lock:
+            self._queue_depth -= 1
+
+    def report_success(self) -> None:
+        with self._lock:
+            if self._consecutive_failures >= FAILURE_THRESHOLD:
+                logger.info(f"{self._name} is responding again.")
+            self._consecutive_failures = 0
+            self._rate = min(MAX_RATE, self._rate + RATE_INCREASE)
+
+    def report_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._rate = max(MIN_RATE, self._rate * RATE_DECREASE_FACTOR)
+            if self._consecutive_failures < FAILURE_THRESHOLD:
+                logger.debug(
+                    f"Lowered request rate for {self._name} to {self._rate:.2f}/s."
+                )
+                return
+            if self._consecutive_failures == FAILURE_THRESHOLD:
+                logger.warning(
+                    f"{self._name} is failing; pausing requests for "
+                    f"{COOLDOWN_SECS:.0f} seconds."
+                )
+            now = time.monotonic()
+            self._open_until = now + COOLDOWN_SECS
+            # let requests through one by one once the cooldown has passed
+            self._next_slot = self._open_until + (BURST - 1) / self._rate
+
+
+def backoff_delay(attempt: int) -> float:
+    """Return a randomized delay before retrying after the given failed attempt.
+
+    Uses full jitter, so concurrent clients do not retry in lockstep.
+    """
+    cap = min(BACKOFF_CAP_SECS, BACKOFF_BASE_SECS * 2**attempt)
+    return random.uniform(0, cap)  # noqa: S311
+
+
+class ScheduledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that sends all requests through a RequestScheduler.
+
+    Timeouts, connection errors and transient server errors are retried with
+    exponential backoff if the request's method is in `retry_methods`. The last error
+    or response is passed on to the caller.
+    """
+
+    def __init__(
+        self,
+        scheduler: RequestScheduler,
+        retry_methods: Collection[str] = RETRY_METHODS,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+        self.retry_methods = retry_methods
+
+    def send(self, request: PreparedRequest, *args: Any, **kwargs: Any) -> Response:
+        method = (request.method or "GET").upper()
+        attempts = MAX_ATTEMPTS if method in self.retry_methods else 1
+        for attempt in range(attempts - 1):
+            try:
+                response = self._send_scheduled(request, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                logger.debug(f"Request to {request.url} failed: {error}")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                logger.debug(
+                    f"Request to {request.url} failed with {response.status_code}."
+                )
+                response.close()
+            time.sleep(backoff_delay(attempt))
+        return self._send_scheduled(request, *args, **kwargs)
+
+    def _send_scheduled(
+        self, request: PreparedRequest, *args: Any, **kwargs: Any
+    ) -> Response:
+        self.scheduler.acquire()
+        try:
+            response = super().send(request, *args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.scheduler.report_failure()
+            raise
+        if response.status_code in RETRY_STATUS_CODES:
+            self.scheduler.report_failure()
+        else:
+            self.scheduler.report_success()
+        return response
@@ -5,29 +5,38 @@ from __future__ import annotations
 import io
 import re
 import subprocess
+import sys
 import tempfile
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import TYPE_CHECKING, Final, Generic, TypeVar, assert_never
+from typing import TYPE_CHECKING, Any, Final, Generic, TypeVar, assert_never
 
 import filetype
 import requests
-import yt_dlp
 from fake_useragent import UserAgent
 from PIL import Image, ImageEnhance, ImageOps
 from PIL.Image import Resampling
-from yt_dlp.utils import UnsupportedError, YoutubeDLError, download_range_func
+from yt_dlp.utils import (
+    UnsupportedError,
+    YoutubeDLError,
+    determine_protocol,
+    download_range_func,
+)
 
-from usdb_syncer import SongId, hooks, subprocessing, utils
+from usdb_syncer import SongId, bandwidth, hooks, subprocessing, utils, ytdl_pool
 from usdb_syncer.constants import YtErrorMsg
 from usdb_syncer.discord import notify_discord
 from usdb_syncer.logger import Logger, song_logger
 from usdb_syncer.postprocessing import normalize_audio
-from usdb_syncer.settings import AudioNormalization, Browser, MaxSize, YtdlpRateLimit
+from usdb_syncer.settings import AudioNormalization, Browser, MaxSize
 from usdb_syncer.utils import video_url_from_resource
+from usdb_syncer.worker_pools import WorkerPool
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from usdb_syncer.cancellation import CancellationToken
     from usdb_syncer.download_options import AudioOptions, VideoOptions
     from usdb_syncer.meta_tags import ImageMetaTags
     from usdb_syncer.usdb_scraper import SongDetails
@@ -49,6 +58,13 @@ FREEZE_NOISE_DB: Final[int] = -80
 FREEZE_DURATION_SECONDS: Final[int] = 1
 FREEZE_RATIO_THRESHOLD: Final[float] = 0.5
 FFMPEG_TIMEOUT_SECONDS: Final[int] = 60
+# keyframes compared to find still images, and their size in pixels per side
+KEYFRAME_SAMPLES: Final[int] = 4
+KEYFRAME_SIZE: Final[int] = 16
+# mean difference of grayscale values (0-255) up to which frames count as equal
+KEYFRAME_MAX_DIFFERENCE: Final[float] = 3.0
+KEYFRAME_TIMEOUT_SECONDS: Final[int] = 20
+AUTO_GENERATED_MARKER: Final[str] = "Auto-generated by YouTube."
 
 YtdlOptions = dict[str, str | bool | tuple | list | int | download_range_func]
 
@@ -144,11 +160,10 @@ def download_audio(
     browser: Browser,
     path_stem: Path,
     logger: Logger,
+    token: CancellationToken | None = None,
 ) -> ResourceDLResult[str]:
     """Download audio from resource to path and process it according to options."""
-    ydl_opts = _ytdl_options(
-        options.ytdl_format(), browser, path_stem, options.rate_limit
-    )
+    ydl_opts = _ytdl_options(options.ytdl_format(), browser, path_stem, token=token)
     if options.normalization in {
         AudioNormalization.DISABLE,
         AudioNormalization.REPLAYGAIN,
@@ -166,7 +181,10 @@ def download_audio(
     if not dl_result.content:
         return dl_result
     if options.normalization is not AudioNormalization.DISABLE:
-        normalize_audio(options, path_stem, dl_result.content)
+        # ffmpeg-normalize's subprocesses cannot be interrupted, so check beforehand
+        if token:
+            token.raise_if_aborted()
+        WorkerPool.FFMPEG.run(normalize_audio, options, path_stem, dl_result.content)
 
     # either way, the resulting file is in target format, so we have to correct the
     # extension before returning dl_result
@@ -180,18 +198,149 @@ def download_video(
     browser: Browser,
     path_stem: Path,
     logger: Logger,
+    token: CancellationToken | None = None,
 ) -> ResourceDLResult[str]:
     """Download video from resource to path and process it according to options."""
-    ydl_opts = _ytdl_options(
-        options.ytdl_format(), browser, path_stem, options.rate_limit
-    )
+    ydl_opts = _ytdl_options(options.ytdl_format(), browser, path_stem, token=token)
     return _download_resource(resource, ydl_opts, logger)
 
 
 def fallback_resource_is_audio_only(
-    options: VideoOptions, url: str, browser: Browser, logger: Logger
-) -> bool:
-    """Check if a video is audio-only using ffmpeg's freezedetect filter."""
+    options: VideoOptions,
+    url: str,
+    browser: Browser,
+    logger: Logger,
+    token: CancellationToken | None = None,
+) -> bool | None:
+    """Check if a video is audio-only, trying cheaper methods first.
+
+    Resources without any video stream are audio-only, and resources whose keyframes
+    change are not. Everything else, including still keyframes and YouTube's art
+    tracks, is confirmed with ffmpeg's freezedetect filter on a downloaded segment.
+    Return None if it could not be determined.
+    """
+    ydl_opts = _ytdl_options(options.ytdl_format(), browser, Path(), token=token)
+    ydl_opts.pop("cookiesfrombrowser", None)
+    if (full_url := video_url_from_resource(url)) is None:
+        return None
+    try:
+        info = ytdl_pool.extract_info(full_url, ydl_opts, cookies=False)
+    except YoutubeDLError:
+        info = None
+    if info is not None:
+        if audio_only_from_metadata(info):
+            logger.debug(f"Commented resource '{url}' has no video streams.")
+            return True
+        # YouTube's art tracks are a single still image, so sampling would not help
+        is_art_track = AUTO_GENERATED_MARKER in (info.get("description") or "")
+        if not is_art_track and _keyframes_differ(info, token):
+            logger.debug(
+                f"Commented resource '{url}' is not audio-only according to its "
+                "keyframes."
+            )
+            return False
+    return _audio_only_from_freezedetect(options, url, browser, logger, token)
+
+
+def audio_only_from_metadata(info: dict[str, Any]) -> bool:
+    """Whether yt-dlp's info lists no video stream for a resource."""
+    formats = info.get("formats") or [info]
+    return all(fmt.get("vcodec") == "none" for fmt in formats)
+
+
+def _keyframes_differ(info: dict[str, Any], token: CancellationToken | None) -> bool:
+    """Compare keyframes spread over the smallest video stream of a resource.
+
+    Only differing keyframes are conclusive, as a video may just as well start with a
+    few still scenes.
+    """
+    if not (stream := keyframe_stream(info)) or not (duration := info.get("duration")):
+        return False
+    frames = []
+    for idx in range(KEYFRAME_SAMPLES):
+        secs = duration * (idx + 1) / (KEYFRAME_SAMPLES + 1)
+        try:
+            frame = WorkerPool.FFMPEG.run(_sample_keyframe, stream, secs, token)
+        except (subprocess.SubprocessError, OSError):
+            return False
+        if frame is None:
+            return False
+        frames.append(frame)
+    return not keyframes_are_static(frames)
+
+
+def keyframe_stream(info: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the smallest video format that ffmpeg can seek in directly.
+
+    `info` is not processed by yt-dlp, so the formats' protocols are not filled in.
+    """
+    streams = [
+        fmt
+        for fmt in info.get("formats") or ()
+        if fmt.get("vcodec") not in (None, "none")
+        and fmt.get("url")
+        and determine_protocol(fmt) in ("http", "https")
+    ]
+    return min(streams, key=lambda fmt: fmt.get("height") or sys.maxsize, default=None)
+
+
+def _sample_keyframe(
+    stream: dict[str, Any], secs: float, token: CancellationToken | None
+) -> bytes | None:
+    """Return the first keyframe after `secs` as a tiny grayscale image."""
+    headers = "".join(
+        f"{key}: {value}\r\n"
+        for key, value in (stream.get("http_headers") or {}).items()
+    )
+    result = subprocessing.run_clean(
+        [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-hide_banner",
+            "-nostdin",
+            "-skip_frame",
+            "nokey",
+            "-ss",
+            f"{secs:.2f}",
+            *(("-headers", headers) if headers else ()),
+            "-i",
+            stream["url"],
+            "-frames:v",
+            "1",
+            "-an",
+            "-vf",
+            f"scale={KEYFRAME_SIZE}:{KEYFRAME_SIZE},format=gray",
+            "-f",
+            "rawvideo",
+            "-",
+        ],
+        token=token,
+        capture_output=True,
+        timeout=KEYFRAME_TIMEOUT_SECONDS,
+    )
+    if result.returncode or len(result.stdout) != KEYFRAME_SIZE**2:
+        return None
+    return result.stdout
+
+
+def keyframes_are_static(frames: list[bytes]) -> bool:
+    """Whether all frames show the same image, allowing for compression noise."""
+    first = frames[0]
+    return all(
+        sum(abs(a - b) for a, b in zip(first, frame, strict=True)) / len(first)
+        <= KEYFRAME_MAX_DIFFERENCE
+        for frame in frames[1:]
+    )
+
+
+def _audio_only_from_freezedetect(
+    options: VideoOptions,
+    url: str,
+    browser: Browser,
+    logger: Logger,
+    token: CancellationToken | None,
+) -> bool | None:
     with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
         temp_video_file = Path(tmp.name)
 
@@ -200,30 +349,34 @@ def fallback_resource_is_audio_only(
             options.ytdl_format(),
             browser,
             temp_video_file,
-            options.rate_limit,
             segment_only=True,
+            token=token,
         )
 
         dl_result = _download_resource(url, ydl_opts, logger)
         if not dl_result.content:
-            return False
+            return None
 
-        freeze_durations = run_freezedetect(temp_video_file)
+        freeze_durations = WorkerPool.FFMPEG.run(
+            run_freezedetect, temp_video_file, token
+        )
         return freeze_ratio_larger_threshold(url, freeze_durations, logger)
 
     except (subprocess.SubprocessError, OSError, ValueError):
         logger.debug(
             f"Failed to analyze commented resource '{url}' for audio-only content."
         )
-        return False
+        return None
 
     finally:
         if temp_video_file.exists():
             temp_video_file.unlink()
 
 
-def run_freezedetect(video_path: Path) -> list[float]:
-    result = subprocess.run(
+def run_freezedetect(
+    video_path: Path, token: CancellationToken | None = None
+) -> list[float]:
+    result = subprocessing.run_clean(
         [
             "ffmpeg",
             "-loglevel",
@@ -242,10 +395,10 @@ def run_freezedetect(video_path: Path) -> list[float]:
             "null",
             "-",
         ],
+        token=token,
         capture_output=True,
         text=True,
         timeout=FFMPEG_TIMEOUT_SECONDS,
-        env=subprocessing.get_env_clean(),
     )
 
     # ffmpeg's freezedetect filter emits results only as log messages, so we
@@ -283,8 +436,8 @@ def _ytdl_options(
     format_: str,
     browser: Browser,
     target_stem: Path,
-    ratelimit: YtdlpRateLimit,
     segment_only: bool = False,
+    token: CancellationToken | None = None,
 ) -> YtdlOptions:
     options: YtdlOptions = {
         "format": format_,
@@ -294,11 +447,14 @@ def _ytdl_options(
         # suppresses download of playlists, channels and search results
         "playlistend": 0,
         "overwrites": True,
+        # the rate limit is enforced for all downloads together instead
+        "progress_hooks": [_progress_hook(token)],
     }
-    if ratelimit.value is not None:
-        options["ratelimit"] = ratelimit.value
     if browser and browser.value:
         options["cookiesfrombrowser"] = (browser.value, None, None, None)
+    if token:
+        # raising from a hook interrupts the postprocessing
+        options["postprocessor_hooks"] = [lambda _status: token.raise_if_aborted()]
     if segment_only:
         options["outtmpl"] = f"{target_stem}"  # includes extension of temp file
         options["download_ranges"] = download_range_func(
@@ -310,6 +466,30 @@ def _ytdl_options(
     return options
 
 
+def _progress_hook(token: CancellationToken | None) -> Callable[[dict[str, Any]], None]:
+    """Return a hook throttling a download to its share of the bandwidth budget.
+
+    Raising from the hook interrupts the download, which is used to abort it.
+    Pausing does not block here, as the connection would time out meanwhile; the
+    song loader pauses between jobs instead.
+    """
+    downloaded: dict[str, int] = {}
+
+    def hook(status: dict[str, Any]) -> None:
+        if status.get("status") == "downloading" and (
+            total := status.get("downloaded_bytes")
+        ):
+            fname = status.get("tmpfilename") or status.get("filename") or ""
+            delta = total - downloaded.get(fname, 0)
+            downloaded[fname] = total
+            if delta > 0:
+                bandwidth.consume(delta, token)
+        if token:
+            token.raise_if_aborted()
+
+    return hook
+
+
 def _download_resource(
     resource: str, options: YtdlOptions, logger: Logger
 ) -> ResourceDLResult[str]:
@@ -319,17 +499,15 @@ def _download_resource(
     options_without_cookies = options.copy()
     options_without_cookies.pop("cookiesfrombrowser", None)
 
-    with yt_dlp.YoutubeDL(options_without_cookies) as ydl:  # pyright: ignore[reportArgumentType]  # yt-dlp expects dynamic params
-        try:
-            filename = ydl.prepare_filename(ydl.extract_info(url))
-            ext = Path(filename).suffix[1:]
-            return ResourceDLResult(content=ext)
-        except UnsupportedError:
-            return ResourceDLResult(error=ResourceDLError(type=DLErrType.UNSUPPORTED))
-        except YoutubeDLError as e:
-            error_message = utils.remove_ansi_codes(str(e))
-            logger.debug(f"Failed to download '{url}': {error_message}")
-            return _handle_youtube_error(url, resource, error_message, options, logger)
+    try:
+        filename = ytdl_pool.download(url, options_without_cookies, cookies=False)
+    except UnsupportedError:
+        return ResourceDLResult(error=ResourceDLError(type=DLErrType.UNSUPPORTED))
+    except YoutubeDLError as e:
+        error_message = utils.remove_ansi_codes(str(e))
+        logger.debug(f"Failed to download '{url}': {error_message}")
+        return _handle_youtube_error(url, resource, error_message, options, logger)
+    return ResourceDLResult(content=Path(filename).suffix[1:])
 
 
 def _handle_youtube_error(
@@ -384,16 +562,13 @@ def _retry_with_cookies(
     url: str, options: YtdlOptions, logger: Logger
 ) -> ResourceDLResult:
     logger.warning("Age-restricted resource. Retrying with cookies ...")
-    with yt_dlp.YoutubeDL(options) as ydl:  # pyright: ignore[reportArgumentType]  # yt-dlp expects dynamic params
-        hooks.GetYtCookies.call(ydl.cookiejar)
-        try:
-            filename = ydl.prepare_filename(ydl.extract_info(url))
-            ext = Path(filename).suffix[1:]
-            return ResourceDLResult[str](content=ext)
-        except YoutubeDLError as re:
-            msg = f"Retry failed: {utils.remove_ansi_codes(str(re))}"
-            logger.error(msg)  # noqa: TRY400
-            raise
+    try:
+        filename = ytdl_pool.download(url, options, cookies=True)
+    except YoutubeDLError as re:
+        msg = f"Retry failed: {utils.remove_ansi_codes(str(re))}"
+        logger.error(msg)  # noqa: TRY400
+        raise
+    return ResourceDLResult[str](content=Path(filename).suffix[1:])
 
 
 def _handle_geo_restriction(url: str, resource: str, logger: Logger) -> None:
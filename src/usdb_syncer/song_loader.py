@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
+import asyncio
 import copy
+import dataclasses
+import enum
 import filecmp
+import hashlib
 import shutil
 import subprocess
-import tempfile
-import time
+import threading
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, wait
 from enum import Enum, member
 from itertools import islice
-from pathlib import Path
 from typing import TYPE_CHECKING, ClassVar, assert_never
 
 import attrs
@@ -26,12 +30,15 @@ from usdb_syncer import (
     errors,
     events,
     hooks,
+    media_store,
     resource_dl,
     settings,
     subprocessing,
+    usdb_async_client,
     usdb_scraper,
     utils,
 )
+from usdb_syncer.cancellation import CancellationToken
 from usdb_syncer.custom_data import CustomData
 from usdb_syncer.db import JobStatus, ResourceKind
 from usdb_syncer.download_options import AudioOptions, VideoOptions
@@ -43,23 +50,57 @@ from usdb_syncer.separation import SeparationManager
 from usdb_syncer.settings import FormatVersion
 from usdb_syncer.song_txt import SongTxt
 from usdb_syncer.sync_meta import Resource, ResourceFile, SyncMeta
+from usdb_syncer.usdb_async_client import AsyncUsdbClient
 from usdb_syncer.usdb_song import DownloadStatus, UsdbSong
 from usdb_syncer.utils import video_url_from_resource
+from usdb_syncer.worker_pools import WorkerPool
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
+    from concurrent.futures import Future
+    from pathlib import Path
 
     from usdb_syncer.logger import Logger
     from usdb_syncer.meta_tags import ImageMetaTags
     from usdb_syncer.usdb_scraper import SongDetails
 
 
+# number of songs whose USDB pages are fetched ahead of the download workers
+PREFETCH_THREADS = 2
+# commented resources tried if the primary one fails
+MAX_FALLBACK_RESOURCES = 10
+
+
+class DownloadPriority(enum.IntEnum):
+    """Origins of download requests, from least to most urgent."""
+
+    AUTO_UPDATE = 0
+    SUBSCRIBED_SEARCH = 1
+    INTERACTIVE = 2
+
+
 class DownloadManager:
-    """Manager for concurrent song downloads."""
+    """Manager for concurrent song downloads.
+
+    Songs first pass through a small pool that fetches their USDB data, so the
+    download workers can spend their time on media downloads. The individual jobs of
+    each song run in the shared pools of `worker_pools`.
+    Queued songs are started by priority, see `_SongLoader.queue_priority()`.
+    Pending downloads are tracked in the database, so that downloads interrupted by
+    quitting or a crash can be resumed on the next start.
+    """
 
     _jobs: ClassVar[dict[SongId, _SongLoader]] = {}
+    _prefetchers: ClassVar[dict[SongId, _UsdbDataPrefetcher]] = {}
+    # jobs that were due to start while paused
+    _parked: ClassVar[dict[SongId, _SongLoader]] = {}
+    # prefetches running on the asynchronous USDB client
+    _async_prefetches: ClassVar[set[Future[None]]] = set()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
     _pause = False
+    _quitting = False
     _pool: QtCore.QThreadPool | None = None
+    _prefetch_pool: QtCore.QThreadPool | None = None
 
     @classmethod
     def download(
@@ -68,7 +109,12 @@ class DownloadManager:
         progress: utils.ProgressProxy,
         *,
         force_redownload: bool = False,
+        priority: DownloadPriority = DownloadPriority.INTERACTIVE,
     ) -> None:
+        """Queue songs for download.
+
+        Songs that are already queued with a lower priority are moved up.
+        """
         progress.reset("Initializing downloads.", maximum=len(songs))
         options = download_options.download_options()
         started = []
@@ -77,15 +123,23 @@ class DownloadManager:
                 for song in songs:
                     if song.sync_meta and song.sync_meta.pinned:
                         continue
-                    if song.song_id in cls._jobs:
-                        cls._jobs[song.song_id].logger.warning("Already downloading!")
+                    if job := cls._jobs.get(song.song_id):
+                        if not cls._promote(job, priority):
+                            job.logger.warning("Already downloading!")
                         continue
                     song.set_status(DownloadStatus.PENDING)
                     cls._jobs[song.song_id] = job = _SongLoader(
                         song, options, force_redownload=force_redownload
                     )
-                    job.pause = cls._pause
-                    cls._threadpool().start(job)
+                    job.token.set_paused(cls._pause)
+                    job.priority = priority
+                    db.upsert_pending_download(song.song_id, priority, force_redownload)
+                    prefetcher = _UsdbDataPrefetcher(job)
+                    with cls._lock:
+                        cls._prefetchers[song.song_id] = prefetcher
+                        cls._prefetch_threadpool().start(
+                            prefetcher, job.queue_priority()
+                        )
                     started.append(song.song_id)
                     progress.increase()
             finally:
@@ -101,30 +155,61 @@ class DownloadManager:
             try:
                 for song in songs:
                     if (job := cls._jobs.get(song)) and shiboken6.isValid(job):
-                        if cls._threadpool().tryTake(job):
+                        if cls._try_take_queued(job):
+                            if not cls._quitting:
+                                job.discard_progress()
                             job.logger.info("Download aborted by user request.")
                             job.song.set_status(job.song.get_resetted_status())
                             changed.append(job.song_id)
                         else:
-                            job.abort = True
+                            job.token.abort()
                     progress.increase()
             finally:
                 if changed:
                     events.SongsChanged(changed).post()
                     events.DownloadsFinished(changed).post()
 
+    @classmethod
+    def resume_interrupted(cls, progress: utils.ProgressProxy) -> None:
+        """Queue downloads that were still pending when the app was last closed."""
+        groups: defaultdict[tuple[int, bool], list[UsdbSong]] = defaultdict(list)
+        for song_id, priority, force_redownload in db.pending_downloads():
+            if song_id not in cls._jobs and (song := UsdbSong.get(song_id)):
+                groups[priority, force_redownload].append(song)
+        for (priority, force_redownload), songs in groups.items():
+            cls.download(
+                songs,
+                progress,
+                force_redownload=force_redownload,
+                priority=DownloadPriority(priority),
+            )
+
     @classmethod
     def set_pause(cls, pause: bool) -> None:
-        cls._pause = pause
-        for job in cls._jobs.values():
-            job.pause = pause
+        with cls._lock:
+            cls._pause = pause
+            for job in cls._jobs.values():
+                job.token.set_paused(pause)
+            if not pause:
+                # under the lock, so requeueing always finds the jobs in some queue
+                for job in cls._parked.values():
+                    cls._threadpool().start(job, job.queue_priority())
+                cls._parked.clear()
 
     @classmethod
     def quit(cls, progress: utils.ProgressProxy) -> None:
         if not cls._pool:
             return
+        # keep the progress of aborted downloads, so they can be resumed
+        cls._quitting = True
         cls.abort(list(cls._jobs), progress)
         progress.reset("Waiting for downloads to stop.")
+        # prefetchers hand their songs over to the download pool
+        if cls._prefetch_pool:
+            cls._prefetch_pool.waitForDone()
+        with cls._lock:
+            async_prefetches = list(cls._async_prefetches)
+        wait(async_prefetches)
         cls._pool.waitForDone()
 
     @classmethod
@@ -136,6 +221,104 @@ class DownloadManager:
             events.DownloadsFinished.subscribe(cls._remove_job)
         return cls._pool
 
+    @classmethod
+    def _prefetch_threadpool(cls) -> QtCore.QThreadPool:
+        if cls._prefetch_pool is None:
+            cls._prefetch_pool = QtCore.QThreadPool()
+            cls._prefetch_pool.setMaxThreadCount(PREFETCH_THREADS)
+        return cls._prefetch_pool
+
+    @classmethod
+    def _try_take_queued(cls, job: _SongLoader) -> bool:
+        """Remove the job from the queue of either pool, unless it has started."""
+        with cls._lock:
+            if cls._parked.pop(job.song_id, None):
+                return True
+            if (
+                (prefetcher := cls._prefetchers.get(job.song_id))
+                and shiboken6.isValid(prefetcher)
+                and cls._prefetch_threadpool().tryTake(prefetcher)
+            ):
+                cls._prefetchers.pop(job.song_id, None)
+                return True
+            return cls._threadpool().tryTake(job)
+
+    @classmethod
+    def _promote(cls, job: _SongLoader, priority: DownloadPriority) -> bool:
+        """Requeue the job with a higher priority, unless it has started."""
+        if priority <= job.priority or not shiboken6.isValid(job):
+            return False
+        old_priority = job.priority
+        # set first, so a job that is about to be queued already uses it
+        job.priority = priority
+        if not cls._requeue(job):
+            job.priority = old_priority
+            return False
+        job.logger.info("Moved up in the download queue.")
+        return True
+
+    @classmethod
+    def _requeue(cls, job: _SongLoader) -> bool:
+        """Queue the job again with its current priority, unless it has started.
+
+        Parked jobs and jobs whose USDB data is being fetched are queued with their
+        current priority later, so there is nothing to do for them.
+        """
+        with cls._lock:
+            if job.song_id in cls._parked:
+                return True
+            if (prefetcher := cls._prefetchers.get(job.song_id)) is not None:
+                # deleted by Qt once its fetch has been handed to the async client
+                if shiboken6.isValid(prefetcher) and cls._prefetch_threadpool().tryTake(
+                    prefetcher
+                ):
+                    cls._prefetch_threadpool().start(prefetcher, job.queue_priority())
+                return True
+            if cls._threadpool().tryTake(job):
+                cls._threadpool().start(job, job.queue_priority())
+                return True
+        return False
+
+    @classmethod
+    def _park(cls, job: _SongLoader) -> bool:
+        """Hold back a job that is due to start while downloads are paused.
+
+        Parked jobs are requeued on resume, so they do not occupy a worker meanwhile.
+        """
+        with cls._lock:
+            if not job.token.paused:
+                return False
+            cls._parked[job.song_id] = job
+        job.logger.debug("Download is paused.")
+        return True
+
+    @classmethod
+    def _repark(cls, job: _SongLoader) -> None:
+        """Park a job that stopped running because it was paused.
+
+        If downloads have been resumed meanwhile, the job is queued again instead.
+        """
+        if not cls._park(job):
+            cls._threadpool().start(job, job.queue_priority())
+
+    @classmethod
+    def _track_async_prefetch(cls, future: Future[None]) -> None:
+        """Keep track of a prefetch on the asynchronous client until it is done."""
+
+        def done(future: Future[None]) -> None:
+            with cls._lock:
+                cls._async_prefetches.discard(future)
+
+        with cls._lock:
+            cls._async_prefetches.add(future)
+        future.add_done_callback(done)
+
+    @classmethod
+    def _start_download(cls, job: _SongLoader) -> None:
+        with cls._lock:
+            cls._prefetchers.pop(job.song_id, None)
+            cls._threadpool().start(job, job.queue_priority())
+
     @classmethod
     def _remove_job(cls, event: events.DownloadsFinished) -> None:
         for song_id in event.song_ids:
@@ -180,6 +363,16 @@ class _Locations:
         """
         return self._path(self._tempdir, file, ext)
 
+    def staging_path(self, kind: ResourceKind) -> Path:
+        """Path to the generic name without extension in a temporary subfolder.
+
+        Every resource kind has its own subfolder, so that concurrent downloads cannot
+        overwrite each other's files.
+        """
+        directory = self._tempdir / kind.value
+        directory.mkdir(exist_ok=True)
+        return directory / self._target.name
+
     def target_path(self, file: str = "", ext: str = "") -> Path:
         """Path to file in the final download directory.
 
@@ -310,6 +503,9 @@ class _Context:
     out: _TempResourceFiles = attrs.field(factory=_TempResourceFiles)
     results: dict[Job, JobStatus] = attrs.field(factory=dict)
     force_redownload: bool = False
+    token: CancellationToken = attrs.field(factory=CancellationToken)
+    # whether commented resources are audio-only, as checked now or before
+    audio_only_verdicts: dict[str, bool] = attrs.field(factory=dict)
 
     def __attrs_post_init__(self) -> None:
         # reuse old resource files unless we acquire new ones later on
@@ -338,16 +534,48 @@ class _Context:
         options: download_options.Options,
         tempdir: Path,
         log: Logger,
+        *,
+        force_redownload: bool = False,
+        usdb_data: tuple[SongDetails, SongTxt] | None = None,
+        token: CancellationToken | None = None,
     ) -> _Context:
         song = copy.deepcopy(song)
-        details, txt = _get_usdb_data(song.song_id, options.txt_options, log)
+        details, txt = usdb_data or _get_usdb_data(
+            song.song_id,
+            options.txt_options,
+            log,
+            # unchanged USDB pages can be reused unless the user forces a redownload
+            usdb_mtime=None if force_redownload else song.usdb_mtime,
+        )
         _update_song_with_usdb_data(song, details, txt)
         paths = _Locations.new(song, options, tempdir)
         if not song.sync_meta:
             song.sync_meta = SyncMeta.new(
                 song.song_id, song.usdb_mtime, paths.target_path().parent, txt.meta_tags
             )
-        return cls(song, details, options, txt, paths, log)
+        return cls(
+            song,
+            details,
+            options,
+            txt,
+            paths,
+            log,
+            force_redownload=force_redownload,
+            token=token or CancellationToken(),
+        )
+
+    def checkpoint_fingerprint(self) -> str:
+        """Identify the USDB version and options that downloaded files depend on."""
+        key = (
+            self.song.usdb_mtime,
+            self.locations.filename(),
+            self.options.browser,
+            self.options.audio_options,
+            self.options.video_options,
+            self.options.cover_options,
+            self.options.background_options,
+        )
+        return hashlib.sha256(repr(key).encode()).hexdigest()
 
     def primary_audio_resource(self) -> str | None:
         """Return the primary audio resource (from meta tags)."""
@@ -380,15 +608,40 @@ class _Context:
 
 
 def _get_usdb_data(
-    song_id: SongId, txt_options: download_options.TxtOptions | None, log: Logger
+    song_id: SongId,
+    txt_options: download_options.TxtOptions | None,
+    log: Logger,
+    usdb_mtime: int | None = None,
+) -> tuple[SongDetails, SongTxt]:
+    details = usdb_scraper.get_usdb_details(song_id, usdb_mtime)
+    log.info(f"Found '{details.artist} - {details.title}' on USDB.")
+    txt_str = usdb_scraper.get_notes(details.song_id, log, usdb_mtime)
+    return details, _parse_usdb_txt(txt_str, details, txt_options, log)
+
+
+async def _get_usdb_data_async(
+    song_id: SongId,
+    txt_options: download_options.TxtOptions | None,
+    log: Logger,
+    usdb_mtime: int | None = None,
 ) -> tuple[SongDetails, SongTxt]:
-    details = usdb_scraper.get_usdb_details(song_id)
+    details = await usdb_async_client.get_usdb_details(song_id, usdb_mtime)
     log.info(f"Found '{details.artist} - {details.title}' on USDB.")
-    txt_str = usdb_scraper.get_notes(details.song_id, log)
+    txt_str = await usdb_async_client.get_notes(details.song_id, log, usdb_mtime)
+    txt = await asyncio.to_thread(_parse_usdb_txt, txt_str, details, txt_options, log)
+    return details, txt
+
+
+def _parse_usdb_txt(
+    txt_str: str,
+    details: SongDetails,
+    txt_options: download_options.TxtOptions | None,
+    log: Logger,
+) -> SongTxt:
     txt = SongTxt.parse(txt_str, log)
     txt.sanitize(txt_options)
     txt.headers.creator = txt.headers.creator or details.uploader or None
-    return details, txt
+    return txt
 
 
 def _update_song_with_usdb_data(
@@ -413,9 +666,6 @@ def _update_song_with_usdb_data(
 class _SongLoader(QtCore.QRunnable):
     """Runnable to create a complete song folder."""
 
-    abort = False
-    pause = False
-
     def __init__(
         self,
         song: UsdbSong,
@@ -424,16 +674,74 @@ class _SongLoader(QtCore.QRunnable):
         force_redownload: bool = False,
     ) -> None:
         super().__init__()
+        # may be requeued after running if paused
+        self.setAutoDelete(False)
         self.song = song
         self.song_id = song.song_id
+        self.token = CancellationToken()
         self.options = options
         self.logger = song_logger(self.song_id)
         self.force_redownload = force_redownload
+        # details and txt fetched ahead of the download, if successful
+        self.usdb_data: tuple[SongDetails, SongTxt] | None = None
+        self.priority = DownloadPriority.INTERACTIVE
+
+    def queue_priority(self) -> int:
+        """Return the priority in the thread pools' queues.
+
+        Songs are ordered by the origin of their request first. Among songs of equal
+        priority, updates of existing songs come first, as they usually only need to
+        fetch a few changed resources and thus finish quickly.
+        """
+        cheap = bool(self.song.sync_meta) and not self.force_redownload
+        return self.priority * 2 + cheap
+
+    def prefetch_usdb_data(self) -> None:
+        """Fetch the song's USDB data before the download starts.
+
+        Errors are not reported here, as the download will try again and handle them.
+        Nothing is fetched while paused, so the prefetch worker is not blocked.
+        """
+        if self.token.paused or self.token.aborted:
+            return
+        try:
+            self.usdb_data = _get_usdb_data(
+                self.song_id,
+                self.options.txt_options,
+                self.logger,
+                usdb_mtime=None if self.force_redownload else self.song.usdb_mtime,
+            )
+        except Exception:  # noqa: BLE001
+            self.logger.debug("Failed to prefetch USDB data.", exc_info=True)
+
+    async def prefetch_usdb_data_async(self) -> None:
+        """Like `prefetch_usdb_data()`, but on the asynchronous client's event loop."""
+        if self.token.paused or self.token.aborted:
+            return
+        try:
+            self.usdb_data = await _get_usdb_data_async(
+                self.song_id,
+                self.options.txt_options,
+                self.logger,
+                usdb_mtime=None if self.force_redownload else self.song.usdb_mtime,
+            )
+        except Exception:  # noqa: BLE001
+            self.logger.debug("Failed to prefetch USDB data.", exc_info=True)
 
     def run(self) -> None:
+        if DownloadManager._park(self):
+            return
         with db.managed_connection(utils.AppPaths.db):
             try:
                 self.song = self._run_inner()
+            except errors.PauseError:
+                with db.transaction():
+                    self.song.set_status(DownloadStatus.PENDING)
+                events.SongsChanged([self.song_id]).post()
+                # jobs may have modified the txt
+                self.usdb_data = None
+                DownloadManager._repark(self)
+                return
             except errors.AbortError:
                 self.logger.info("Download aborted by user request.")
                 status = self.song.get_resetted_status()
@@ -443,6 +751,7 @@ class _SongLoader(QtCore.QRunnable):
             except errors.UsdbNotFoundError:
                 self.logger.error("Song has been deleted from USDB.")  # noqa: TRY400
                 with db.transaction():
+                    self.discard_progress()
                     self.song.delete()
                 if meta := self.song.sync_meta:
                     path = meta.path.parent
@@ -461,52 +770,211 @@ class _SongLoader(QtCore.QRunnable):
                 status = DownloadStatus.SYNCHRONIZED
                 self.logger.info("All done!")
             with db.transaction():
+                # progress of downloads interrupted by quitting is kept to resume them
+                if not (self.token.aborted and DownloadManager._quitting):
+                    self.discard_progress()
                 self.song.upsert()
                 self.song.set_status(status)
         events.SongsChanged([self.song_id]).post()
         events.DownloadsFinished([self.song_id]).post()
 
     def _run_inner(self) -> UsdbSong:
-        self._check_flags()
+        self.token.raise_if_aborted()
         with db.transaction():
             self.song.set_status(DownloadStatus.DOWNLOADING)
         events.SongsChanged([self.song_id]).post()
-        with tempfile.TemporaryDirectory() as tempdir:
-            ctx = _Context.new(self.song, self.options, Path(tempdir), self.logger)
-            ctx.force_redownload = self.force_redownload
-            for job in Job:
-                self._check_flags()
-                self.logger.debug(f"Running job: {job.name}")
-                # Skip jobs if dependencies are unchanged
-                if (deps := job.depends_on()) and not any(
-                    ctx.results.get(dep) is JobStatus.SUCCESS for dep in deps
-                ):
-                    ctx.logger.debug(
-                        f"Skipping {job.name}: all relevant files unchanged."
-                    )
-                    ctx.results[job] = JobStatus.SUCCESS_UNCHANGED
-                    continue
-
-                ctx.results[job] = job(ctx)
-                ctx.logger.debug(f"Job {job.name} result: {ctx.results[job].name}")
-
-            # last chance to abort before irreversible changes
-            self._check_flags()
-            _cleanup_existing_resources(ctx)
-            ctx.locations.move_to_target_folder()
-            _persist_tempfiles(ctx)
+        staging_dir = self._staging_dir()
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        ctx = _Context.new(
+            self.song,
+            self.options,
+            staging_dir,
+            self.logger,
+            force_redownload=self.force_redownload,
+            usdb_data=self.usdb_data,
+            token=self.token,
+        )
+        ctx.audio_only_verdicts = db.audio_only_verdicts(
+            list(islice(ctx.fallback_video_resources(), MAX_FALLBACK_RESOURCES))
+        )
+        self._run_jobs(ctx)
+        with db.transaction():
+            db.upsert_audio_only_verdicts(ctx.audio_only_verdicts)
+        # last chance to abort before irreversible changes
+        self.token.raise_if_aborted()
+        _cleanup_existing_resources(ctx)
+        ctx.locations.move_to_target_folder()
+        _persist_tempfiles(ctx)
         _write_sync_meta(ctx)
         hooks.SongLoaderDidFinish.call(ctx.song)
         return ctx.song
 
-    def _check_flags(self) -> None:
-        if self.abort:
-            raise errors.AbortError
-        if self.pause:
-            while self.pause:
-                time.sleep(0.5)
-                if self.abort:
-                    raise errors.AbortError
+    def _run_jobs(self, ctx: _Context) -> None:
+        """Run every job as soon as all jobs it requires have finished.
+
+        Independent jobs run concurrently in the worker pool of their resource class.
+        Before returning, all started jobs are waited for, even if one of them failed
+        or the download was aborted.
+        While paused, no further jobs are started. Once the running ones have
+        finished, PauseError is raised, so the song can be resumed from its
+        checkpoints later without blocking a worker meanwhile.
+        """
+        restored = self._restore_checkpoints(ctx)
+        pending = [job for job in Job if job not in restored]
+        running: dict[Future[JobStatus], Job] = {}
+
+        def cancel_queued() -> None:
+            # wakes up waiting for results; started jobs are interrupted via the token
+            for future in list(running):
+                future.cancel()
+
+        try:
+            with self.token.on_abort(cancel_queued):
+                while pending or running:
+                    self.token.raise_if_aborted()
+                    if (paused := self.token.paused) and not running:
+                        raise errors.PauseError
+                    started = not paused and self._start_ready_jobs(
+                        ctx, pending, running
+                    )
+                    if not running:
+                        if not started:
+                            # nothing will ever make the remaining jobs ready
+                            self._fail_blocked_jobs(ctx, pending)
+                        # otherwise, skipped jobs may have unblocked others
+                        continue
+                    self._collect_finished_jobs(ctx, running)
+        finally:
+            cancel_queued()
+            wait(running)
+
+    def _start_ready_jobs(
+        self, ctx: _Context, pending: list[Job], running: dict[Future[JobStatus], Job]
+    ) -> bool:
+        """Submit or skip every pending job whose required jobs have finished.
+
+        Return whether there was any such job.
+        """
+        ready = [
+            job
+            for job in pending
+            if all(dep in ctx.results for dep in job.requires(ctx))
+        ]
+        for job in ready:
+            pending.remove(job)
+            # Skip jobs if dependencies are unchanged
+            if (deps := job.depends_on()) and not any(
+                ctx.results[dep] is JobStatus.SUCCESS for dep in deps
+            ):
+                ctx.logger.debug(f"Skipping {job.name}: all relevant files unchanged.")
+                ctx.results[job] = JobStatus.SUCCESS_UNCHANGED
+                continue
+            self.logger.debug(f"Running job: {job.name}")
+            running[job.pool().submit(job, ctx)] = job
+        return bool(ready)
+
+    def _collect_finished_jobs(
+        self, ctx: _Context, running: dict[Future[JobStatus], Job]
+    ) -> None:
+        """Wait for at least one running job to finish and record the results."""
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            job = running.pop(future)
+            try:
+                ctx.results[job] = future.result()
+            except Exception:
+                # interrupted jobs fail in all sorts of ways
+                self.token.raise_if_aborted()
+                raise
+            ctx.logger.debug(f"Job {job.name} result: {ctx.results[job].name}")
+            self._save_checkpoint(ctx, job)
+
+    def _fail_blocked_jobs(self, ctx: _Context, pending: list[Job]) -> None:
+        names = ", ".join(job.name for job in pending)
+        self.logger.error(f"Jobs can never run, as they require each other: {names}")
+        for job in pending:
+            ctx.results[job] = JobStatus.FAILURE
+        pending.clear()
+
+    def _staging_dir(self) -> Path:
+        return utils.AppPaths.download_staging / str(self.song_id)
+
+    def discard_progress(self) -> None:
+        """Forget about this download, including partially downloaded files."""
+        db.delete_pending_download(self.song_id)
+        shutil.rmtree(self._staging_dir(), ignore_errors=True)
+
+    def _save_checkpoint(self, ctx: _Context, job: Job) -> None:
+        if not (files := job.files(ctx.out)) or ctx.results[job] not in (
+            JobStatus.SUCCESS,
+            JobStatus.FALLBACK,
+        ):
+            return
+        with db.transaction():
+            db.upsert_download_checkpoint(
+                self.song_id,
+                job.name,
+                ctx.checkpoint_fingerprint(),
+                ctx.results[job],
+                [(file.resource, file.new_fname) for file in files],
+            )
+
+    def _restore_checkpoints(self, ctx: _Context) -> list[Job]:
+        """Reuse the files of jobs finished in an interrupted earlier attempt."""
+        checkpoints = db.download_checkpoints(
+            self.song_id, ctx.checkpoint_fingerprint()
+        )
+        restored = []
+        for job in Job:
+            if not (checkpoint := checkpoints.get(job.name)) or not all(
+                # the files might have been produced from different inputs otherwise
+                dep in restored
+                for dep in job.requires(ctx)
+            ):
+                continue
+            status, saved = checkpoint
+            files = job.files(ctx.out)
+            if len(saved) != len(files) or not all(
+                fname and ctx.locations.temp_path(fname).is_file() for _, fname in saved
+            ):
+                continue
+            for file, (resource, fname) in zip(files, saved, strict=True):
+                file.resource = resource
+                file.new_fname = fname
+            ctx.results[job] = status
+            restored.append(job)
+            self.logger.info(f"Resuming download; {job.name} is already done.")
+        return restored
+
+
+class _UsdbDataPrefetcher(QtCore.QRunnable):
+    """Runnable to fetch a song's USDB data and then queue its download.
+
+    With the asynchronous client, the data is fetched on its event loop instead, and
+    the prefetch worker is free for the next song right away.
+    """
+
+    def __init__(self, loader: _SongLoader) -> None:
+        super().__init__()
+        self.loader = loader
+
+    def run(self) -> None:
+        if usdb_async_client.is_enabled():
+            DownloadManager._track_async_prefetch(
+                AsyncUsdbClient.submit(self._prefetch_async(self.loader))
+            )
+            return
+        try:
+            self.loader.prefetch_usdb_data()
+        finally:
+            DownloadManager._start_download(self.loader)
+
+    @staticmethod
+    async def _prefetch_async(loader: _SongLoader) -> None:
+        try:
+            await loader.prefetch_usdb_data_async()
+        finally:
+            DownloadManager._start_download(loader)
 
 
 def _maybe_download_audio(ctx: _Context) -> JobStatus:
@@ -515,7 +983,9 @@ def _maybe_download_audio(ctx: _Context) -> JobStatus:
         return JobStatus.SKIPPED_DISABLED
 
     primary_resource = ctx.primary_audio_resource()
-    fallback_resources = list(islice(ctx.fallback_audio_resources(), 10))
+    fallback_resources = list(
+        islice(ctx.fallback_audio_resources(), MAX_FALLBACK_RESOURCES)
+    )
 
     if not primary_resource and not fallback_resources:
         ctx.logger.warning(
@@ -578,14 +1048,16 @@ def _maybe_download_video(ctx: _Context) -> JobStatus:  # noqa: C901
 
     # Song can only be considered audio-only if audio download did not use a fallback
     if (
-        ctx.results[Job.AUDIO_DOWNLOAD] is not JobStatus.FALLBACK
-        and ctx.txt.meta_tags.is_audio_only()
+        ctx.txt.meta_tags.is_audio_only()
+        and ctx.results[Job.AUDIO_DOWNLOAD] is not JobStatus.FALLBACK
     ):
         ctx.logger.info("Song is audio only, skipping download.")
         return JobStatus.SKIPPED_UNAVAILABLE
 
     primary_resource = ctx.primary_video_resource()
-    fallback_resources = list(islice(ctx.fallback_video_resources(), 10))
+    fallback_resources = list(
+        islice(ctx.fallback_video_resources(), MAX_FALLBACK_RESOURCES)
+    )
 
     if not primary_resource and not fallback_resources:
         ctx.logger.warning(
@@ -615,9 +1087,7 @@ def _maybe_download_video(ctx: _Context) -> JobStatus:  # noqa: C901
             return JobStatus.SUCCESS
 
     for fallback_resource in fallback_resources:
-        if resource_dl.fallback_resource_is_audio_only(
-            options, fallback_resource, ctx.options.browser, ctx.logger
-        ):
+        if _fallback_is_audio_only(ctx, options, fallback_resource):
             return JobStatus.SKIPPED_UNAVAILABLE
         status = _try_download_audio_or_video(ctx, fallback_resource, options)
         if status is JobStatus.SUCCESS:
@@ -630,6 +1100,23 @@ def _maybe_download_video(ctx: _Context) -> JobStatus:  # noqa: C901
     return _handle_video_failure(ctx)
 
 
+def _fallback_is_audio_only(
+    ctx: _Context, options: VideoOptions, resource: str
+) -> bool:
+    if (verdict := ctx.audio_only_verdicts.get(resource)) is not None:
+        ctx.logger.debug(
+            f"Commented resource '{resource}' is known to be "
+            f"{'audio-only' if verdict else 'a video'}."
+        )
+        return verdict
+    verdict = resource_dl.fallback_resource_is_audio_only(
+        options, resource, ctx.options.browser, ctx.logger, ctx.token
+    )
+    if verdict is not None:
+        ctx.audio_only_verdicts[resource] = verdict
+    return bool(verdict)
+
+
 def _handle_video_failure(ctx: _Context) -> JobStatus:
     failure_msg = "Failed to download video."
     if ctx.out.video.resource:
@@ -643,28 +1130,50 @@ def _handle_video_failure(ctx: _Context) -> JobStatus:
 def _try_download_audio_or_video(
     ctx: _Context, resource: str, options: AudioOptions | VideoOptions
 ) -> JobStatus:
-    if isinstance(options, AudioOptions):
-        kind = ResourceKind.AUDIO
-        target = ctx.out.audio
-        dl_result = resource_dl.download_audio(
-            resource,
-            options,
-            ctx.options.browser,
-            ctx.locations.temp_path(),
-            ctx.logger,
-        )
-    elif isinstance(options, VideoOptions):
-        kind = ResourceKind.VIDEO
-        target = ctx.out.video
-        dl_result = resource_dl.download_video(
-            resource,
-            options,
-            ctx.options.browser,
-            ctx.locations.temp_path(),
-            ctx.logger,
-        )
+    kind = (
+        ResourceKind.AUDIO if isinstance(options, AudioOptions) else ResourceKind.VIDEO
+    )
+    target = ctx.out.audio if kind is ResourceKind.AUDIO else ctx.out.video
+    if (
+        isinstance(options, VideoOptions)
+        and ctx.options.audio_options
+        and resource == ctx.primary_audio_resource()
+    ):
+        # the audio job downloads the audio stream of the same resource
+        options = dataclasses.replace(options, video_only=True)
+    path_stem = ctx.locations.staging_path(kind)
+    key = media_store.content_key(resource, options)
+    with media_store.reserve(key, ctx.token):
+        if path := media_store.fetch(key, path_stem):
+            ctx.logger.info(f"Reusing {kind} '{resource}' downloaded for another song.")
+            dl_result = resource_dl.ResourceDLResult(path.suffix.removeprefix("."))
+        else:
+            if isinstance(options, AudioOptions):
+                dl_result = resource_dl.download_audio(
+                    resource,
+                    options,
+                    ctx.options.browser,
+                    path_stem,
+                    ctx.logger,
+                    ctx.token,
+                )
+            else:
+                dl_result = resource_dl.download_video(
+                    resource,
+                    options,
+                    ctx.options.browser,
+                    path_stem,
+                    ctx.logger,
+                    ctx.token,
+                )
+            if ext := dl_result.content:
+                media_store.add(key, path_stem.with_name(f"{path_stem.name}.{ext}"))
 
     if ext := dl_result.content:
+        shutil.move(
+            path_stem.with_name(f"{path_stem.name}.{ext}"),
+            ctx.locations.temp_path(ext=ext),
+        )
         target.resource = resource
         target.new_fname = ctx.locations.filename(ext=ext)
         return JobStatus.SUCCESS
@@ -713,11 +1222,12 @@ def _maybe_separate_stems(ctx: _Context) -> JobStatus:
     ctx.logger.info("Separating stems.")
     manager = SeparationManager([ctx.options.audio_options.separation_executable])
     try:
-        vocals_path, instrumental_path = manager.split(
-            audio_file,
-            ctx.locations.temp_path(),
-            ctx.options.audio_options.separation_model,
-        )
+        with ctx.token.on_abort(manager.close):
+            vocals_path, instrumental_path = manager.split(
+                audio_file,
+                ctx.locations.temp_path(),
+                ctx.options.audio_options.separation_model,
+            )
     except errors.JsonRpcError as e:
         ctx.logger.exception(
             f"Failed to separate stems. Provider error code {e.code}. See log for details."
@@ -734,11 +1244,21 @@ def _maybe_separate_stems(ctx: _Context) -> JobStatus:
     instrumental_out_path = ctx.locations.temp_path(
         ext=f" [INSTR].{ctx.options.audio_options.format.value}"
     )
-    if not transcode_audio(ctx.options.audio_options, vocals_path, vocals_out_path):
+    if not WorkerPool.FFMPEG.run(
+        transcode_audio,
+        ctx.options.audio_options,
+        vocals_path,
+        vocals_out_path,
+        ctx.token,
+    ):
         ctx.logger.error("Failed to transcode vocals.")
         return _handle_separation_failure(ctx)
-    if not transcode_audio(
-        ctx.options.audio_options, instrumental_path, instrumental_out_path
+    if not WorkerPool.FFMPEG.run(
+        transcode_audio,
+        ctx.options.audio_options,
+        instrumental_path,
+        instrumental_out_path,
+        ctx.token,
     ):
         ctx.logger.error("Failed to transcode instrumental.")
         return _handle_separation_failure(ctx)
@@ -761,7 +1281,10 @@ def _handle_separation_failure(ctx: _Context) -> JobStatus:
 
 
 def transcode_audio(
-    audio_options: download_options.AudioOptions, src: Path, dest: Path
+    audio_options: download_options.AudioOptions,
+    src: Path,
+    dest: Path,
+    token: CancellationToken | None = None,
 ) -> bool:
     cmd = [
         "ffmpeg",
@@ -774,7 +1297,7 @@ def transcode_audio(
         str(dest),
     ]
     out = subprocessing.run_clean(
-        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        cmd, token, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
     )
     return out.returncode == 0
 
@@ -1071,6 +1594,8 @@ def _maybe_write_audio_tags(ctx: _Context) -> JobStatus:
     ):
         ctx.logger.info("No audio file to tag, skipping writing audio tags.")
         return JobStatus.SKIPPED_UNAVAILABLE
+    # the file may be linked to the media store
+    media_store.unshare(audio_path_resource[0])
     cover_path_resource = ctx.out.cover.path_and_resource(ctx.locations, temp=True)
     background_path_resource = ctx.out.background.path_and_resource(
         ctx.locations, temp=True
@@ -1096,6 +1621,8 @@ def _maybe_write_video_tags(ctx: _Context) -> JobStatus:
     ):
         ctx.logger.info("No video file to tag, skipping writing video tags.")
         return JobStatus.SKIPPED_UNAVAILABLE
+    # the file may be linked to the media store
+    media_store.unshare(video_path_resource[0])
     cover_path_resource = ctx.out.cover.path_and_resource(ctx.locations, temp=True)
     background_path_resource = ctx.out.background.path_and_resource(
         ctx.locations, temp=True
@@ -1198,7 +1725,10 @@ def _write_sync_meta(ctx: _Context) -> None:
 
 
 class Job(Enum):
-    """All jobs in the song download pipeline, in logical order."""
+    """All jobs in the song download pipeline, in logical order.
+
+    Jobs may run concurrently, as permitted by `requires()`.
+    """
 
     AUDIO_DOWNLOAD = member(_maybe_download_audio)
     SEPARATE_STEMS = member(_maybe_separate_stems)
@@ -1213,7 +1743,76 @@ class Job(Enum):
     def __call__(self, ctx: _Context) -> JobStatus:
         return self.value(ctx)
 
+    def requires(self, ctx: _Context) -> tuple[Job, ...]:
+        """Jobs that must have finished before this one can run."""
+        match self:
+            case Job.AUDIO_DOWNLOAD | Job.COVER_DOWNLOAD:
+                return ()
+            case Job.SEPARATE_STEMS:
+                return (Job.AUDIO_DOWNLOAD,)
+            case Job.VIDEO_DOWNLOAD:
+                # the audio result tells if an audio-only song needs a video after all
+                if ctx.txt.meta_tags.is_audio_only():
+                    return (Job.AUDIO_DOWNLOAD,)
+                return ()
+            case Job.BACKGROUND_DOWNLOAD:
+                # the background may only be wanted if there is no video
+                if (
+                    options := ctx.options.background_options
+                ) and not options.even_with_video:
+                    return (Job.VIDEO_DOWNLOAD,)
+                return ()
+            case Job.TXT_WRITTEN:
+                return (
+                    Job.AUDIO_DOWNLOAD,
+                    Job.SEPARATE_STEMS,
+                    Job.VIDEO_DOWNLOAD,
+                    Job.COVER_DOWNLOAD,
+                    Job.BACKGROUND_DOWNLOAD,
+                )
+            case Job.WRITE_AUDIO_TAGS | Job.WRITE_VIDEO_TAGS:
+                return (Job.TXT_WRITTEN, *self.depends_on())
+            case _ as unreachable:
+                assert_never(unreachable)
+
+    def files(self, out: _TempResourceFiles) -> tuple[_TempResourceFile, ...]:
+        """Return the files this job produces, if it is worth resuming."""
+        match self:
+            case Job.AUDIO_DOWNLOAD:
+                return (out.audio,)
+            case Job.SEPARATE_STEMS:
+                return (out.vocals, out.instrumental)
+            case Job.VIDEO_DOWNLOAD:
+                return (out.video,)
+            case Job.COVER_DOWNLOAD:
+                return (out.cover,)
+            case Job.BACKGROUND_DOWNLOAD:
+                return (out.background,)
+            case Job.TXT_WRITTEN | Job.WRITE_AUDIO_TAGS | Job.WRITE_VIDEO_TAGS:
+                # cheap, and they depend on all other jobs
+                return ()
+            case _ as unreachable:
+                assert_never(unreachable)
+
+    def pool(self) -> WorkerPool:
+        """Return the worker pool for the resource this job is mostly bound by."""
+        match self:
+            case (
+                Job.AUDIO_DOWNLOAD
+                | Job.VIDEO_DOWNLOAD
+                | Job.COVER_DOWNLOAD
+                | Job.BACKGROUND_DOWNLOAD
+            ):
+                return WorkerPool.NETWORK
+            case Job.SEPARATE_STEMS:
+                return WorkerPool.SEPARATION
+            case Job.TXT_WRITTEN | Job.WRITE_AUDIO_TAGS | Job.WRITE_VIDEO_TAGS:
+                return WorkerPool.IO
+            case _ as unreachable:
+                assert_never(unreachable)
+
     def depends_on(self) -> tuple[Job, ...]:
+        """Jobs of which at least one must have changed files for this one to run."""
         match self:
             case Job.WRITE_AUDIO_TAGS | Job.WRITE_VIDEO_TAGS:
                 return (
@@ -25,13 +25,13 @@ from usdb_syncer import (
     utils,
 )
 from usdb_syncer.logger import error_logger, logger
-from usdb_syncer.song_loader import DownloadManager
+from usdb_syncer.song_loader import DownloadManager, DownloadPriority
 from usdb_syncer.sync_meta import SyncMeta
 from usdb_syncer.usdb_song import UsdbSong, UsdbSongEncoder
 from usdb_syncer.utils import AppPaths
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Generator, Iterable
     from importlib.resources.abc import Traversable
 
 
@@ -76,11 +76,14 @@ def load_available_songs(
             last = db.LastUsdbUpdate.get()
     try:
         if last.is_zero():
-            songs = usdb_scraper.get_all_songs_from_usdb(progress, session=session)
+            batches = usdb_scraper.get_all_songs_from_usdb_batched(
+                progress, session=session
+            )
         else:
-            songs = usdb_scraper.get_updated_songs_from_usdb(
+            batches = usdb_scraper.get_updated_songs_from_usdb_batched(
                 last, progress, session=session
             )
+        fetched = _ingest_song_batches(batches)
     except errors.UsdbLoginError:
         logger.debug("Skipping fetching new songs as there is no login.")
         result.no_usdb_login = True
@@ -88,18 +91,31 @@ def load_available_songs(
         logger.exception("Failed to fetch new songs; check network connection.")
         result.no_connection = True
     else:
-        progress.reset("Writing USDB songs to database.")
         result.synced_with_usdb = True
-        if songs:
-            UsdbSong.upsert_many(songs)
-            result.new_songs.update(s.song_id for s in songs)
+        if fetched:
+            result.new_songs.update(fetched)
             if force_reload:
+                progress.reset("Deleting songs removed from USDB.")
                 UsdbSong.delete_many(
                     [i for i in db.all_song_ids() if i not in result.new_songs]
                 )
     return result
 
 
+def _ingest_song_batches(batches: Iterable[list[UsdbSong]]) -> set[SongId]:
+    """Write batches of songs to the database as they arrive from USDB.
+
+    The next pages are downloaded while a batch is written. All batches are rolled
+    back if fetching fails midway, so the last update time stays consistent.
+    """
+    song_ids: set[SongId] = set()
+    with db.savepoint("ingest_usdb_songs"):
+        for batch in batches:
+            UsdbSong.upsert_many(batch, cache=False)
+            song_ids.update(s.song_id for s in batch)
+    return song_ids
+
+
 def _get_default_search_song_ids() -> set[SongId]:
     return set(
         *chain(
@@ -115,14 +131,18 @@ def initialize_auto_downloads(
 ) -> None:
     if not utils.ffmpeg_is_available():
         return
-    download_ids = _get_default_search_song_ids().intersection(updates)
+    DownloadManager.resume_interrupted(progress)
+    subscribed_ids = _get_default_search_song_ids().intersection(updates)
+    outdated_ids: set[SongId] = set()
     if settings.get_auto_update():
         search = db.SearchBuilder(statuses=[db.DownloadStatus.OUTDATED])
-        download_ids.update(db.search_usdb_songs(search))
-    songs = [s for i in download_ids if (s := UsdbSong.get(i))]
-    if not songs:
-        return
-    DownloadManager.download(songs, progress)
+        outdated_ids.update(db.search_usdb_songs(search))
+    for ids, priority in (
+        (subscribed_ids, DownloadPriority.SUBSCRIBED_SEARCH),
+        (outdated_ids - subscribed_ids, DownloadPriority.AUTO_UPDATE),
+    ):
+        if songs := UsdbSong.get_many(ids):
+            DownloadManager.download(songs, progress, priority=priority)
 
 
 def load_cached_songs() -> list[UsdbSong] | None:
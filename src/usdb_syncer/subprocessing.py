@@ -14,15 +14,35 @@ from usdb_syncer import constants
 if TYPE_CHECKING:
     from collections.abc import Iterator
 
+    from usdb_syncer.cancellation import CancellationToken
+
 APPLY_CLEAN_ENV = constants.IS_BUNDLE and sys.platform == "linux"
 
 BAD_ENVS = ["LD_LIBRARY_PATH", "QT_PLUGIN_PATH", "QT_QPA_PLATFORM_PLUGIN_PATH"]
 
 
-def run_clean(command: list[str], **kwargs: Any) -> subprocess.CompletedProcess:
-    """Run a command with a cleaned environment."""
+def run_clean(
+    command: list[str], token: CancellationToken | None = None, **kwargs: Any
+) -> subprocess.CompletedProcess:
+    """Run a command with a cleaned environment.
+
+    If a token is given, the process is killed as soon as the token is aborted, and
+    AbortError is raised.
+    """
     kwargs.pop("env", None)
-    return subprocess.run(command, env=get_env_clean(), **kwargs)
+    if token is None:
+        return subprocess.run(command, env=get_env_clean(), **kwargs)
+    timeout = kwargs.pop("timeout", None)
+    if kwargs.pop("capture_output", False):
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    with popen_clean(command, **kwargs) as process, token.on_abort(process.kill):
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            raise
+    token.raise_if_aborted()
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
 
 
 def popen_clean(command: list[str], **kwargs: Any) -> subprocess.Popen:
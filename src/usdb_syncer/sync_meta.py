@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import sys
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
@@ -38,7 +39,8 @@ class ResourceFile:
 
     fname: str
     mtime: int
-    resource: str
+    # often shared by the audio and video of a song
+    resource: str = attrs.field(converter=sys.intern)
     _is_in_sync: bool | None = None
 
     @classmethod
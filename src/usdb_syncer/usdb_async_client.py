@@ -0,0 +1,242 @@
+"""Optional asyncio backend for requests to USDB.
+
+The coroutines mirror their counterparts in `usdb_scraper`, but all of them run on a
+single event loop thread, so hundreds of concurrent fetches do not require hundreds
+of threads. Blocking work like parsing, cache access and logging in is done in
+worker threads, so it does not hold up the event loop.
+The login is still handled by the synchronous `SessionManager`, whose cookies are
+shared with the asynchronous session.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any, ClassVar, TypeVar
+
+from curl_cffi import requests as curl_requests
+
+from usdb_syncer import errors
+from usdb_syncer.constants import Usdb
+from usdb_syncer.logger import logger
+from usdb_syncer.usdb_page_cache import UsdbPageCache, UsdbPageKind
+from usdb_syncer.usdb_scraper import (
+    USDB_SCHEDULER,
+    RequestMethod,
+    SessionManager,
+    parse_song_page_html,
+    parse_song_txt_from_html,
+    preprocess_usdb_page,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Coroutine
+    from concurrent.futures import Future
+
+    from requests import Session
+
+    from usdb_syncer import SongId
+    from usdb_syncer.logger import Logger
+    from usdb_syncer.usdb_scraper import SongDetails
+
+    _AsyncSession = curl_requests.AsyncSession[curl_requests.Response]
+
+# upper bound for simultaneous connections; the request rate is limited separately
+MAX_IN_FLIGHT = 64
+T = TypeVar("T")
+
+
+class _ClientOptions:
+    enabled: bool = False
+
+
+def set_enabled(enabled: bool) -> None:
+    """Prefetch USDB data for downloads with the asynchronous client.
+
+    This needs a single thread for any number of songs, but is still experimental.
+    """
+    _ClientOptions.enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _ClientOptions.enabled
+
+
+class AsyncUsdbClient:
+    """Singleton owning the event loop thread that all coroutines run on."""
+
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _loop: ClassVar[asyncio.AbstractEventLoop | None] = None
+
+    @classmethod
+    def submit(cls, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """Schedule a coroutine on the event loop thread from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, cls._event_loop())
+
+    @classmethod
+    def run(cls, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the event loop thread and wait for its result."""
+        return cls.submit(coro).result()
+
+    @classmethod
+    def _event_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="usdb_async_client", daemon=True
+                ).start()
+                cls._loop = loop
+            return cls._loop
+
+
+class _LoopState:
+    """State that is only accessed from the event loop thread."""
+
+    session: _AsyncSession | None = None
+    # the synchronous session whose cookies `session` uses
+    source: Session | None = None
+    lock: asyncio.Lock | None = None
+    in_flight: asyncio.Semaphore | None = None
+
+
+async def _session(expired: _AsyncSession | None = None) -> _AsyncSession:
+    """Return an asynchronous session, logging in first if necessary.
+
+    If `expired` is still the current session, a new login is enforced.
+    """
+    if _LoopState.lock is None:
+        _LoopState.lock = asyncio.Lock()
+    async with _LoopState.lock:
+        if expired is not None and expired is _LoopState.session:
+            await asyncio.to_thread(
+                SessionManager.reset_session, expired=_LoopState.source
+            )
+        source = await asyncio.to_thread(SessionManager.session)
+        if _LoopState.session is None or source is not _LoopState.source:
+            if _LoopState.session is not None:
+                await _LoopState.session.close()
+            session: _AsyncSession = curl_requests.AsyncSession(
+                max_clients=MAX_IN_FLIGHT
+            )
+            for cookie in source.cookies:
+                session.cookies.jar.set_cookie(cookie)
+            _LoopState.session = session
+            _LoopState.source = source
+        return _LoopState.session
+
+
+async def get_usdb_page(
+    rel_url: str,
+    method: RequestMethod = RequestMethod.GET,
+    *,
+    headers: dict[str, str] | None = None,
+    payload: dict[str, str] | None = None,
+    params: dict[str, str] | None = None,
+) -> str:
+    """Retrieve HTML subpage from USDB."""
+    existing_session = SessionManager.has_session()
+    session = await _session()
+    try:
+        return await _get_usdb_page_inner(
+            session, rel_url, method, headers=headers, payload=payload, params=params
+        )
+    except errors.UsdbLoginError:
+        # skip login retry if just created session
+        if not existing_session:
+            raise
+        logger.debug(f"Page '{rel_url}' is private; trying to log in ...")
+    session = await _session(expired=session)
+    return await _get_usdb_page_inner(
+        session, rel_url, method, headers=headers, payload=payload, params=params
+    )
+
+
+async def _get_usdb_page_inner(
+    session: _AsyncSession,
+    rel_url: str,
+    method: RequestMethod,
+    *,
+    headers: dict[str, str] | None,
+    payload: dict[str, str] | None,
+    params: dict[str, str] | None,
+) -> str:
+    if _LoopState.in_flight is None:
+        _LoopState.in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    async with _LoopState.in_flight:
+        response = await USDB_SCHEDULER.send_async(
+            lambda: session.request(
+                method.value,
+                Usdb.BASE_URL + rel_url,
+                headers=headers,
+                data=payload,
+                params=params,
+                timeout=10,
+            ),
+            method.value,
+            retry_on=(
+                curl_requests.exceptions.ConnectionError,
+                curl_requests.exceptions.Timeout,
+            ),
+        )
+    response.raise_for_status()
+    return await asyncio.to_thread(
+        preprocess_usdb_page, response.content.decode("utf-8", errors="replace")
+    )
+
+
+async def get_usdb_details(
+    song_id: SongId, usdb_mtime: int | None = None
+) -> SongDetails:
+    """Retrieve song details from usdb webpage, if song exists.
+
+    If `usdb_mtime` is given, the page may be served from the persistent cache.
+    """
+
+    def fetch() -> Awaitable[str]:
+        logger.debug(f"Getting USDB details page of {song_id}.")
+        return get_usdb_page(
+            "index.php", params={"id": str(int(song_id)), "link": "detail"}
+        )
+
+    html = await _get_cached(UsdbPageKind.DETAILS, song_id, usdb_mtime, fetch)
+    return await asyncio.to_thread(parse_song_page_html, html, song_id)
+
+
+async def get_notes(
+    song_id: SongId, logger: Logger, usdb_mtime: int | None = None
+) -> str:
+    """Retrieve notes for a song.
+
+    If `usdb_mtime` is given, the page may be served from the persistent cache.
+    """
+
+    def fetch() -> Awaitable[str]:
+        logger.debug("fetching notes")
+        return get_usdb_page(
+            "index.php",
+            RequestMethod.POST,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            params={"link": "gettxt", "id": str(int(song_id))},
+            payload={"wd": "1"},
+        )
+
+    html = await _get_cached(UsdbPageKind.TXT, song_id, usdb_mtime, fetch)
+    return await asyncio.to_thread(parse_song_txt_from_html, html)
+
+
+async def _get_cached(
+    kind: UsdbPageKind,
+    song_id: SongId,
+    usdb_mtime: int | None,
+    fetch: Callable[[], Awaitable[str]],
+) -> str:
+    if usdb_mtime is None:
+        return await fetch()
+    page = await asyncio.to_thread(UsdbPageCache.get, kind, song_id, usdb_mtime)
+    if page is not None:
+        logger.debug(f"Using cached USDB {kind.value} page of {song_id}.")
+        return page
+    page = await fetch()
+    await asyncio.to_thread(UsdbPageCache.put, kind, song_id, usdb_mtime, page)
+    return page
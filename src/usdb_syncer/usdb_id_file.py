@@ -292,8 +292,9 @@ def get_available_song_ids_from_files(file_list: list[Path]) -> list[SongId]:
         f"found {len(unique_song_ids)} "
         f"USDB IDs: {', '.join(str(id_) for id_ in unique_song_ids)}"
     )
+    available = {song.song_id for song in UsdbSong.get_many(unique_song_ids)}
     if unavailable_song_ids := [
-        song_id for song_id in unique_song_ids if not UsdbSong.get(song_id)
+        song_id for song_id in unique_song_ids if song_id not in available
     ]:
         logger.warning(
             f"{len(unavailable_song_ids)}/{len(unique_song_ids)} "
@@ -0,0 +1,148 @@
+"""Persistent cache for USDB pages that only change with a song's last change date."""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import TYPE_CHECKING, ClassVar
+
+from usdb_syncer.logger import logger
+from usdb_syncer.utils import AppPaths
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from usdb_syncer import SongId
+
+MAX_CACHE_SIZE_BYTES = 200 * 1024 * 1024
+# comments and views change without a new last change date
+DETAILS_MAX_AGE_SECS = 24 * 60 * 60
+
+
+class UsdbPageKind(Enum):
+    """Kinds of cached USDB pages."""
+
+    DETAILS = "details"
+    TXT = "txt"
+
+
+class UsdbPageCache:
+    """Size-bounded LRU cache of USDB pages on disk.
+
+    Entries are keyed by song id and USDB last change time, so they never have to be
+    invalidated explicitly. Recency is persisted via the files' mtimes.
+    Details pages are the exception, as new comments do not change the last change
+    time. They expire after `DETAILS_MAX_AGE_SECS`, so their mtimes are kept as the
+    time they were fetched.
+    """
+
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    # file names from least to most recently used, with their sizes
+    _index: ClassVar[OrderedDict[str, int] | None] = None
+    _size: ClassVar[int] = 0
+
+    @classmethod
+    def get_or_fetch(
+        cls,
+        kind: UsdbPageKind,
+        song_id: SongId,
+        usdb_mtime: int,
+        fetch: Callable[[], str],
+    ) -> str:
+        """Return the cached page or fetch and cache it."""
+        if (page := cls.get(kind, song_id, usdb_mtime)) is not None:
+            logger.debug(f"Using cached USDB {kind.value} page of {song_id}.")
+            return page
+        page = fetch()
+        cls.put(kind, song_id, usdb_mtime, page)
+        return page
+
+    @classmethod
+    def get(cls, kind: UsdbPageKind, song_id: SongId, usdb_mtime: int) -> str | None:
+        name = _file_name(kind, song_id, usdb_mtime)
+        with cls._lock:
+            index = cls._load_index()
+            if name not in index:
+                return None
+            path = cls._directory() / name
+            try:
+                if kind is UsdbPageKind.DETAILS:
+                    if time.time() - path.stat().st_mtime > DETAILS_MAX_AGE_SECS:
+                        cls._remove(name)
+                        return None
+                else:
+                    os.utime(path)
+                page = path.read_text(encoding="utf-8")
+            except OSError:
+                cls._remove(name)
+                return None
+            index.move_to_end(name)
+        return page
+
+    @classmethod
+    def put(
+        cls, kind: UsdbPageKind, song_id: SongId, usdb_mtime: int, page: str
+    ) -> None:
+        name = _file_name(kind, song_id, usdb_mtime)
+        data = page.encode("utf-8")
+        with cls._lock:
+            index = cls._load_index()
+            # older versions of the same page will never be requested again
+            prefix = _file_prefix(kind, song_id)
+            for outdated in [n for n in index if n.startswith(prefix)]:
+                cls._remove(outdated)
+            try:
+                cls._directory().mkdir(parents=True, exist_ok=True)
+                (cls._directory() / name).write_bytes(data)
+            except OSError:
+                logger.debug(f"Failed to cache USDB {kind.value} page of {song_id}.")
+                return
+            index[name] = len(data)
+            cls._size += len(data)
+            while cls._size > MAX_CACHE_SIZE_BYTES and len(index) > 1:
+                cls._remove(next(iter(index)))
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            for name in list(cls._load_index()):
+                cls._remove(name)
+
+    @classmethod
+    def _directory(cls) -> Path:
+        return AppPaths.usdb_page_cache
+
+    @classmethod
+    def _load_index(cls) -> OrderedDict[str, int]:
+        if cls._index is None:
+            entries = []
+            if cls._directory().is_dir():
+                with os.scandir(cls._directory()) as dir_entries:
+                    entries = [
+                        (stat.st_mtime, entry.name, stat.st_size)
+                        for entry in dir_entries
+                        if entry.is_file() and (stat := entry.stat())
+                    ]
+            entries.sort()
+            cls._index = OrderedDict((name, size) for _, name, size in entries)
+            cls._size = sum(cls._index.values())
+        return cls._index
+
+    @classmethod
+    def _remove(cls, name: str) -> None:
+        cls._size -= cls._load_index().pop(name, 0)
+        with contextlib.suppress(OSError):
+            (cls._directory() / name).unlink(missing_ok=True)
+
+
+def _file_prefix(kind: UsdbPageKind, song_id: SongId) -> str:
+    return f"{kind.value}_{song_id:d}_"
+
+
+def _file_name(kind: UsdbPageKind, song_id: SongId, usdb_mtime: int) -> str:
+    return f"{_file_prefix(kind, song_id)}{usdb_mtime}.html"
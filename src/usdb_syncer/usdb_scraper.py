@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
+import functools
 import html
+import os
 import re
-import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+from itertools import chain, islice
 from typing import TYPE_CHECKING, Any, assert_never
 
 import attrs
-import requests
+import lxml.html
 from bs4 import BeautifulSoup, NavigableString, Tag
 from requests import Session
+from requests.adapters import HTTPAdapter
 
 from usdb_syncer import SongId, db, errors, events, hooks, settings, utils
 from usdb_syncer.constants import (
@@ -25,13 +31,28 @@ from usdb_syncer.constants import (
     UsdbStringsGerman,
 )
 from usdb_syncer.logger import Logger, logger, song_logger
+from usdb_syncer.request_scheduler import (
+    RequestScheduler,
+    RequestSchedulerStats,
+    ScheduledHTTPAdapter,
+)
+from usdb_syncer.usdb_page_cache import UsdbPageCache, UsdbPageKind
 from usdb_syncer.usdb_song import UsdbSong
 from usdb_syncer.utils import extract_youtube_id, normalize
 
 if TYPE_CHECKING:
     from collections.abc import Generator, Iterator
+    from concurrent.futures import Future
+
+    from lxml.html import HtmlElement
 
 N_USDB_SONGS_APPROX = 30_000
+# number of song list pages requested in parallel when fetching the whole catalogue
+SONG_LIST_CONCURRENCY = 4
+# number of songs requested to check for updates before fetching full pages
+UPDATE_PROBE_SIZE = 10
+# shared by all requests to USDB, synchronous or asynchronous
+USDB_SCHEDULER = RequestScheduler("USDB")
 
 
 class UserRole(Enum):
@@ -65,21 +86,24 @@ class UsdbUser:
         return cls(name=name, role=role)
 
 
+# contents of a table cell, written as an unrolled loop, which is much faster than a
+# lazy `.*?`, especially for the first cell, which holds large inline SVGs
+_CELL = r"[^<]*(?:<(?!/td>)[^<]*)*"
 SONG_LIST_ROW_REGEX = re.compile(
     r'<tr class="list_tr\d"\s+data-songid="(?P<song_id>\d+)"\s+'
-    r'data-lastchange="(?P<lastchange>\d+)"[^>]*?>\s*'
-    r'<td(?:.*?<source src="(?P<sample_url>.*?)".*?)?></td>'
-    r'<td[^>]*?><img src="(?P<cover_url>.*?)".*?></td>'
-    r"<td[^>]*?>(?P<artist>.*?)</td>\n"
-    r"<td[^>]*?><a href=.*?>(?P<title>.*?)</td>\n"
-    r"<td[^>]*?>(?P<genre>.*?)</td>\n"
-    r"<td[^>]*?>(?P<year>.*?)</td>\n"
-    r"<td[^>]*?>(?P<edition>.*?)</td>\n"
-    r"<td[^>]*?>(?P<golden_notes>.*?)</td>\n"
-    r"<td[^>]*?>(?P<language>.*?)</td>\n"
-    r"<td[^>]*?>(?P<creator>.*?)</td>\n"
-    r"<td[^>]*?>(?P<rating>.*?)</td>\n"
-    r"<td[^>]*?>(?P<views>.*?)</td>"
+    r'data-lastchange="(?P<lastchange>\d+)"[^>]*>\s*'
+    rf'<td[^>]*>(?:<audio .*?><source src="(?P<sample_url>[^"]*)")?{_CELL}</td>'
+    r"<td[^>]*><img [^>]*></td>"
+    rf"<td[^>]*>(?P<artist>{_CELL})</td>\n"
+    rf"<td[^>]*><a [^>]*>(?P<title>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<genre>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<year>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<edition>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<golden_notes>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<language>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<creator>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<rating>{_CELL})</td>\n"
+    rf"<td[^>]*>(?P<views>{_CELL})</td>"
 )
 WELCOME_REGEX = re.compile(
     r"<td class='row3' colspan='2'>\s*<span class='gen'>([^<]+) <b>([^<]+)</b>"
@@ -125,6 +149,17 @@ def establish_usdb_login(session: Session) -> UsdbUser | None:
 
 def new_session_with_cookies(browser: settings.Browser) -> Session:
     session = Session()
+    pool_size = _connection_pool_size()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # all requests to USDB share a rate limit, no matter the session
+    session.mount(
+        Usdb.BASE_URL,
+        ScheduledHTTPAdapter(
+            USDB_SCHEDULER, pool_connections=pool_size, pool_maxsize=pool_size
+        ),
+    )
     if cookies := browser.cookies():
         for cookie in cookies:
             session.cookies.set_cookie(cookie)
@@ -132,29 +167,50 @@ def new_session_with_cookies(browser: settings.Browser) -> Session:
     return session
 
 
+def usdb_request_stats() -> RequestSchedulerStats:
+    """Return the current rate limit and number of waiting requests to USDB."""
+    return USDB_SCHEDULER.stats()
+
+
+def _connection_pool_size() -> int:
+    """Enough keep-alive connections for every download worker to reuse its own."""
+    workers = settings.get_throttling_threads() or os.cpu_count() or 1
+    # one spare connection for requests from the GUI thread
+    return max(workers, SONG_LIST_CONCURRENCY) + 1
+
+
 class SessionManager:
-    """Singleton for managing the global session instance."""
+    """Singleton for managing the global session instance.
+
+    The session is shared by all threads; creating and resetting it is serialized,
+    so concurrent callers wait for a single login instead of racing each other.
+    """
 
     _session: Session | None = None
-    _connecting: bool = False
+    _lock = threading.Lock()
     _user: UsdbUser | None = None
 
     @classmethod
     def session(cls) -> Session:
-        while cls._connecting:
-            time.sleep(0.1)
-        if cls._session is None:
-            cls._connecting = True
-            try:
-                cls._session = new_session_with_cookies(settings.get_browser())
-                cls._user = establish_usdb_login(cls._session)
-            finally:
-                cls._connecting = False
-        return cls._session
+        if (session := cls._session) is not None:
+            return session
+        with cls._lock:
+            if cls._session is None:
+                session = new_session_with_cookies(settings.get_browser())
+                cls._user = establish_usdb_login(session)
+                cls._session = session
+            return cls._session
 
     @classmethod
-    def reset_session(cls) -> None:
-        if cls._session:
+    def reset_session(cls, expired: Session | None = None) -> None:
+        """Close the current session, so the next request will log in again.
+
+        If `expired` is given, only reset if it is still the current session, i.e.
+        it has not been replaced by another thread in the meantime.
+        """
+        with cls._lock:
+            if cls._session is None or (expired and expired is not cls._session):
+                return
             cls._session.close()
             cls._session = None
 
@@ -282,10 +338,11 @@ def get_usdb_page(
 ) -> str:
     """Retrieve HTML subpage from USDB."""
     existing_session = SessionManager.has_session()
+    used_session = session or SessionManager.session()
 
-    def page() -> str:
+    def page(session: Session) -> str:
         return _get_usdb_page_inner(
-            session or SessionManager.session(),
+            session,
             rel_url,
             method=method,
             headers=headers,
@@ -294,17 +351,14 @@ def get_usdb_page(
         )
 
     try:
-        return page()
-    except requests.ConnectionError:
-        logger.debug("Connection failed; session may have expired; retrying ...")
+        return page(used_session)
     except errors.UsdbLoginError:
         # skip login retry if custom or just created session
         if session or not existing_session:
             raise
         logger.debug(f"Page '{rel_url}' is private; trying to log in ...")
-    if not session:
-        SessionManager.reset_session()
-    return page()
+    SessionManager.reset_session(expired=used_session)
+    return page(SessionManager.session())
 
 
 def _get_usdb_page_inner(
@@ -329,19 +383,54 @@ def _get_usdb_page_inner(
             assert_never(unreachable)
     response.raise_for_status()
     response.encoding = "utf-8"
-    if UsdbStrings.NOT_LOGGED_IN in (page := normalize(html.unescape(response.text))):
+    return preprocess_usdb_page(response.text)
+
+
+def preprocess_usdb_page(text: str) -> str:
+    """Unescape and normalize a USDB page and check it for errors."""
+    if UsdbStrings.NOT_LOGGED_IN in (page := normalize(html.unescape(text))):
         raise errors.UsdbLoginError
     if UsdbStrings.DATASET_NOT_FOUND in page:
         raise errors.UsdbNotFoundError
     return page
 
 
-def get_usdb_details(song_id: SongId) -> SongDetails:
-    """Retrieve song details from usdb webpage, if song exists."""
-    logger.debug(f"Getting USDB details page of {song_id}.")
-    html = get_usdb_page(
-        "index.php", params={"id": str(int(song_id)), "link": "detail"}
-    )
+def get_usdb_details(song_id: SongId, usdb_mtime: int | None = None) -> SongDetails:
+    """Retrieve song details from usdb webpage, if song exists.
+
+    If `usdb_mtime` is given, the page may be served from the persistent cache.
+    """
+
+    def fetch() -> str:
+        logger.debug(f"Getting USDB details page of {song_id}.")
+        return get_usdb_page(
+            "index.php", params={"id": str(int(song_id)), "link": "detail"}
+        )
+
+    if usdb_mtime is None:
+        html = fetch()
+    else:
+        html = UsdbPageCache.get_or_fetch(
+            UsdbPageKind.DETAILS, song_id, usdb_mtime, fetch
+        )
+    return parse_song_page_html(html, song_id)
+
+
+class _ParserOptions:
+    lxml_detail_parser: bool = False
+
+
+def set_lxml_detail_parser(enabled: bool) -> None:
+    """Parse song detail pages with lxml directly instead of BeautifulSoup.
+
+    This is faster, but still experimental until it has proven to be equivalent.
+    """
+    _ParserOptions.lxml_detail_parser = enabled
+
+
+def parse_song_page_html(html: str, song_id: SongId) -> SongDetails:
+    if _ParserOptions.lxml_detail_parser:
+        return _parse_song_page_lxml(html, song_id)
     return _parse_song_page(BeautifulSoup(html, "lxml"), song_id)
 
 
@@ -386,41 +475,96 @@ def get_updated_songs_from_usdb(
     session: Session | None = None,
 ) -> list[UsdbSong]:
     """Return a list of all songs that were updated (or added) since `last_update`."""
-    logger.debug(f"Getting updated songs from USDB since {last_update.usdb_mtime}.")
     available_songs: dict[SongId, UsdbSong] = {}
-    progress.reset("Fetching updates from USDB: 0")
-    for batch in _get_songs_from_usdb(
-        "lastchange", True, content_filter=content_filter, session=session
+    for batch in get_updated_songs_from_usdb_batched(
+        last_update, progress, content_filter=content_filter, session=session
     ):
-        for song in batch:
-            if song.is_new_since_last_update(last_update):
-                available_songs[song.song_id] = song
-        progress.reset(f"Fetching updates from USDB: {len(available_songs)}")
-        if (
-            len(batch) < Usdb.MAX_SONGS_PER_PAGE
-            or batch[0].usdb_mtime < last_update.usdb_mtime
+        available_songs.update((song.song_id, song) for song in batch)
+    return list(available_songs.values())
+
+
+def get_updated_songs_from_usdb_batched(
+    last_update: db.LastUsdbUpdate,
+    progress: utils.ProgressProxy,
+    content_filter: dict[str, str] | None = None,
+    session: Session | None = None,
+) -> Iterator[list[UsdbSong]]:
+    """Yield all songs that were updated (or added) since `last_update`, page by page.
+
+    A small probe page is requested first, which is all that is needed if there are
+    only a few changes. A song may be yielded more than once if it moves to another
+    page while paging.
+    """
+    logger.debug(f"Getting updated songs from USDB since {last_update.usdb_mtime}.")
+    song_ids: set[SongId] = set()
+    n_requests = n_saved = 0
+
+    def pages(offset: int, page_size: int) -> Iterator[tuple[int, list[UsdbSong]]]:
+        for batch in _get_songs_from_usdb(
+            "lastchange",
+            True,
+            content_filter=content_filter,
+            session=session,
+            offset=offset,
+            page_size=page_size,
         ):
+            yield page_size, batch
+
+    progress.reset("Fetching updates from USDB: 0")
+    for page_size, batch in chain(
+        islice(pages(0, UPDATE_PROBE_SIZE), 1),
+        pages(UPDATE_PROBE_SIZE, Usdb.MAX_SONGS_PER_PAGE),
+    ):
+        n_requests += 1
+        updated = [s for s in batch if s.is_new_since_last_update(last_update)]
+        song_ids.update(song.song_id for song in updated)
+        progress.reset(f"Fetching updates from USDB: {len(song_ids)}")
+        if updated:
+            yield updated
+        if len(batch) < page_size:
             break
-    n_songs = len(available_songs)
+        if batch[-1].usdb_mtime < last_update.usdb_mtime:
+            # all further songs are older; previously, we would have fetched pages
+            # until one started with an old song
+            n_saved += batch[0].usdb_mtime >= last_update.usdb_mtime
+            break
+    n_songs = len(song_ids)
+    logger.debug(
+        f"Checked USDB for updates with {n_requests} request(s), saving {n_saved}."
+    )
     logger.info(
         f"Fetched {n_songs} updated song{'s' if n_songs != 1 else ''} from USDB."
     )
-    return list(available_songs.values())
 
 
 def get_all_songs_from_usdb(
     progress: utils.ProgressProxy, session: Session | None = None
 ) -> list[UsdbSong]:
     """Return a list of all USDB songs."""
+    return [
+        song
+        for batch in get_all_songs_from_usdb_batched(progress, session=session)
+        for song in batch
+    ]
+
+
+def get_all_songs_from_usdb_batched(
+    progress: utils.ProgressProxy, session: Session | None = None
+) -> Iterator[list[UsdbSong]]:
+    """Yield all USDB songs, page by page.
+
+    The next pages are already being fetched while the caller processes a batch.
+    """
     logger.debug("Getting all songs from USDB.")
-    available_songs = []
+    n_songs = 0
     progress.reset("Fetching songs from USDB.", maximum=N_USDB_SONGS_APPROX)
-    for batch in _get_songs_from_usdb("id", False, session=session):
-        available_songs.extend(batch)
+    for batch in _get_songs_from_usdb(
+        "id", False, session=session, concurrency=SONG_LIST_CONCURRENCY
+    ):
+        n_songs += len(batch)
         progress.increase(len(batch))
-    n_songs = len(available_songs)
+        yield batch
     logger.info(f"Fetched {n_songs} song{'s' if n_songs != 1 else ''} from USDB.")
-    return available_songs
 
 
 def _get_songs_from_usdb(
@@ -428,50 +572,142 @@ def _get_songs_from_usdb(
     descending: bool = False,
     content_filter: dict[str, str] | None = None,
     session: Session | None = None,
+    concurrency: int = 1,
+    offset: int = 0,
+    page_size: int = Usdb.MAX_SONGS_PER_PAGE,
 ) -> Generator[list[UsdbSong], None, None]:
-    """Yield songs from USDB by the given order."""
+    """Yield songs from USDB by the given order, one list per page.
+
+    With a `concurrency` greater than one, up to that many pages are requested in
+    parallel. Pages are still yielded in order.
+    """
+    payload = _song_list_payload(order, descending, content_filter, page_size)
+    starts = range(offset, Usdb.MAX_SONG_ID, page_size)
+    if concurrency > 1:
+        yield from _get_song_list_pages_concurrently(
+            payload, starts, session, concurrency
+        )
+        return
+    for start in starts:
+        parsed_songs = _get_song_list_page(payload, start, session)
+        yield parsed_songs
+        if len(parsed_songs) < page_size:
+            break
+
+
+def _song_list_payload(
+    order: str, descending: bool, content_filter: dict[str, str] | None, page_size: int
+) -> dict[str, str]:
     payload = {
         "order": order,
         "ud": "desc" if descending else "asc",
-        "limit": str(Usdb.MAX_SONGS_PER_PAGE),
+        "limit": str(page_size),
         "details": "1",
     }
     payload.update(content_filter or {})
-    for start in range(0, Usdb.MAX_SONG_ID, Usdb.MAX_SONGS_PER_PAGE):
-        payload["start"] = str(start)
-        html = get_usdb_page(
-            "index.php",
-            RequestMethod.POST,
-            params={"link": "list"},
-            payload=payload,
-            session=session,
+    return payload
+
+
+def _get_song_list_pages_concurrently(
+    payload: dict[str, str], starts: range, session: Session | None, concurrency: int
+) -> Generator[list[UsdbSong], None, None]:
+    """Yield song list pages in order while fetching the next ones in the background.
+
+    The number of pages in flight is bounded by `concurrency`, while the request rate
+    is limited by the USDB request scheduler. As the total number of pages is not
+    known beforehand, at most `concurrency - 1` requests past the last page are wasted.
+    """
+    if session is None:
+        # log in once up front instead of racing from the worker threads
+        SessionManager.session()
+
+    def fetch(start: int) -> list[UsdbSong]:
+        return _get_song_list_page(payload, start, session)
+
+    remaining = iter(starts)
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="usdb_song_list"
+    ) as executor:
+        pending: deque[Future[list[UsdbSong]]] = deque(
+            executor.submit(fetch, start) for start in islice(remaining, concurrency)
         )
-        parsed_songs = list(_parse_songs_from_songlist(html))
-        yield parsed_songs
-        if len(parsed_songs) < Usdb.MAX_SONGS_PER_PAGE:
-            break
+        try:
+            while pending:
+                parsed_songs = pending.popleft().result()
+                yield parsed_songs
+                if len(parsed_songs) < starts.step:
+                    break
+                if (start := next(remaining, None)) is not None:
+                    pending.append(executor.submit(fetch, start))
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _get_song_list_page(
+    payload: dict[str, str], start: int, session: Session | None
+) -> list[UsdbSong]:
+    html = get_usdb_page(
+        "index.php",
+        RequestMethod.POST,
+        params={"link": "list"},
+        payload={**payload, "start": str(start)},
+        session=session,
+    )
+    return list(_parse_songs_from_songlist(html))
 
 
 def _parse_songs_from_songlist(html: str) -> Iterator[UsdbSong]:
-    return (
-        UsdbSong.from_html(
-            _usdb_strings_from_html(html),
-            song_id=match["song_id"],
-            usdb_mtime=match["lastchange"],
-            sample_url=match["sample_url"] or "",
-            artist=match["artist"],
-            title=match["title"],
-            genre=match["genre"],
-            year=match["year"],
-            edition=match["edition"],
-            golden_notes=match["golden_notes"],
-            language=match["language"],
-            creator=match["creator"],
-            rating=match["rating"],
-            views=match["views"],
+    matches = SONG_LIST_ROW_REGEX.finditer(html)
+    if (first := next(matches, None)) is None:
+        return
+    # the page language is needed to interpret the golden notes column
+    yes = _usdb_strings_from_html(html).YES
+    for match in chain((first,), matches):
+        (
+            song_id,
+            usdb_mtime,
+            sample_url,
+            artist,
+            title,
+            genre,
+            year,
+            edition,
+            golden_notes,
+            language,
+            creator,
+            rating,
+            views,
+        ) = match.groups()
+        yield UsdbSong(
+            song_id=SongId(int(song_id)),
+            usdb_mtime=int(usdb_mtime),
+            artist=artist,
+            title=title,
+            genre=genre,
+            year=int(year) if len(year) == 4 and year.isdigit() else None,
+            language=language,
+            creator=creator,
+            edition=edition,
+            golden_notes=golden_notes == yes,
+            rating=_rating_from_html(rating),
+            views=int(views) if views.isdigit() else _views_from_html(views, song_id),
+            sample_url=sample_url or "",
         )
-        for match in SONG_LIST_ROW_REGEX.finditer(html)
-    )
+
+
+def _views_from_html(views: str, song_id: str) -> int:
+    """Parse a view count that is not plain digits, e.g. with thousands separators."""
+    if digits := "".join(filter(str.isdigit, views)):
+        return int(digits)
+    logger.debug(f"Unexpected view count '{views}' of song {song_id}.")
+    return 0
+
+
+@functools.cache
+def _rating_from_html(rating: str) -> float:
+    # there are only a few distinct combinations of star images
+    return rating.count("/star.png") + 0.5 * rating.count("/half_star.png")
 
 
 def _parse_details_table(
@@ -625,16 +861,231 @@ def _extract_supported_video_source(tag: Any, attr_key: str) -> str | None:
     return None
 
 
-def get_notes(song_id: SongId, logger: Logger) -> str:
-    """Retrieve notes for a song."""
-    logger.debug("fetching notes")
-    html = get_usdb_page(
-        "index.php",
-        RequestMethod.POST,
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        params={"link": "gettxt", "id": str(int(song_id))},
-        payload={"wd": "1"},
+# The following functions parse song detail pages with lxml directly. They mirror the
+# BeautifulSoup based implementation above, including its notion of `find_next`
+# (which also searches descendants) and of an element's text (which excludes scripts,
+# style sheets and templates).
+
+_LXML_SKIPPED_TEXT = "ancestor::script or ancestor::style or ancestor::template"
+
+
+def _parse_song_page_lxml(html: str, song_id: SongId) -> SongDetails:
+    logger = song_logger(song_id)
+    root = lxml.html.document_fromstring(html)
+    usdb_strings = _usdb_strings_from_lxml(root)
+    details_table, comments_table, *_ = root.xpath("//table[@border='0'][@width='500']")
+    details = _parse_details_table_lxml(details_table, song_id, usdb_strings, logger)
+    details.comments = _parse_comments_table_lxml(comments_table, logger)
+    return details
+
+
+def _usdb_strings_from_lxml(root: HtmlElement) -> type[UsdbStrings]:
+    span = _lxml_first(root, "//span[contains(concat(' ', @class, ' '), ' gen ')]")
+    assert span is not None
+    text = _lxml_text(span)
+    return _usdb_strings_from_welcome(text.split(" ", 1)[0].removesuffix(","))
+
+
+def _parse_details_table_lxml(
+    details_table: HtmlElement,
+    song_id: SongId,
+    usdb_strings: type[UsdbStrings],
+    logger: Logger,
+) -> SongDetails:
+    editors = []
+    pointer = _lxml_element_after(details_table, usdb_strings.SONG_EDITED_BY, "td")
+    while pointer is not None:
+        if _lxml_first(pointer, ".//a") is None:
+            break
+        editors.append(_lxml_text(pointer).strip())
+        if (row := _lxml_find_next(pointer, "tr")) is None:
+            break
+        pointer = _lxml_find_next(row, "td")
+
+    rating_cell = _lxml_element_after(details_table, usdb_strings.SONG_RATING)
+    if rating_cell is None:
+        raise errors.UsdbParseError("Rating not found.")  # noqa: TRY003
+    stars = [img.get("src") or "" for img in rating_cell.iter("img")]
+    votes_str = _lxml_text(rating_cell)
+
+    audio_sample = ""
+    if (src := _lxml_first(details_table, ".//source/@src")) is not None:
+        audio_sample = str(src)
+    else:
+        logger.debug("No audio sample found. Consider adding one!")
+
+    cover_url = str(_lxml_first(details_table, ".//img/@src"))
+    if "nocover" in cover_url:
+        logger.debug("No USDB cover. Consider adding one!")
+
+    def text_after(label: str) -> str:
+        if (element := _lxml_element_after(details_table, label)) is not None:
+            return _lxml_text(element).strip()
+        raise errors.UsdbParseError(f"Text after {label} not found.")  # noqa: TRY003
+
+    year_str = text_after(usdb_strings.SONG_YEAR)
+    year = int(year_str) if len(year_str) == 4 and year_str.isdigit() else None
+    artist, title, *_ = details_table.iter("td")
+
+    return SongDetails(
+        song_id=song_id,
+        artist=_lxml_text(artist),
+        title=_lxml_text(title),
+        cover_url=None if "nocover" in cover_url else Usdb.BASE_URL + cover_url,
+        language=text_after(usdb_strings.SONG_LANGUAGE),
+        year=year,
+        genre=text_after("Genre"),
+        edition=text_after("Edition"),
+        bpm=float(text_after("BPM").replace(",", ".")),
+        gap=float(text_after("GAP").replace(",", ".") or 0),
+        golden_notes=text_after(usdb_strings.GOLDEN_NOTES) == usdb_strings.YES,
+        song_check=text_after(usdb_strings.SONGCHECK) == usdb_strings.YES,
+        date_time=datetime.strptime(text_after(usdb_strings.DATE), Usdb.DATETIME_STRF),
+        uploader=text_after(usdb_strings.UPLOADED_BY),
+        editors=editors,
+        views=int(text_after(usdb_strings.VIEWS)),
+        rating=sum("/star.png" in src for src in stars)
+        + 0.5 * sum("/half_star.png" in src for src in stars),
+        votes=int(votes_str.split("(")[1].split(")")[0]),
+        audio_sample=audio_sample or None,
+    )
+
+
+def _parse_comments_table_lxml(
+    comments_table: HtmlElement, logger: Logger
+) -> list[SongComment]:
+    comments = []
+    headers = comments_table.xpath(
+        ".//tr[contains(concat(' ', @class, ' '), ' list_tr2 ')]"
     )
+    # last entry is the field to enter a new comment, so this one is ignored
+    for header in headers[:-1]:
+        td = _lxml_first(header, ".//td")
+        assert td is not None
+        meta = _lxml_text(td).strip()
+        if " | " not in meta:
+            # header is just the placeholder element
+            break
+        date_time, author = meta.removeprefix("[del] [edit] ").split(" | ")
+        contents = header.getnext()
+        assert contents is not None
+        comments.append(
+            SongComment(
+                date_time=date_time,
+                author=author,
+                contents=_parse_comment_contents_lxml(contents, logger),
+            )
+        )
+    return comments
+
+
+def _parse_comment_contents_lxml(
+    contents: HtmlElement, logger: Logger
+) -> CommentContents:
+    td_element = _lxml_first(contents, ".//td")
+    assert td_element is not None
+    for emoji in list(td_element.iter("img")):
+        title = emoji.get("title")
+        assert isinstance(title, str)
+        _lxml_replace_with_text(emoji, title)
+
+    text = _lxml_text(td_element).strip()
+    urls: list[str] = []
+    youtube_ids: list[str] = []
+    for url in _all_urls_in_comment_lxml(contents, text, logger):
+        if yt_id := extract_youtube_id(url):
+            youtube_ids.append(yt_id)
+        else:
+            urls.append(url)
+    return CommentContents(text=text, urls=urls, youtube_ids=youtube_ids)
+
+
+def _all_urls_in_comment_lxml(
+    contents: HtmlElement, text: str, logger: Logger
+) -> Iterator[str]:
+    for src in contents.xpath(".//embed/@src"):
+        if SUPPORTED_VIDEO_SOURCES_REGEX.fullmatch(src):
+            logger.debug("Video embed found. Consider embedding as iframe.")
+            yield str(src)
+    for script in contents.iter("script"):
+        if (
+            "dailymotion" in script.get("src", "")
+            and (dailymotion_id := script.get("data-video")) is not None
+        ):
+            yield f"https://www.dailymotion.com/video/{dailymotion_id}"
+    for src in contents.xpath(".//iframe/@src"):
+        if SUPPORTED_VIDEO_SOURCES_REGEX.fullmatch(src):
+            yield str(src)
+    for href in contents.xpath(".//a/@href"):
+        if SUPPORTED_VIDEO_SOURCES_REGEX.fullmatch(href):
+            logger.debug("Video href found. Consider embedding as iframe.")
+            yield str(href)
+    for match in SUPPORTED_VIDEO_SOURCES_REGEX.finditer(text):
+        logger.debug("Video plain url found. Consider embedding as iframe.")
+        yield match.group(1)
+
+
+def _lxml_first(element: HtmlElement, xpath: str, **variables: str) -> Any:
+    return next(iter(element.xpath(xpath, **variables)), None)
+
+
+def _lxml_text(element: HtmlElement) -> str:
+    return "".join(element.xpath(f".//text()[not({_LXML_SKIPPED_TEXT})]"))
+
+
+def _lxml_find_next(element: HtmlElement, tag: str) -> HtmlElement | None:
+    return _lxml_first(element, f"(descendant::{tag} | following::{tag})[1]")
+
+
+def _lxml_element_after(
+    element: HtmlElement, label: str, tag: str = "*"
+) -> HtmlElement | None:
+    """Return the element after the first text node that equals `label`.
+
+    With the default `tag`, the label must be directly followed by an element.
+    """
+    step = "following::node()[1][self::*]" if tag == "*" else f"following::{tag}[1]"
+    return _lxml_first(
+        element,
+        f"(.//text()[. = $label][not({_LXML_SKIPPED_TEXT})])[1]/{step}",
+        label=label,
+    )
+
+
+def _lxml_replace_with_text(element: HtmlElement, text: str) -> None:
+    parent = element.getparent()
+    text += element.tail or ""
+    if (previous := element.getprevious()) is not None:
+        previous.tail = (previous.tail or "") + text
+    else:
+        parent.text = (parent.text or "") + text
+    parent.remove(element)
+
+
+def get_notes(song_id: SongId, logger: Logger, usdb_mtime: int | None = None) -> str:
+    """Retrieve notes for a song.
+
+    If `usdb_mtime` is given, the page may be served from the persistent cache.
+    """
+
+    def fetch() -> str:
+        logger.debug("fetching notes")
+        return get_usdb_page(
+            "index.php",
+            RequestMethod.POST,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            params={"link": "gettxt", "id": str(int(song_id))},
+            payload={"wd": "1"},
+        )
+
+    if usdb_mtime is None:
+        html = fetch()
+    else:
+        html = UsdbPageCache.get_or_fetch(UsdbPageKind.TXT, song_id, usdb_mtime, fetch)
+    return parse_song_txt_from_html(html)
+
+
+def parse_song_txt_from_html(html: str) -> str:
     return _parse_song_txt_from_txt_page(BeautifulSoup(html, "lxml"))
 
 
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import sys
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from html import escape
 from json import JSONEncoder
@@ -10,7 +13,7 @@ from typing import TYPE_CHECKING, Any, ClassVar
 import attrs
 from diff_match_patch import diff_match_patch
 
-from usdb_syncer import SongId, Usdb, db
+from usdb_syncer import SongId, Usdb, db, events
 from usdb_syncer.db import DownloadStatus
 from usdb_syncer.logger import song_logger
 from usdb_syncer.song_txt import SongTxt
@@ -20,7 +23,13 @@ if TYPE_CHECKING:
     from collections.abc import Callable, Iterable
     from pathlib import Path
 
-    from usdb_syncer.constants import UsdbStrings
+# memory for cached songs; a song with a fully populated sync meta takes about 3 KiB,
+# and sizes vary little, as most strings are short or interned, so counting songs
+# bounds the memory closely enough
+MAX_CACHE_BYTES = 16 * 1024**2
+SONG_BYTES_ESTIMATE = 3 * 1024
+# least recently used songs are evicted from the cache beyond this
+MAX_CACHED_SONGS = MAX_CACHE_BYTES // SONG_BYTES_ESTIMATE
 
 
 @attrs.define(kw_only=True)
@@ -29,19 +38,20 @@ class UsdbSong:
 
     song_id: SongId
     usdb_mtime: int
-    artist: str
+    # values shared by many songs are interned to save memory
+    artist: str = attrs.field(converter=sys.intern)
     title: str
-    genre: str
+    genre: str = attrs.field(converter=sys.intern)
     year: int | None = None
-    language: str
-    creator: str
-    edition: str
+    language: str = attrs.field(converter=sys.intern)
+    creator: str = attrs.field(converter=sys.intern)
+    edition: str = attrs.field(converter=sys.intern)
     golden_notes: bool
     rating: float
     views: int
     sample_url: str
     # not in USDB song list
-    tags: str = ""
+    tags: str = attrs.field(default="", converter=sys.intern)
     # internal
     sync_meta: SyncMeta | None = None
     status: DownloadStatus = DownloadStatus.NONE
@@ -52,41 +62,6 @@ class UsdbSong:
         dct["song_id"] = SongId(dct["song_id"])
         return cls(**dct)
 
-    @classmethod
-    def from_html(
-        cls,
-        strings: type[UsdbStrings],
-        *,
-        song_id: str,
-        usdb_mtime: str,
-        artist: str,
-        title: str,
-        genre: str,
-        year: str,
-        language: str,
-        creator: str,
-        edition: str,
-        golden_notes: str,
-        rating: str,
-        views: str,
-        sample_url: str,
-    ) -> UsdbSong:
-        return cls(
-            song_id=SongId.parse(song_id),
-            usdb_mtime=int(usdb_mtime),
-            artist=artist,
-            title=title,
-            genre=genre,
-            year=int(year) if len(year) == 4 and year.isdigit() else None,
-            language=language,
-            creator=creator,
-            edition=edition,
-            golden_notes=golden_notes == strings.YES,
-            rating=rating.count("/star.png") + 0.5 * rating.count("/half_star.png"),
-            views=int(views),
-            sample_url=sample_url,
-        )
-
     @classmethod
     def from_db_row(cls, song_id: SongId, row: tuple) -> UsdbSong:
         assert len(row) == 51
@@ -114,12 +89,41 @@ class UsdbSong:
     def get(cls, song_id: SongId) -> UsdbSong | None:
         if song := _UsdbSongCache.get(song_id):
             return song
+        _UsdbSongCache.record_misses(1)
         if row := db.get_usdb_song(song_id):
             song = UsdbSong.from_db_row(song_id, row)
             _UsdbSongCache.update(song)
             return song
         return None
 
+    @classmethod
+    def get_cached(cls, song_id: SongId) -> UsdbSong | None:
+        """Return the song if it is cached, without loading it from the DB."""
+        return _UsdbSongCache.get(song_id)
+
+    @classmethod
+    def get_many(cls, ids: Iterable[SongId]) -> list[UsdbSong]:
+        """Return the existing songs with the given ids, in the same order.
+
+        All songs not yet cached are loaded with a single query.
+        """
+        ids = list(ids)
+        songs: dict[SongId, UsdbSong] = {}
+        missing = []
+        for song_id in ids:
+            if song := _UsdbSongCache.get(song_id):
+                songs[song_id] = song
+            else:
+                missing.append(song_id)
+        # loaded songs are returned directly, as they may already be evicted again
+        if missing:
+            _UsdbSongCache.record_misses(len(missing))
+            for row in db.get_usdb_songs(missing):
+                song = UsdbSong.from_db_row(SongId(row[0]), row)
+                _UsdbSongCache.update(song)
+                songs[song.song_id] = song
+        return [songs[song_id] for song_id in ids if song_id in songs]
+
     def delete(self) -> None:
         db.delete_usdb_song(self.song_id)
         _UsdbSongCache.remove(self.song_id)
@@ -147,14 +151,22 @@ class UsdbSong:
         _UsdbSongCache.update(self)
 
     @classmethod
-    def upsert_many(cls, songs: list[UsdbSong]) -> None:
+    def upsert_many(cls, songs: list[UsdbSong], cache: bool = True) -> None:
+        """Write songs to the database.
+
+        If `cache` is False, the songs are evicted from the cache instead of being
+        added, so bulk imports do not keep the whole catalogue in memory.
+        """
         db.upsert_usdb_songs([song.db_params() for song in songs])
         db.upsert_usdb_songs_languages([(s.song_id, s.languages()) for s in songs])
         db.upsert_usdb_songs_genres([(s.song_id, s.genres()) for s in songs])
         db.upsert_usdb_songs_creators([(s.song_id, s.creators()) for s in songs])
         SyncMeta.upsert_many([song.sync_meta for song in songs if song.sync_meta])
         for song in songs:
-            _UsdbSongCache.update(song)
+            if cache:
+                _UsdbSongCache.update(song)
+            else:
+                _UsdbSongCache.remove(song.song_id)
 
     def db_params(self) -> db.UsdbSongParams:
         return db.UsdbSongParams(
@@ -231,6 +243,10 @@ class UsdbSong:
     def clear_cache(cls) -> None:
         _UsdbSongCache.clear()
 
+    @classmethod
+    def cache_stats(cls) -> SongCacheStats:
+        return _UsdbSongCache.stats()
+
     def is_new_since_last_update(self, last_update: db.LastUsdbUpdate) -> bool:
         return self.usdb_mtime > last_update.usdb_mtime or (
             self.usdb_mtime >= last_update.usdb_mtime
@@ -527,23 +543,74 @@ class UsdbSongEncoder(JSONEncoder):
         return super().default(o)
 
 
+@attrs.frozen
+class SongCacheStats:
+    """Snapshot of the song cache's state."""
+
+    size: int
+    hits: int
+    misses: int
+
+
 class _UsdbSongCache:
-    """Cache for songs loaded from the DB."""
+    """Thread-safe cache for songs loaded from the DB.
 
-    _songs: ClassVar[dict[SongId, UsdbSong]] = {}
+    The least recently used songs are evicted beyond a fixed size, as the DB can
+    reload them cheaply.
+    Misses are recorded by the callers loading songs from the DB, so a song that is
+    looked up in several places before being loaded only counts once.
+    """
+
+    _songs: ClassVar[OrderedDict[SongId, UsdbSong]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _hits: ClassVar[int] = 0
+    _misses: ClassVar[int] = 0
 
     @classmethod
     def get(cls, song_id: SongId) -> UsdbSong | None:
-        return cls._songs.get(song_id)
+        with cls._lock:
+            if (song := cls._songs.get(song_id)) is None:
+                return None
+            cls._songs.move_to_end(song_id)
+            cls._hits += 1
+            return song
+
+    @classmethod
+    def record_misses(cls, count: int) -> None:
+        with cls._lock:
+            cls._misses += count
 
     @classmethod
     def update(cls, song: UsdbSong) -> None:
-        cls._songs[song.song_id] = song
+        with cls._lock:
+            cls._songs[song.song_id] = song
+            cls._songs.move_to_end(song.song_id)
+            while len(cls._songs) > MAX_CACHED_SONGS:
+                cls._songs.popitem(last=False)
 
     @classmethod
     def remove(cls, song_id: SongId) -> None:
-        cls._songs.pop(song_id, None)
+        with cls._lock:
+            cls._songs.pop(song_id, None)
+
+    @classmethod
+    def remove_many(cls, ids: Iterable[SongId]) -> None:
+        with cls._lock:
+            for song_id in ids:
+                cls._songs.pop(song_id, None)
 
     @classmethod
     def clear(cls) -> None:
-        cls._songs = {}
+        with cls._lock:
+            cls._songs = OrderedDict()
+            cls._hits = cls._misses = 0
+
+    @classmethod
+    def stats(cls) -> SongCacheStats:
+        with cls._lock:
+            return SongCacheStats(len(cls._songs), cls._hits, cls._misses)
+
+
+# changed songs are reloaded from the DB the next time they are needed
+events.SongsChanged.subscribe(lambda event: _UsdbSongCache.remove_many(event.song_ids))
+events.SongDeleted.subscribe(lambda event: _UsdbSongCache.remove(event.song_id))
@@ -121,6 +121,11 @@ class AppPaths:
     fonts = Path(_platform_dirs.user_data_dir, "fonts")
     license_hash = Path(_platform_dirs.user_data_dir, "license_hash.txt")
     song_list = Path(_platform_dirs.user_cache_dir, "available_songs.json")
+    usdb_page_cache = Path(_platform_dirs.user_cache_dir, "usdb_pages")
+    # partial downloads, kept to resume them after a restart
+    download_staging = Path(_platform_dirs.user_cache_dir, "download_staging")
+    # downloaded media shared between songs
+    media_store = Path(_platform_dirs.user_cache_dir, "media_store")
     profile = Path(_platform_dirs.user_cache_dir, "usdb_syncer.prof")
     shared = (_root() / "shared") if constants.IS_SOURCE else None
 
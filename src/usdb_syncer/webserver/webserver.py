@@ -54,11 +54,7 @@ def _get_songs(
         song_ids = sorted(
             song_ids, key=lambda s: like_counter[s], reverse=sort_order == "desc"
         )
-    return [
-        s
-        for i in itertools.islice(song_ids, offset, offset + limit)
-        if (s := UsdbSong.get(i))
-    ]
+    return UsdbSong.get_many(itertools.islice(song_ids, offset, offset + limit))
 
 
 def _index(
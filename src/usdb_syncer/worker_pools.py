@@ -0,0 +1,74 @@
+"""Thread pools shared by all downloads, one per resource that work is bound by."""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import TYPE_CHECKING, ParamSpec, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Future
+
+# many simultaneous downloads are needed to saturate the bandwidth, as single
+# connections are often throttled by the server
+MAX_NETWORK_WORKERS = 16
+# short file operations like writing txts and tags
+MAX_IO_WORKERS = 4
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_executors: dict[WorkerPool, ThreadPoolExecutor] = {}
+
+
+class WorkerPool(Enum):
+    """Pools with separate concurrency limits and queues.
+
+    This way, long network waits do not hold back CPU-bound work, and CPU-bound work
+    is not oversubscribed just because many downloads are in progress.
+    """
+
+    NETWORK = "network"
+    FFMPEG = "ffmpeg"
+    SEPARATION = "separation"
+    IO = "io"
+
+    def max_workers(self) -> int:
+        match self:
+            case WorkerPool.NETWORK:
+                return MAX_NETWORK_WORKERS
+            case WorkerPool.FFMPEG:
+                return os.cpu_count() or 1
+            case WorkerPool.SEPARATION:
+                # separation models already use all available cores or the GPU
+                return 1
+            case WorkerPool.IO:
+                return MAX_IO_WORKERS
+
+    def submit(
+        self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs
+    ) -> Future[T]:
+        """Queue `fn` to be run by a worker of this pool."""
+        return self._executor().submit(fn, *args, **kwargs)
+
+    def run(self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> T:
+        """Run `fn` in this pool and wait for its result.
+
+        If called from a worker of this pool, `fn` is run directly to avoid deadlocks.
+        """
+        if threading.current_thread().name.startswith(f"{self.value}_"):
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with _lock:
+            if (executor := _executors.get(self)) is None:
+                executor = ThreadPoolExecutor(
+                    self.max_workers(), thread_name_prefix=self.value
+                )
+                _executors[self] = executor
+            return executor
@@ -0,0 +1,96 @@
+"""Reuse of yt-dlp instances and extraction results across downloads.
+
+Extraction is done by long-lived YoutubeDL instances, one per worker thread and
+option profile, so extractors, player caches and browser cookies are only
+initialised once. Extracted infos are cached per URL for a while, so e.g. audio and
+video of the same resource share a single extraction.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+import attrs
+import yt_dlp
+
+from usdb_syncer import hooks
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+# stream URLs expire after a few hours, so cached infos must be used well before
+INFO_CACHE_SECS = 30 * 60
+# options passed on to the instances used for extraction
+_EXTRACTION_OPTIONS = ("cookiesfrombrowser", "verbose", "quiet", "no_warnings")
+
+_local = threading.local()
+_lock = threading.Lock()
+_infos: dict[tuple[str, bool], _CachedInfo] = {}
+
+
+@attrs.define
+class _CachedInfo:
+    """Extracted info of a URL, possibly still being extracted."""
+
+    lock: threading.Lock = attrs.field(factory=threading.Lock)
+    info: dict[str, Any] | None = None
+    expires: float = 0.0
+
+
+def download(url: str, options: Mapping[str, Any], cookies: bool) -> str:
+    """Download `url` and return the filename according to the output template.
+
+    If `cookies` is true, cookies are loaded from the configured browser and
+    provided by addons. They are only loaded once per extraction instance and shared
+    with the instances downloading.
+    """
+    info = extract_info(url, options, cookies)
+    params = {
+        key: value for key, value in options.items() if key != "cookiesfrombrowser"
+    }
+    with yt_dlp.YoutubeDL(params) as ydl:  # pyright: ignore[reportArgumentType]  # yt-dlp expects dynamic params
+        if cookies:
+            # must be set before the first request
+            ydl.cookiejar = _extractor(options, cookies).cookiejar
+        return ydl.prepare_filename(ydl.process_ie_result(info, download=True))
+
+
+def extract_info(url: str, options: Mapping[str, Any], cookies: bool) -> dict[str, Any]:
+    """Return a copy of the unprocessed info of `url`, extracted at most once."""
+    key = (url, cookies)
+    now = time.monotonic()
+    with _lock:
+        for expired in [
+            k for k, v in _infos.items() if v.expires < now and not v.lock.locked()
+        ]:
+            del _infos[expired]
+        cached = _infos.setdefault(key, _CachedInfo())
+    # concurrent requests for the same URL wait for the first one
+    with cached.lock:
+        if cached.info is None or cached.expires < time.monotonic():
+            cached.info = _extractor(options, cookies).extract_info(
+                url, download=False, process=False
+            )
+            cached.expires = time.monotonic() + INFO_CACHE_SECS
+        # processing modifies the info
+        return copy.deepcopy(cached.info)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _infos.clear()
+
+
+def _extractor(options: Mapping[str, Any], cookies: bool) -> yt_dlp.YoutubeDL:
+    params = {key: options[key] for key in _EXTRACTION_OPTIONS if key in options}
+    profile = repr((cookies, sorted(params.items())))
+    instances: dict[str, yt_dlp.YoutubeDL] = _local.__dict__.setdefault("instances", {})
+    if (ydl := instances.get(profile)) is None:
+        ydl = yt_dlp.YoutubeDL(params)  # pyright: ignore[reportArgumentType]  # yt-dlp expects dynamic params
+        if cookies:
+            hooks.GetYtCookies.call(ydl.cookiejar)
+        instances[profile] = ydl
+    return ydl
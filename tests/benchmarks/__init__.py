@@ -0,0 +1,5 @@
+"""This sub-package contains benchmarks for performance critical code paths.
+
+They are not collected by the test runners. Run them as modules, e.g.
+`python -m tests.benchmarks.song_list_parser`.
+"""
@@ -0,0 +1,43 @@
+"""Benchmark parsing USDB song list pages."""
+
+import html
+import re
+import timeit
+from pathlib import Path
+
+from usdb_syncer.constants import Usdb
+from usdb_syncer.usdb_scraper import N_USDB_SONGS_APPROX, _parse_songs_from_songlist
+from usdb_syncer.utils import normalize
+
+RESOURCE = Path(__file__).parent.parent.joinpath(
+    "resources", "html", "usdb-animux-de", "song_list.htm"
+)
+ROW_REGEX = re.compile(r'<tr class="list_tr\d".*?</tr>', re.DOTALL)
+
+
+def full_song_list_page() -> str:
+    """Return the song list fixture, padded to a full page of songs.
+
+    The page is preprocessed like pages downloaded from USDB.
+    """
+    page = normalize(html.unescape(RESOURCE.read_text(encoding="utf8")))
+    rows = ROW_REGEX.findall(page)
+    start = page.index(rows[0])
+    end = page.index(rows[-1]) + len(rows[-1])
+    padded = (rows[i % len(rows)] for i in range(Usdb.MAX_SONGS_PER_PAGE))
+    return page[:start] + "".join(padded) + page[end:]
+
+
+def main() -> None:
+    page = full_song_list_page()
+    assert len(list(_parse_songs_from_songlist(page))) == Usdb.MAX_SONGS_PER_PAGE
+    timer = timeit.Timer(lambda: list(_parse_songs_from_songlist(page)))
+    number, _ = timer.autorange()
+    per_page = min(timer.repeat(repeat=5, number=number)) / number
+    n_pages = N_USDB_SONGS_APPROX // Usdb.MAX_SONGS_PER_PAGE
+    print(f"{per_page * 1000:.3f} ms per page of {Usdb.MAX_SONGS_PER_PAGE} songs")
+    print(f"{per_page * n_pages * 1000:.0f} ms for {n_pages} pages (full catalogue)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark the memory footprint of songs loaded from the database."""
+
+import gc
+import random
+import tracemalloc
+
+import attrs
+
+from tests.conftest import example_usdb_song
+from usdb_syncer import SongId, SyncMetaId, db, settings
+from usdb_syncer.db import JobStatus
+from usdb_syncer.sync_meta import Resource, ResourceFile
+from usdb_syncer.usdb_scraper import N_USDB_SONGS_APPROX
+from usdb_syncer.usdb_song import UsdbSong
+
+LANGUAGES = ["English", "German", "French", "Spanish", "Japanese", "English, German"]
+GENRES = ["Pop", "Rock", "Schlager", "Musical", "Anime", "Metal", ""]
+EDITIONS = ["", "[SC]-Songs", "SingStar Rocks", "UltraStar Deluxe", "Disney"]
+
+
+def synthetic_catalogue(n_songs: int) -> list[UsdbSong]:
+    """Return songs with field repetition similar to the USDB catalogue."""
+    rng = random.Random(0)  # noqa: S311
+    template = example_usdb_song()
+    song_dir = settings.get_song_dir()
+    artists = [f"Artist {i}" for i in range(n_songs // 4)]
+    creators = [f"Creator {i}" for i in range(n_songs // 20)]
+    songs = []
+    for song_id in range(1, n_songs + 1):
+        assert template.sync_meta
+        artist = rng.choice(artists)
+        sync_meta_id = SyncMetaId.new()
+        # audio and video are usually taken from the same resource
+        resource = f"https://www.youtube.com/watch?v={song_id:011}"
+        meta = attrs.evolve(
+            template.sync_meta,
+            sync_meta_id=sync_meta_id,
+            song_id=SongId(song_id),
+            path=song_dir.joinpath(artist, sync_meta_id.to_filename()),
+            audio=Resource(
+                JobStatus.SUCCESS, ResourceFile(f"{artist}.m4a", 1, resource)
+            ),
+            video=Resource(
+                JobStatus.SUCCESS, ResourceFile(f"{artist}.mp4", 1, resource)
+            ),
+        )
+        songs.append(
+            attrs.evolve(
+                template,
+                song_id=SongId(song_id),
+                artist=artist,
+                title=f"Title {song_id}",
+                language=rng.choice(LANGUAGES),
+                genre=rng.choice(GENRES),
+                edition=rng.choice(EDITIONS),
+                creator=rng.choice(creators),
+                sync_meta=meta,
+            )
+        )
+    return songs
+
+
+def main() -> None:
+    with db.managed_connection(":memory:"):
+        UsdbSong.upsert_many(synthetic_catalogue(N_USDB_SONGS_APPROX), cache=False)
+        ids = [SongId(song_id) for song_id in range(1, N_USDB_SONGS_APPROX + 1)]
+        gc.collect()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        songs = [
+            UsdbSong.from_db_row(SongId(row[0]), row) for row in db.get_usdb_songs(ids)
+        ]
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+    assert all(song.sync_meta for song in songs)
+    print(f"{used / 1024**2:.1f} MiB for {len(songs)} songs")
+    print(f"{used / len(songs):.0f} bytes per song")
+
+
+if __name__ == "__main__":
+    main()
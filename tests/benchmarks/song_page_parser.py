@@ -0,0 +1,40 @@
+"""Benchmark parsing USDB song detail pages with BeautifulSoup and lxml."""
+
+import functools
+import html
+import timeit
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from usdb_syncer import SongId
+from usdb_syncer.usdb_scraper import _parse_song_page, _parse_song_page_lxml
+from usdb_syncer.utils import normalize
+
+RESOURCE_DIR = Path(__file__).parent.parent.joinpath(
+    "resources", "html", "usdb-animux-de"
+)
+SONG_ID = SongId(1)
+
+
+def _parse_with_soup(page: str) -> None:
+    _parse_song_page(BeautifulSoup(page, "lxml"), SONG_ID)
+
+
+def _parse_with_lxml(page: str) -> None:
+    _parse_song_page_lxml(page, SONG_ID)
+
+
+def main() -> None:
+    for path in sorted(RESOURCE_DIR.glob("song_page_*.htm")):
+        page = normalize(html.unescape(path.read_text(encoding="utf8")))
+        print(path.name)
+        for name, parse in (("bs4", _parse_with_soup), ("lxml", _parse_with_lxml)):
+            timer = timeit.Timer(functools.partial(parse, page))
+            number, _ = timer.autorange()
+            per_page = min(timer.repeat(repeat=5, number=number)) / number
+            print(f"  {name}: {per_page * 1000:.3f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Benchmark loading songs with their sync metas and resources from the database."""
+
+import timeit
+
+from tests.benchmarks.song_memory import synthetic_catalogue
+from usdb_syncer import SongId, db
+from usdb_syncer.usdb_scraper import N_USDB_SONGS_APPROX
+from usdb_syncer.usdb_song import UsdbSong
+
+
+def main() -> None:
+    with db.managed_connection(":memory:"):
+        UsdbSong.upsert_many(synthetic_catalogue(N_USDB_SONGS_APPROX), cache=False)
+        ids = [SongId(song_id) for song_id in range(1, N_USDB_SONGS_APPROX + 1)]
+        stmt = f"{db.Sql.SELECT_USDB_SONG.text()} WHERE usdb_song.song_id = ?"
+        print("Query plan of a single song lookup:")
+        for row in db._DbState.connection().execute(f"EXPLAIN QUERY PLAN {stmt}", (1,)):
+            print(f"  {row[3]}")
+        single = min(
+            timeit.repeat(lambda: [db.get_usdb_song(i) for i in ids], number=1)
+        )
+        print(f"{single / len(ids) * 1e6:.1f} µs per single song lookup")
+        bulk = min(timeit.repeat(lambda: db.get_usdb_songs(ids), number=1))
+        print(f"{bulk * 1000:.0f} ms to load all {len(ids)} songs at once")
+        search = db.SearchBuilder(order=db.SongOrder.AUDIO)
+        ordered = min(
+            timeit.repeat(lambda: list(db.search_usdb_songs(search)), number=1)
+        )
+        print(f"{ordered * 1000:.0f} ms to search all songs ordered by audio")
+
+
+if __name__ == "__main__":
+    main()
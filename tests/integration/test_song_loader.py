@@ -2,7 +2,9 @@
 
 import copy
 import tempfile
+import threading
 import unittest
+from concurrent.futures import wait
 from pathlib import Path
 from typing import Any
 from unittest import mock
@@ -13,13 +15,21 @@ from tests.conftest import (
     example_notes_str,
     example_usdb_song,
 )
-from usdb_syncer import download_options, utils
+from usdb_syncer import SongId, download_options, errors, usdb_async_client, utils
 from usdb_syncer.db import DownloadStatus, JobStatus, ResourceKind
 from usdb_syncer.meta_tags import MetaTags
 from usdb_syncer.path_template import PathTemplate
 from usdb_syncer.resource_dl import ImageKind, ResourceDLResult
-from usdb_syncer.song_loader import _SongLoader
+from usdb_syncer.song_loader import (
+    DownloadManager,
+    DownloadPriority,
+    Job,
+    _SongLoader,
+    _UsdbDataPrefetcher,
+)
 from usdb_syncer.sync_meta import MTIME_TOLERANCE_SECS, Resource, ResourceFile
+from usdb_syncer.usdb_scraper import CommentContents
+from usdb_syncer.usdb_song import UsdbSong
 
 
 def _download_and_process_image(
@@ -39,14 +49,24 @@ def _download_and_process_image(
 
 
 def _download_audio(
-    resource: Any, options: Any, browser: Any, path_stem: Path, logger: Any
+    resource: Any,
+    options: Any,
+    browser: Any,
+    path_stem: Path,
+    logger: Any,
+    token: Any = None,
 ) -> ResourceDLResult:
     path_stem.with_suffix(".mp3").touch()
     return ResourceDLResult[str](content="mp3")
 
 
 def _download_video(
-    resource: Any, options: Any, browser: Any, path_stem: Path, logger: Any
+    resource: Any,
+    options: Any,
+    browser: Any,
+    path_stem: Path,
+    logger: Any,
+    token: Any = None,
 ) -> ResourceDLResult:
     path_stem.with_suffix(".mp4").touch()
     return ResourceDLResult[str](content="mp4")
@@ -77,6 +97,8 @@ def _options(
 
 _db = mock.MagicMock()
 _db.ResourceKind = ResourceKind
+_db.download_checkpoints.return_value = {}
+_db.audio_only_verdicts.return_value = {}
 
 
 @mock.patch("usdb_syncer.song_loader.db", _db)
@@ -91,6 +113,14 @@ _db.ResourceKind = ResourceKind
 class SongLoaderTestCase(unittest.TestCase):
     """Tests for the song loader."""
 
+    def setUp(self) -> None:
+        for attr in ("download_staging", "media_store"):
+            cache_dir = tempfile.TemporaryDirectory()
+            self.addCleanup(cache_dir.cleanup)
+            patcher = mock.patch.object(utils.AppPaths, attr, Path(cache_dir.name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
     @mock.patch("usdb_syncer.usdb_scraper.get_notes")
     def test_download_new_song(
@@ -223,6 +253,330 @@ class SongLoaderTestCase(unittest.TestCase):
             assert loader.song.status == DownloadStatus.SYNCHRONIZED
             assert utils.get_mtime(mp3_path) > song.sync_meta.audio.file.mtime
 
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_download_uses_prefetched_usdb_data(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, _audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(example_meta_tags())
+        details_mock.return_value = details_from_song(song)
+
+        with tempfile.TemporaryDirectory() as song_dir_str:
+            options = _options(Path(song_dir_str), ":artist:/:title:/:id:")
+            loader = _SongLoader(song, options)
+            loader.prefetch_usdb_data()
+            assert loader.usdb_data
+            loader.run()
+
+            details_mock.assert_called_once()
+            notes_mock.assert_called_once()
+            assert loader.song.status == DownloadStatus.SYNCHRONIZED
+
+    @mock.patch("usdb_syncer.usdb_async_client.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_async_client.get_notes")
+    def test_async_prefetch_queues_download(
+        self, notes_mock: mock.AsyncMock, details_mock: mock.AsyncMock, _: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(example_meta_tags())
+        details_mock.return_value = details_from_song(song)
+
+        with (
+            tempfile.TemporaryDirectory() as song_dir_str,
+            mock.patch.object(usdb_async_client._ClientOptions, "enabled", True),
+            mock.patch.object(DownloadManager, "_start_download") as start_mock,
+        ):
+            options = _options(Path(song_dir_str), ":artist:/:title:/:id:")
+            loader = _SongLoader(song, options)
+            _UsdbDataPrefetcher(loader).run()
+            with DownloadManager._lock:
+                futures = list(DownloadManager._async_prefetches)
+            wait(futures, timeout=5)
+
+            start_mock.assert_called_once_with(loader)
+            assert loader.usdb_data
+            assert loader.usdb_data[0].song_id == song.song_id
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_download_retries_failed_prefetch(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, _audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(example_meta_tags())
+        details_mock.side_effect = [ConnectionError, details_from_song(song)]
+
+        with tempfile.TemporaryDirectory() as song_dir_str:
+            options = _options(Path(song_dir_str), ":artist:/:title:/:id:")
+            loader = _SongLoader(song, options)
+            loader.prefetch_usdb_data()
+            assert loader.usdb_data is None
+            loader.run()
+
+            assert details_mock.call_count == 2
+            assert loader.song.status == DownloadStatus.SYNCHRONIZED
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_download_audio_and_video_concurrently(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(example_meta_tags())
+        details_mock.return_value = details_from_song(song)
+        # breaks unless both downloads are in progress at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def download_audio(*args: Any) -> ResourceDLResult:
+            barrier.wait()
+            return _download_audio(*args)
+
+        def download_video(*args: Any) -> ResourceDLResult:
+            barrier.wait()
+            return _download_video(*args)
+
+        audio_mock.side_effect = download_audio
+        with (
+            tempfile.TemporaryDirectory() as song_dir_str,
+            mock.patch("usdb_syncer.resource_dl.download_video", download_video),
+        ):
+            options = _options(
+                Path(song_dir_str), ":artist:/:title:/:id:", audio=True, video=True
+            )
+            loader = _SongLoader(song, options)
+            loader.run()
+
+            assert loader.song.status == DownloadStatus.SYNCHRONIZED
+            assert loader.song.audio_path()
+            assert loader.song.video_path()
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_download_resumes_after_quitting(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(example_meta_tags())
+        details_mock.return_value = details_from_song(song)
+        checkpoints: dict[str, Any] = {}
+        audio_checkpoint_saved = threading.Event()
+
+        def upsert_checkpoint(
+            _song_id: Any, job: str, _fingerprint: Any, status: Any, files: Any
+        ) -> None:
+            checkpoints[job] = (status, files)
+            audio_checkpoint_saved.set()
+
+        def quit_during_video_download(*_args: Any) -> ResourceDLResult:
+            assert audio_checkpoint_saved.wait(5)
+            loader.token.abort()
+            raise errors.AbortError
+
+        with tempfile.TemporaryDirectory() as song_dir_str:
+            options = _options(
+                Path(song_dir_str), ":artist:/:title:/:id:", audio=True, video=True
+            )
+            loader = _SongLoader(song, options)
+            with (
+                mock.patch.object(
+                    _db, "upsert_download_checkpoint", side_effect=upsert_checkpoint
+                ),
+                mock.patch(
+                    "usdb_syncer.resource_dl.download_video", quit_during_video_download
+                ),
+                mock.patch.object(DownloadManager, "_quitting", True),
+            ):
+                loader.run()
+            assert loader.song.status is not DownloadStatus.SYNCHRONIZED
+            assert list(checkpoints) == ["AUDIO_DOWNLOAD"]
+
+            loader = _SongLoader(song, options)
+            with mock.patch.object(
+                _db, "download_checkpoints", return_value=checkpoints
+            ):
+                loader.run()
+
+            audio_mock.assert_called_once()
+            assert loader.song.status is DownloadStatus.SYNCHRONIZED
+            assert loader.song.audio_path()
+            assert loader.song.video_path()
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_paused_download_parks_after_running_jobs(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(MetaTags(audio="audio.com"))
+        details_mock.return_value = details_from_song(song)
+        checkpoints: dict[str, Any] = {}
+
+        def upsert_checkpoint(
+            _song_id: Any, job: str, _fingerprint: Any, status: Any, files: Any
+        ) -> None:
+            checkpoints[job] = (status, files)
+
+        def pause_during_download(*args: Any) -> ResourceDLResult:
+            loader.token.set_paused(True)
+            return _download_audio(*args)
+
+        audio_mock.side_effect = pause_during_download
+        self.addCleanup(DownloadManager._parked.clear)
+        with tempfile.TemporaryDirectory() as song_dir_str:
+            options = _options(Path(song_dir_str), ":artist:/:id:", audio=True)
+            loader = _SongLoader(song, options)
+            with mock.patch.object(
+                _db, "upsert_download_checkpoint", side_effect=upsert_checkpoint
+            ):
+                loader.run()
+            assert DownloadManager._parked[song.song_id] is loader
+            paused_status = loader.song.status
+            assert paused_status is DownloadStatus.PENDING
+            assert list(checkpoints) == ["AUDIO_DOWNLOAD"]
+
+            loader.token.set_paused(False)
+            with mock.patch.object(
+                _db, "download_checkpoints", return_value=checkpoints
+            ):
+                loader.run()
+
+            audio_mock.assert_called_once()
+            assert loader.song.status is DownloadStatus.SYNCHRONIZED
+            assert loader.song.audio_path()
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_jobs_requiring_each_other_fail(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, _audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(example_meta_tags())
+        details_mock.return_value = details_from_song(song)
+        requires = Job.requires
+
+        def cyclic_requires(job: Job, ctx: Any) -> tuple[Job, ...]:
+            if job is Job.WRITE_AUDIO_TAGS:
+                return (Job.WRITE_VIDEO_TAGS,)
+            if job is Job.WRITE_VIDEO_TAGS:
+                return (Job.WRITE_AUDIO_TAGS,)
+            return requires(job, ctx)
+
+        with (
+            tempfile.TemporaryDirectory() as song_dir_str,
+            mock.patch.object(Job, "requires", cyclic_requires),
+        ):
+            options = _options(Path(song_dir_str), ":artist:/:title:/:id:")
+            loader = _SongLoader(song, options)
+            loader.run()
+
+            assert loader.song.status == DownloadStatus.SYNCHRONIZED
+            assert loader.song.sync_meta
+            assert loader.song.sync_meta.txt
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_download_reuses_media_of_other_song(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, audio_mock: mock.Mock
+    ) -> None:
+        notes_mock.return_value = example_notes_str(MetaTags(audio="audio.com"))
+        with tempfile.TemporaryDirectory() as song_dir_str:
+            options = _options(Path(song_dir_str), ":artist:/:id:", audio=True)
+            for song_id in (1, 2):
+                song = example_usdb_song()
+                song.song_id = SongId(song_id)
+                song.sync_meta = None
+                details_mock.return_value = details_from_song(song)
+                loader = _SongLoader(song, options)
+                loader.run()
+
+                assert loader.song.status is DownloadStatus.SYNCHRONIZED
+                assert (audio := loader.song.audio_path())
+                assert audio.stem == str(song.song_id)
+
+        audio_mock.assert_called_once()
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    def test_video_skips_audio_stream_downloaded_for_audio(
+        self, notes_mock: mock.Mock, details_mock: mock.Mock, _audio_mock: mock.Mock
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(MetaTags(video="video.com"))
+        details_mock.return_value = details_from_song(song)
+
+        for audio in (True, False):
+            with (
+                self.subTest(audio=audio),
+                tempfile.TemporaryDirectory() as song_dir_str,
+                mock.patch(
+                    "usdb_syncer.resource_dl.download_video",
+                    side_effect=_download_video,
+                ) as video_mock,
+            ):
+                options = _options(
+                    Path(song_dir_str), ":artist:/:id:", audio=audio, video=True
+                )
+                _SongLoader(song, options).run()
+
+                assert video_mock.call_args.args[1].video_only is audio
+
+    @mock.patch("usdb_syncer.usdb_scraper.get_usdb_details")
+    @mock.patch("usdb_syncer.usdb_scraper.get_notes")
+    @mock.patch("usdb_syncer.resource_dl.fallback_resource_is_audio_only")
+    def test_audio_only_verdicts_are_cached(
+        self,
+        detect_mock: mock.Mock,
+        notes_mock: mock.Mock,
+        details_mock: mock.Mock,
+        _audio_mock: mock.Mock,
+    ) -> None:
+        song = example_usdb_song()
+        song.sync_meta = None
+        notes_mock.return_value = example_notes_str(MetaTags(video="dead"))
+        details = details_from_song(song)
+        details.comments = [
+            mock.Mock(
+                contents=CommentContents(text="", youtube_ids=["known", "new"], urls=[])
+            )
+        ]
+        details_mock.return_value = details
+        detect_mock.return_value = False
+
+        def download_video(resource: str, *args: Any) -> ResourceDLResult:
+            if resource == "dead":
+                return ResourceDLResult[str]()
+            return _download_video(resource, *args)
+
+        with (
+            tempfile.TemporaryDirectory() as song_dir_str,
+            mock.patch(
+                "usdb_syncer.resource_dl.download_video", side_effect=download_video
+            ),
+            mock.patch.object(
+                _db, "audio_only_verdicts", return_value={"known": False}
+            ),
+            mock.patch.object(_db, "upsert_audio_only_verdicts") as upsert_mock,
+        ):
+            options = _options(Path(song_dir_str), ":artist:/:id:", video=True)
+            loader = _SongLoader(song, options)
+            loader.run()
+
+        assert loader.song.sync_meta
+        assert loader.song.sync_meta.video
+        assert loader.song.sync_meta.video.status is JobStatus.FALLBACK
+        # the first fallback was already known to be a video
+        detect_mock.assert_not_called()
+        upsert_mock.assert_called_once_with({"known": False})
+
 
 def _mock_resource(path: Path, resource: str | None = None) -> Resource:
     path.parent.mkdir(exist_ok=True, parents=True)
@@ -231,3 +585,49 @@ def _mock_resource(path: Path, resource: str | None = None) -> Resource:
         JobStatus.SUCCESS,
         ResourceFile.new(path, resource or f"https://example.com/{path.name}"),
     )
+
+
+def test_queue_priority_orders_by_origin_then_cost() -> None:
+    options = _options(Path(), ":artist:/:id:")
+    new_song = example_usdb_song()
+    new_song.sync_meta = None
+    existing_song = example_usdb_song()
+    assert existing_song.sync_meta
+
+    def queue_priority(song: UsdbSong, priority: DownloadPriority) -> int:
+        loader = _SongLoader(song, options)
+        loader.priority = priority
+        return loader.queue_priority()
+
+    assert (
+        queue_priority(new_song, DownloadPriority.AUTO_UPDATE)
+        < queue_priority(existing_song, DownloadPriority.AUTO_UPDATE)
+        < queue_priority(new_song, DownloadPriority.SUBSCRIBED_SEARCH)
+        < queue_priority(new_song, DownloadPriority.INTERACTIVE)
+    )
+
+
+def test_promotion_during_prefetch_is_kept() -> None:
+    song = example_usdb_song()
+    loader = _SongLoader(song, _options(Path(), ":artist:/:id:"))
+    loader.priority = DownloadPriority.AUTO_UPDATE
+    prefetch_pool = mock.Mock()
+    # the prefetcher is already running
+    prefetch_pool.tryTake.return_value = False
+    pool = mock.Mock()
+
+    with (
+        mock.patch.dict(
+            DownloadManager._prefetchers, {song.song_id: _UsdbDataPrefetcher(loader)}
+        ),
+        mock.patch.object(
+            DownloadManager, "_prefetch_threadpool", lambda: prefetch_pool
+        ),
+        mock.patch.object(DownloadManager, "_threadpool", lambda: pool),
+    ):
+        assert DownloadManager._promote(loader, DownloadPriority.INTERACTIVE)
+        DownloadManager._start_download(loader)
+        assert song.song_id not in DownloadManager._prefetchers
+
+    assert loader.priority is DownloadPriority.INTERACTIVE
+    pool.start.assert_called_once_with(loader, loader.queue_priority())
@@ -0,0 +1,53 @@
+"""Tests for the cheap tiers of detecting audio-only resources."""
+
+from typing import Any
+
+import pytest
+
+from usdb_syncer.resource_dl import (
+    audio_only_from_metadata,
+    keyframe_stream,
+    keyframes_are_static,
+)
+
+VIDEO_FORMAT = {"vcodec": "avc1", "acodec": "none", "height": 720}
+AUDIO_FORMAT = {"vcodec": "none", "acodec": "opus"}
+
+
+@pytest.mark.parametrize(
+    ("info", "expected"),
+    [
+        ({"formats": [AUDIO_FORMAT]}, True),
+        ({"vcodec": "none"}, True),
+        (
+            {
+                "formats": [VIDEO_FORMAT, AUDIO_FORMAT],
+                "description": "Provided to YouTube by X\n\nAuto-generated by YouTube.",
+            },
+            False,
+        ),
+        ({"formats": [VIDEO_FORMAT, AUDIO_FORMAT], "description": "Video"}, False),
+    ],
+)
+def test_audio_only_from_metadata(info: dict[str, Any], expected: bool) -> None:
+    assert audio_only_from_metadata(info) is expected
+
+
+def test_keyframes_are_static() -> None:
+    still = bytes(range(256))
+    noisy = bytes(min(255, value + 2) for value in still)
+    other = bytes(reversed(still))
+
+    assert keyframes_are_static([still, noisy, still])
+    assert not keyframes_are_static([still, noisy, other])
+
+
+def test_keyframe_stream_of_unprocessed_formats() -> None:
+    # formats extracted without processing have no "protocol" yet
+    small = {**VIDEO_FORMAT, "height": 144, "url": "https://example.com/144.mp4"}
+    large = {**VIDEO_FORMAT, "url": "https://example.com/720.mp4"}
+    hls = {**VIDEO_FORMAT, "height": 90, "url": "https://example.com/90.m3u8"}
+    audio = {**AUDIO_FORMAT, "url": "https://example.com/audio.webm"}
+
+    assert keyframe_stream({"formats": [large, hls, small, audio]}) is small
+    assert keyframe_stream({"formats": [hls, audio]}) is None
@@ -0,0 +1,49 @@
+"""Tests for the shared bandwidth budget."""
+
+import threading
+import time
+
+import pytest
+
+from usdb_syncer import errors
+from usdb_syncer.bandwidth import BURST_SECS, BandwidthBudget
+from usdb_syncer.cancellation import CancellationToken
+
+
+def test_concurrent_downloads_share_total_rate() -> None:
+    budget = BandwidthBudget(rate=10_000)
+    # use up the burst allowance
+    budget.consume(int(BURST_SECS * 10_000))
+
+    def download() -> None:
+        for _ in range(5):
+            budget.consume(200)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=download) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 3 * 5 * 200 bytes at 10 kB/s, not three times as fast
+    assert time.monotonic() - start >= 0.28
+
+
+def test_disabled_budget_does_not_wait() -> None:
+    budget = BandwidthBudget()
+    start = time.monotonic()
+    budget.consume(10**9)
+    budget.set_rate(10**9)
+    budget.consume(10**9)
+    assert time.monotonic() - start < 0.5
+
+
+def test_abort_interrupts_wait() -> None:
+    budget = BandwidthBudget(rate=1)
+    token = CancellationToken()
+    threading.Timer(0.05, token.abort).start()
+    start = time.monotonic()
+    with pytest.raises(errors.AbortError):
+        budget.consume(1000, token)
+    assert time.monotonic() - start < 5
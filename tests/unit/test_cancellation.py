@@ -0,0 +1,44 @@
+"""Tests for cancellation tokens."""
+
+import threading
+from unittest import mock
+
+import pytest
+
+from usdb_syncer import errors
+from usdb_syncer.cancellation import CancellationToken
+
+
+def test_check_blocks_while_paused() -> None:
+    token = CancellationToken()
+    token.set_paused(True)
+    checked = threading.Event()
+
+    def check() -> None:
+        token.check()
+        checked.set()
+
+    threading.Thread(target=check).start()
+    assert not checked.wait(0.1)
+    token.set_paused(False)
+    assert checked.wait(5)
+
+
+def test_abort_wakes_paused_check() -> None:
+    token = CancellationToken()
+    token.set_paused(True)
+    threading.Timer(0.1, token.abort).start()
+    with pytest.raises(errors.AbortError):
+        token.check()
+
+
+def test_on_abort_runs_callbacks_only_while_registered() -> None:
+    token = CancellationToken()
+    callback = mock.Mock()
+    with token.on_abort(callback):
+        pass
+    with token.on_abort(callback):
+        token.abort()
+    callback.assert_called_once()
+    with token.on_abort(callback):
+        assert callback.call_count == 2
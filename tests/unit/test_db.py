@@ -3,7 +3,10 @@
 from __future__ import annotations
 
 import copy
+import time
+from collections import defaultdict
 from pathlib import Path
+from typing import Any
 
 import attrs
 import pytest
@@ -123,3 +126,120 @@ def test_custom_data_order(song: UsdbSong) -> None:
         ids_desc = list(db.search_usdb_songs(search))
     assert ids_asc == [song_1.song_id, song_2.song_id, song.song_id]
     assert ids_desc == [song.song_id, song_2.song_id, song_1.song_id]
+
+
+def test_savepoint_rolls_back_inside_transaction(song: UsdbSong) -> None:
+    other = copy.copy(song)
+    other.song_id = SongId(456)
+    other.sync_meta = None
+    with db.managed_connection(":memory:"):
+        with db.transaction():
+            song.upsert()
+            with pytest.raises(ValueError), db.savepoint("test"):
+                other.upsert()
+                raise ValueError
+        assert list(db.all_song_ids()) == [song.song_id]
+
+
+def test_download_checkpoints(song: UsdbSong) -> None:
+    files: list[tuple[str | None, str | None]] = [("resource", "song.mp3")]
+    with db.managed_connection(":memory:"):
+        song.upsert()
+        db.upsert_pending_download(song.song_id, 2, False)
+        db.upsert_download_checkpoint(
+            song.song_id, "AUDIO_DOWNLOAD", "hash", JobStatus.SUCCESS, files
+        )
+        assert db.pending_downloads() == [(song.song_id, 2, False)]
+        assert db.download_checkpoints(song.song_id, "hash") == {
+            "AUDIO_DOWNLOAD": (JobStatus.SUCCESS, files)
+        }
+        assert db.download_checkpoints(song.song_id, "other hash") == {}
+
+        db.delete_pending_download(song.song_id)
+        assert db.pending_downloads() == []
+        assert db.download_checkpoints(song.song_id, "hash") == {}
+
+
+def test_tuning_applies_to_new_connections() -> None:
+    db.set_tuning(db.ConnectionTuning(cache_size_kib=1024))
+    try:
+        with db.managed_connection(":memory:"):
+            connection = db._DbState.connection()
+            assert connection.execute("PRAGMA cache_size").fetchone()[0] == -1024
+    finally:
+        db.set_tuning(db.ConnectionTuning())
+
+
+def test_audio_only_verdicts() -> None:
+    with db.managed_connection(":memory:"):
+        db.upsert_audio_only_verdicts({"a": True, "b": False})
+        db.upsert_audio_only_verdicts({"b": True})
+        assert db.audio_only_verdicts(["a", "b", "c"]) == {"a": True, "b": True}
+        assert db.audio_only_verdicts([]) == {}
+
+
+def test_audio_only_verdicts_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    with db.managed_connection(":memory:"):
+        db.upsert_audio_only_verdicts({"a": True})
+        now = time.time()
+        monkeypatch.setattr(
+            time, "time", lambda: now + db.AUDIO_ONLY_VERDICT_MAX_AGE_SECS + 1
+        )
+        assert db.audio_only_verdicts(["a"]) == {}
+
+
+def test_song_resources_follow_resource_changes(song: UsdbSong) -> None:
+    def upsert_and_load() -> SyncMeta | None:
+        song.upsert()
+        db.reset_active_sync_metas(Path("C:"))
+        row = db.get_usdb_song(song.song_id)
+        assert row
+        return UsdbSong.from_db_row(song.song_id, row).sync_meta
+
+    assert song.sync_meta and song.sync_meta.audio
+    with db.managed_connection(":memory:"):
+        song.upsert()
+        song.sync_meta.video = attrs.evolve(song.sync_meta.audio)
+        song.sync_meta.audio.status = JobStatus.FAILURE
+        assert upsert_and_load() == song.sync_meta
+
+        song.sync_meta.audio = None
+        assert upsert_and_load() == song.sync_meta
+
+        db.delete_sync_meta(song.sync_meta.sync_meta_id)
+        stmt = "SELECT count(*) FROM sync_meta_resources"
+        assert db._DbState.connection().execute(stmt).fetchone() == (0,)
+
+
+def test_search_filters_with_value_lists(song: UsdbSong) -> None:
+    other = attrs.evolve(song, song_id=SongId(song.song_id + 1), artist="Baz")
+    other.sync_meta = None
+    with db.managed_connection(":memory:"):
+        UsdbSong.upsert_many([song, other])
+        db.reset_active_sync_metas(Path("C:"))
+        assert song.sync_meta
+        db.upsert_custom_meta_data(
+            [db.CustomMetaDataParams(song.sync_meta.sync_meta_id, "key", "value")]
+        )
+
+        def search(**kwargs: Any) -> list[SongId]:
+            return list(db.search_usdb_songs(db.SearchBuilder(**kwargs)))
+
+        assert search(artists=["Foo", "Baz"], order=db.SongOrder.SONG_ID) == [
+            song.song_id,
+            other.song_id,
+        ]
+        assert search(artists=["Baz"], languages=[song.language]) == [other.song_id]
+        assert search(custom_data=defaultdict(list, {"key": ["other", "value"]})) == [
+            song.song_id
+        ]
+        db.delete_usdb_songs([other.song_id])
+        assert search(ratings=[song.rating], years=[song.year]) == [song.song_id]
+
+
+def test_connection_tuning(tmp_path: Path) -> None:
+    with db.managed_connection(tmp_path / "db.sqlite"):
+        connection = db._DbState.connection()
+        assert connection.execute("PRAGMA synchronous").fetchone() == (1,)
+        assert connection.execute("PRAGMA temp_store").fetchone() == (2,)
+        assert connection.execute("PRAGMA cache_size").fetchone() == (-16 * 1024,)
@@ -0,0 +1,80 @@
+"""Tests for the content-addressed media store."""
+
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from usdb_syncer import media_store, utils
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path: Path) -> Iterator[Path]:
+    path = tmp_path / "store"
+    with mock.patch.object(utils.AppPaths, "media_store", path):
+        yield path
+
+
+def test_add_links_downloaded_file(tmp_path: Path, store_dir: Path) -> None:
+    downloaded = tmp_path / "first.m4a"
+    downloaded.write_bytes(b"audio")
+    media_store.add("key", downloaded)
+
+    assert (store_dir / "key.m4a").stat().st_ino == downloaded.stat().st_ino
+    media_store.unshare(downloaded)
+    downloaded.write_bytes(b"tagged audio")
+    assert (store_dir / "key.m4a").read_bytes() == b"audio"
+
+
+def test_add_copies_if_linking_fails(tmp_path: Path, store_dir: Path) -> None:
+    downloaded = tmp_path / "first.m4a"
+    downloaded.write_bytes(b"audio")
+    with mock.patch("os.link", side_effect=OSError):
+        media_store.add("key", downloaded)
+
+    assert (store_dir / "key.m4a").read_bytes() == b"audio"
+    assert (store_dir / "key.m4a").stat().st_ino != downloaded.stat().st_ino
+
+
+def test_fetch_copies_stored_file(tmp_path: Path, store_dir: Path) -> None:
+    downloaded = tmp_path / "first.m4a"
+    downloaded.write_bytes(b"audio")
+    media_store.add("key", downloaded)
+    os.utime(store_dir / "key.m4a", (0, 0))
+
+    assert media_store.fetch("other", tmp_path / "second") is None
+    fetched = media_store.fetch("key", tmp_path / "second")
+
+    assert fetched == tmp_path / "second.m4a"
+    assert fetched.read_bytes() == b"audio"
+    assert fetched.stat().st_ino != downloaded.stat().st_ino
+    # fetching counts as a use for eviction
+    assert (store_dir / "key.m4a").stat().st_mtime > 0
+
+
+def test_fetch_treats_evicted_file_as_miss(tmp_path: Path, store_dir: Path) -> None:
+    downloaded = tmp_path / "first.m4a"
+    downloaded.write_bytes(b"audio")
+    media_store.add("key", downloaded)
+
+    with mock.patch("shutil.copyfile", side_effect=FileNotFoundError):
+        assert media_store.fetch("key", tmp_path / "second") is None
+
+
+def test_prune_deletes_oldest_files(tmp_path: Path, store_dir: Path) -> None:
+    for idx, name in enumerate(("oldest", "old", "new")):
+        path = tmp_path / f"{name}.mp4"
+        path.write_bytes(b"x" * 10)
+        media_store.add(name, path)
+        os.utime(store_dir / f"{name}.mp4", (idx, idx))
+    (store_dir / "partial.mp4.part").write_bytes(b"x" * 10)
+
+    media_store.prune(25)
+
+    assert sorted(path.name for path in store_dir.iterdir()) == [
+        "new.mp4",
+        "old.mp4",
+        "partial.mp4.part",
+    ]
@@ -0,0 +1,137 @@
+"""Tests for the request scheduler."""
+
+import asyncio
+import io
+from collections.abc import Iterator
+from unittest import mock
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from usdb_syncer import request_scheduler
+from usdb_syncer.request_scheduler import (
+    BURST,
+    FAILURE_THRESHOLD,
+    MAX_ATTEMPTS,
+    MAX_RATE,
+    MIN_RATE,
+    RequestScheduler,
+    ScheduledHTTPAdapter,
+)
+
+
+class FakeClock:
+    """Replacement for the time module that only advances when sleeping."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, secs: float) -> None:
+        self.sleeps.append(secs)
+        self.now += secs
+
+
+@pytest.fixture
+def clock() -> Iterator[FakeClock]:
+    fake = FakeClock()
+    with mock.patch.object(request_scheduler, "time", fake):
+        yield fake
+
+
+def test_requests_beyond_burst_are_spaced_by_rate(clock: FakeClock) -> None:
+    scheduler = RequestScheduler("test")
+    for _ in range(BURST + 2):
+        scheduler.acquire()
+    # ignore rounding errors
+    sleeps = [secs for secs in clock.sleeps if secs > 1e-9]
+    assert sleeps == pytest.approx([1 / MAX_RATE, 1 / MAX_RATE])
+
+
+def test_failures_lower_rate_and_open_circuit(clock: FakeClock) -> None:
+    scheduler = RequestScheduler("test")
+    scheduler.report_failure()
+    assert scheduler.stats().rate == MAX_RATE / 2
+    for _ in range(FAILURE_THRESHOLD - 1):
+        scheduler.report_failure()
+    assert scheduler.stats().rate == MIN_RATE
+    assert scheduler.stats().circuit_open
+
+    scheduler.acquire()
+    assert clock.sleeps == [request_scheduler.COOLDOWN_SECS]
+    # no more bursts while the circuit is half open
+    scheduler.acquire()
+    assert clock.sleeps[-1] == pytest.approx(1 / MIN_RATE)
+
+    scheduler.report_success()
+    assert not scheduler.stats().circuit_open
+    assert scheduler.stats().rate > MIN_RATE
+
+
+def _response(status_code: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO()
+    return response
+
+
+def test_adapter_retries_transient_errors(clock: FakeClock) -> None:
+    scheduler = RequestScheduler("test")
+    adapter = ScheduledHTTPAdapter(scheduler)
+    request = requests.Request("GET", "https://example.com").prepare()
+    outcomes = [requests.ConnectionError(), _response(503), _response(200)]
+    with mock.patch.object(HTTPAdapter, "send", side_effect=outcomes) as send:
+        assert adapter.send(request).status_code == 200
+    assert send.call_count == 3
+    assert len(clock.sleeps) == 2
+
+
+def test_adapter_passes_on_last_error(clock: FakeClock) -> None:
+    adapter = ScheduledHTTPAdapter(RequestScheduler("test"))
+    request = requests.Request("GET", "https://example.com").prepare()
+    with (
+        mock.patch.object(HTTPAdapter, "send", side_effect=requests.Timeout) as send,
+        pytest.raises(requests.Timeout),
+    ):
+        adapter.send(request)
+    assert send.call_count == MAX_ATTEMPTS
+
+
+def test_adapter_does_not_retry_client_errors(clock: FakeClock) -> None:
+    scheduler = RequestScheduler("test")
+    adapter = ScheduledHTTPAdapter(scheduler)
+    request = requests.Request("GET", "https://example.com").prepare()
+    with mock.patch.object(HTTPAdapter, "send", return_value=_response(404)) as send:
+        assert adapter.send(request).status_code == 404
+    assert send.call_count == 1
+    assert scheduler.stats().rate == MAX_RATE
+
+
+def test_adapter_does_not_retry_post(clock: FakeClock) -> None:
+    adapter = ScheduledHTTPAdapter(RequestScheduler("test"))
+    request = requests.Request("POST", "https://example.com").prepare()
+    with mock.patch.object(HTTPAdapter, "send", return_value=_response(503)) as send:
+        assert adapter.send(request).status_code == 503
+    assert send.call_count == 1
+    assert not clock.sleeps
+
+
+def test_send_async_retries_only_allowed_methods(clock: FakeClock) -> None:
+    scheduler = RequestScheduler("test")
+    send = mock.AsyncMock(side_effect=requests.Timeout)
+
+    with mock.patch("asyncio.sleep", mock.AsyncMock()), pytest.raises(requests.Timeout):
+        asyncio.run(scheduler.send_async(send, "post", (requests.Timeout,)))
+    assert send.await_count == 1
+
+    with mock.patch("asyncio.sleep", mock.AsyncMock()), pytest.raises(requests.Timeout):
+        asyncio.run(
+            scheduler.send_async(
+                send, "post", (requests.Timeout,), retry_methods={"POST"}
+            )
+        )
+    assert send.await_count == 1 + MAX_ATTEMPTS
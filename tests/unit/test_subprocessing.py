@@ -1,6 +1,12 @@
+import sys
+import threading
+import time
 import unittest.mock
 
-from usdb_syncer import subprocessing
+import pytest
+
+from usdb_syncer import errors, subprocessing
+from usdb_syncer.cancellation import CancellationToken
 
 subprocessing.APPLY_CLEAN_ENV = True
 
@@ -40,3 +46,14 @@ def test_unsafe_clean() -> None:
         assert subprocessing.os.environ["TEST_ENV"] == "test_value"
         assert subprocessing.os.environ["LD_LIBRARY_PATH"] == "/some/path"
         assert subprocessing.os.environ["QT_PLUGIN_PATH"] == "/some/qt/plugins"
+
+
+def test_run_clean_is_killed_on_abort() -> None:
+    token = CancellationToken()
+    threading.Timer(0.1, token.abort).start()
+    start = time.monotonic()
+    with pytest.raises(errors.AbortError):
+        subprocessing.run_clean(
+            [sys.executable, "-c", "import time; time.sleep(10)"], token
+        )
+    assert time.monotonic() - start < 5
@@ -0,0 +1,91 @@
+"""Tests for the asynchronous USDB client."""
+
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from usdb_syncer import SongId, request_scheduler, usdb_async_client
+from usdb_syncer.constants import UsdbStrings
+from usdb_syncer.request_scheduler import RequestScheduler
+from usdb_syncer.usdb_async_client import AsyncUsdbClient, get_usdb_details
+
+
+class FakeResponse:
+    """Minimal stand-in for a curl_cffi response."""
+
+    def __init__(self, content: bytes) -> None:
+        self.status_code = 200
+        self.content = content
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class FakeSession:
+    """Records on which threads and how concurrently requests are made."""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        self.threads: set[threading.Thread] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def request(self, *_args: Any, **_kwargs: Any) -> FakeResponse:
+        self.threads.add(threading.current_thread())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.05)
+        self.in_flight -= 1
+        return FakeResponse(self.content)
+
+
+def test_concurrent_details_fetches_share_one_thread(resource_dir: Path) -> None:
+    page = (
+        resource_dir / "html" / "usdb-animux-de" / "song_page_with_embedded_video.htm"
+    )
+    # the saved page was not logged in
+    session = FakeSession(
+        page.read_bytes().replace(UsdbStrings.NOT_LOGGED_IN.encode(), b"")
+    )
+
+    async def fake_session(*_args: Any, **_kwargs: Any) -> FakeSession:
+        return session
+
+    with (
+        mock.patch.object(request_scheduler, "MAX_RATE", 1e6),
+        mock.patch.object(usdb_async_client, "_session", fake_session),
+        mock.patch.object(
+            usdb_async_client, "USDB_SCHEDULER", RequestScheduler("test")
+        ),
+    ):
+        futures = [
+            AsyncUsdbClient.submit(get_usdb_details(SongId(song_id)))
+            for song_id in range(50)
+        ]
+        details = [future.result(timeout=10) for future in futures]
+
+    assert [d.song_id for d in details] == list(range(50))
+    assert details[0].artist == "Revolverheld"
+    assert len(session.threads) == 1
+    assert session.threads != {threading.current_thread()}
+    assert session.max_in_flight > 1
+
+
+def test_blocking_work_runs_off_event_loop(resource_dir: Path) -> None:
+    page = (
+        resource_dir / "html" / "usdb-animux-de" / "song_page_with_embedded_video.htm"
+    ).read_text(encoding="utf-8")
+    threads: list[str] = []
+
+    def cached_page(*_args: Any) -> str:
+        threads.append(threading.current_thread().name)
+        return page
+
+    with mock.patch.object(usdb_async_client.UsdbPageCache, "get", cached_page):
+        details = AsyncUsdbClient.run(get_usdb_details(SongId(1), usdb_mtime=1))
+
+    assert details.artist == "Revolverheld"
+    assert threads
+    assert "usdb_async_client" not in threads
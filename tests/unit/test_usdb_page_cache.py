@@ -0,0 +1,57 @@
+"""Tests for the persistent USDB page cache."""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+from usdb_syncer import SongId, usdb_page_cache
+from usdb_syncer.usdb_page_cache import UsdbPageCache, UsdbPageKind
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(usdb_page_cache.AppPaths, "usdb_page_cache", tmp_path)
+    monkeypatch.setattr(UsdbPageCache, "_index", None)
+
+
+def test_page_is_fetched_once_per_mtime() -> None:
+    fetch = mock.Mock(side_effect=["old", "new"])
+    song_id = SongId(1)
+    for _ in range(2):
+        page = UsdbPageCache.get_or_fetch(UsdbPageKind.TXT, song_id, 1, fetch)
+        assert page == "old"
+    page = UsdbPageCache.get_or_fetch(UsdbPageKind.TXT, song_id, 2, fetch)
+    assert page == "new"
+    assert fetch.call_count == 2
+    # the outdated version was dropped
+    assert UsdbPageCache.get(UsdbPageKind.TXT, song_id, 1) is None
+
+
+def test_least_recently_used_pages_are_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(usdb_page_cache, "MAX_CACHE_SIZE_BYTES", 20)
+    for song in range(3):
+        UsdbPageCache.put(UsdbPageKind.DETAILS, SongId(song), 0, "x" * 8)
+        # keep the first page hot
+        UsdbPageCache.get(UsdbPageKind.DETAILS, SongId(0), 0)
+    assert UsdbPageCache.get(UsdbPageKind.DETAILS, SongId(0), 0)
+    assert UsdbPageCache.get(UsdbPageKind.DETAILS, SongId(1), 0) is None
+    assert UsdbPageCache.get(UsdbPageKind.DETAILS, SongId(2), 0)
+
+
+def test_details_pages_expire(tmp_path: Path) -> None:
+    for kind in UsdbPageKind:
+        UsdbPageCache.put(kind, SongId(1), 0, "page")
+    old = time.time() - usdb_page_cache.DETAILS_MAX_AGE_SECS - 60
+    for path in tmp_path.iterdir():
+        os.utime(path, (old, old))
+
+    assert UsdbPageCache.get(UsdbPageKind.DETAILS, SongId(1), 0) is None
+    assert UsdbPageCache.get(UsdbPageKind.TXT, SongId(1), 0) == "page"
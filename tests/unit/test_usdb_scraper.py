@@ -1,16 +1,33 @@
 """Tests for functions from the usdb_scraper module."""
 
+import html as html_module
+import re
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Any
+from unittest import mock
 
+import attrs
+import pytest
 from bs4 import BeautifulSoup
 
-from usdb_syncer import SongId
+from tests.conftest import example_usdb_song
+from usdb_syncer import SongId, db, utils
+from usdb_syncer.constants import Usdb
 from usdb_syncer.usdb_scraper import (
+    SessionManager,
+    SongDetails,
+    _get_songs_from_usdb,
     _parse_song_page,
+    _parse_song_page_lxml,
     _parse_song_txt_from_txt_page,
     _parse_songs_from_songlist,
+    get_updated_songs_from_usdb,
 )
+from usdb_syncer.usdb_song import UsdbSong
+from usdb_syncer.utils import normalize
 
 
 def get_soup(resource_dir: Path, resource: str) -> BeautifulSoup:
@@ -93,6 +110,69 @@ def test__parse_song_page_without_comments_or_cover(resource_dir: Path) -> None:
     assert len(details.comments) == 0
 
 
+SONG_PAGES = (
+    "song_page_with_embedded_video.htm",
+    "song_page_with_unembedded_video.htm",
+    "song_page_without_comments_or_cover.htm",
+)
+
+
+def _enrich_song_page(html: str) -> str:
+    """Add elements to a song page that the fixtures lack."""
+    editors = (
+        '<tr class="list_tr2"><td>Song edited by:</td>'
+        '<td><a href="?link=profil&amp;id=1">alice</a></td></tr>'
+        '<tr class="list_tr1"><td><a href="?link=profil&amp;id=2">bob</a></td></tr>'
+    )
+    views = '<tr class="list_tr2"><td>Views</td>'
+    html = html.replace(views, editors + views, 1)
+    html = re.sub(
+        r"<td>kein sample vorhanden!</td>",
+        '<td><audio><source src="https://example.com/sample.m4a"></audio></td>',
+        html,
+        count=1,
+    )
+    html = re.sub(r"star2?\.png", "half_star.png", html, count=1)
+    comment = (
+        '<tr class="list_tr2"><td>[del] [edit] 01.01.24 - 12:00 | <a>carol</a></td>'
+        '</tr><tr class="list_tr1"><td>Hi <img src="x.png" title=";-)"> see '
+        '<a href="https://vimeo.com/123">here</a> and https://youtu.be/abcdefghijk'
+        '<script src="https://dailymotion.com/player.js" data-video="x8abc">'
+        "var ignored = 1;</script>"
+        '<iframe src="https://www.youtube.com/embed/ABCDEFGHIJK"></iframe>'
+        "</td></tr>"
+    )
+    return html.replace('<tr class="list_tr1"><td></td></tr>', comment, 1)
+
+
+def _comparable(details: SongDetails) -> tuple[SongDetails, list[tuple]]:
+    comments = [(c.date_time, c.author, c.contents) for c in details.comments]
+    return attrs.evolve(details, comments=[]), comments
+
+
+@pytest.mark.parametrize("resource", SONG_PAGES)
+@pytest.mark.parametrize("preprocess", ("raw", "unescaped", "enriched"))
+def test_lxml_song_page_parser_matches_soup_parser(
+    resource_dir: Path, resource: str, preprocess: str
+) -> None:
+    html = (resource_dir / "html" / "usdb-animux-de" / resource).read_text(
+        encoding="utf8"
+    )
+    if preprocess != "raw":
+        # like pages downloaded from USDB
+        html = normalize(html_module.unescape(html))
+    if preprocess == "enriched":
+        html = _enrich_song_page(html)
+    song_id = SongId(1)
+    expected = _parse_song_page(BeautifulSoup(html, "lxml"), song_id)
+    assert _comparable(_parse_song_page_lxml(html, song_id)) == _comparable(expected)
+    if preprocess == "enriched":
+        assert expected.editors == ["alice", "bob"]
+        if resource != "song_page_with_unembedded_video.htm":
+            assert expected.audio_sample == "https://example.com/sample.m4a"
+        assert expected.comments[0].contents.text.startswith("Hi ;-) see here")
+
+
 def test_parse_song_list(resource_dir: Path) -> None:
     html = (resource_dir / "html" / "usdb-animux-de" / "song_list.htm").read_text(
         encoding="utf8"
@@ -150,3 +230,132 @@ def test_parse_song_list(resource_dir: Path) -> None:
         songs[2].sample_url
         == "https://audio-ssl.itunes.apple.com/itunes-assets/AudioPreview115/v4/07/7e/37/077e37a6-58ae-91bd-0e30-7311b7b1807c/mzaf_17099415661794586176.plus.aac.ep.m4a"
     )
+
+
+def test_parse_song_list_without_sample_and_with_markup_in_text(
+    resource_dir: Path,
+) -> None:
+    html = (resource_dir / "html" / "usdb-animux-de" / "song_list.htm").read_text(
+        encoding="utf8"
+    )
+    html = re.sub(r"<audio id=\"sample57\".*?</audio>", "", html, count=1)
+    # pages are unescaped before parsing, so text may contain markup characters
+    html = html.replace(">Albert Hammond</td>", ">Albert <3 Hammond</td>", 1)
+    songs = list(_parse_songs_from_songlist(html))
+    assert len(songs) == 3
+    assert songs[0].sample_url == ""
+    assert songs[0].artist == "Albert <3 Hammond"
+    assert songs[0].title == "It Never Rains In Southern California"
+
+
+def test_parse_song_list_with_unexpected_views(resource_dir: Path) -> None:
+    html = (resource_dir / "html" / "usdb-animux-de" / "song_list.htm").read_text(
+        encoding="utf8"
+    )
+    html = html.replace(">446</td>", ">1.446</td>", 1)
+    html = html.replace(">339</td>", "></td>", 1)
+    songs = list(_parse_songs_from_songlist(html))
+    assert [song.views for song in songs] == [1446, 0, 652]
+
+
+def _fake_song_list_page(*_args: Any, payload: dict[str, str], **_kwargs: Any) -> str:
+    # make every other page slow, so later pages finish first
+    if int(payload["start"]) % 200 == 0:
+        time.sleep(0.01)
+    return payload["start"]
+
+
+def _fake_parse_songs_from_songlist(html: str) -> list[int]:
+    start = int(html)
+    count = Usdb.MAX_SONGS_PER_PAGE if start < 1000 else 42
+    return list(range(start, start + count))
+
+
+@mock.patch(
+    "usdb_syncer.usdb_scraper._parse_songs_from_songlist",
+    _fake_parse_songs_from_songlist,
+)
+@mock.patch("usdb_syncer.usdb_scraper.get_usdb_page", _fake_song_list_page)
+def test_get_songs_from_usdb_concurrently_keeps_page_order() -> None:
+    session = mock.Mock()
+    pages: list[list[Any]] = list(
+        _get_songs_from_usdb("id", session=session, concurrency=4)
+    )
+    assert [len(p) for p in pages] == [Usdb.MAX_SONGS_PER_PAGE] * 10 + [42]
+    assert [s for page in pages for s in page] == list(range(1042))
+
+
+def _fake_catalogue(n_updated: int) -> list[UsdbSong]:
+    """Songs ordered by descending last change; the first `n_updated` are new."""
+    return [
+        attrs.evolve(
+            example_usdb_song(),
+            song_id=SongId(i + 1),
+            usdb_mtime=(1000 if i < n_updated else 500) - i,
+            sync_meta=None,
+        )
+        for i in range(500)
+    ]
+
+
+def _updated_songs(n_updated: int) -> tuple[list[UsdbSong], list[str]]:
+    catalogue = _fake_catalogue(n_updated)
+    requested: list[str] = []
+
+    def fake_page(payload: dict[str, str], start: int, _session: Any) -> list[UsdbSong]:
+        requested.append(f"{start}+{payload['limit']}")
+        return catalogue[start : start + int(payload["limit"])]
+
+    newest_known = catalogue[n_updated]
+    last_update = db.LastUsdbUpdate(newest_known.usdb_mtime, [newest_known.song_id])
+    with mock.patch("usdb_syncer.usdb_scraper._get_song_list_page", fake_page):
+        songs = get_updated_songs_from_usdb(last_update, utils.ProgressProxy(""))
+    return songs, requested
+
+
+def test_get_updated_songs_without_changes_only_probes() -> None:
+    songs, requested = _updated_songs(0)
+    assert not songs
+    assert requested == ["0+10"]
+
+
+def test_get_updated_songs_continues_after_probe() -> None:
+    songs, requested = _updated_songs(15)
+    assert [s.song_id for s in songs] == [SongId(i) for i in range(1, 16)]
+    assert requested == ["0+10", "10+100"]
+
+
+def test_session_manager_logs_in_once_for_concurrent_callers() -> None:
+    logins = 0
+
+    def login(_session: Any) -> None:
+        nonlocal logins
+        logins += 1
+        time.sleep(0.05)
+
+    with (
+        mock.patch(
+            "usdb_syncer.usdb_scraper.new_session_with_cookies",
+            side_effect=lambda _browser: mock.Mock(),
+        ),
+        mock.patch("usdb_syncer.usdb_scraper.establish_usdb_login", login),
+        mock.patch.object(SessionManager, "_session", None),
+    ):
+        sessions: list[Any] = []
+        threads = [
+            threading.Thread(target=lambda: sessions.append(SessionManager.session()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert logins == 1
+        assert all(session is sessions[0] for session in sessions)
+
+        # a stale session reported by a slow thread must not drop the new one
+        SessionManager.reset_session(expired=sessions[0])
+        current = SessionManager.session()
+        SessionManager.reset_session(expired=sessions[0])
+        assert SessionManager.session() is current
+        assert logins == 2
@@ -1,9 +1,12 @@
 """Tests for UsdbSong."""
 
+import copy
 import json
+from unittest import mock
 
 import attrs
 
+from usdb_syncer import SongId, db, events, usdb_song
 from usdb_syncer.usdb_song import UsdbSong, UsdbSongEncoder
 
 
@@ -13,3 +16,76 @@ def test_encoding_and_decoding_song_meta(song: UsdbSong) -> None:
     new_song = json.loads(song_json, object_hook=UsdbSong.from_json)
     assert isinstance(new_song, UsdbSong)
     assert attrs.asdict(song) == attrs.asdict(new_song)
+
+
+def test_get_many_loads_uncached_songs_at_once(song: UsdbSong) -> None:
+    other = copy.deepcopy(song)
+    other.song_id = SongId(song.song_id + 1)
+    with db.managed_connection(":memory:"):
+        UsdbSong.upsert_many([song, other])
+        UsdbSong.clear_cache()
+
+        songs = UsdbSong.get_many([other.song_id, SongId(999), song.song_id])
+
+        assert [s.song_id for s in songs] == [other.song_id, song.song_id]
+        with mock.patch.object(db, "get_usdb_song") as get_mock:
+            assert UsdbSong.get(song.song_id) == songs[1]
+        get_mock.assert_not_called()
+
+
+def test_cache_evicts_least_recently_used_songs(song: UsdbSong) -> None:
+    songs = [
+        attrs.evolve(song, song_id=SongId(song_id), sync_meta=None)
+        for song_id in range(1, 4)
+    ]
+    with (
+        db.managed_connection(":memory:"),
+        mock.patch.object(usdb_song, "MAX_CACHED_SONGS", 2),
+    ):
+        UsdbSong.upsert_many(songs[:2])
+        UsdbSong.clear_cache()
+        UsdbSong.get_many([songs[0].song_id, songs[1].song_id])
+        # makes the first song the most recently used one
+        UsdbSong.get(songs[0].song_id)
+        songs[2].upsert()
+
+        assert UsdbSong.cache_stats().size == 2
+        with mock.patch.object(db, "get_usdb_song", return_value=None) as get_mock:
+            assert UsdbSong.get(songs[0].song_id) is not None
+            assert UsdbSong.get(songs[1].song_id) is None
+        get_mock.assert_called_once_with(songs[1].song_id)
+        stats = UsdbSong.cache_stats()
+        assert (stats.hits, stats.misses) == (2, 3)
+
+
+def test_cache_counts_one_miss_per_db_lookup(song: UsdbSong) -> None:
+    other = attrs.evolve(song, song_id=SongId(song.song_id + 1), sync_meta=None)
+    with db.managed_connection(":memory:"):
+        UsdbSong.upsert_many([song, other])
+        UsdbSong.clear_cache()
+
+        assert UsdbSong.get_cached(song.song_id) is None
+        UsdbSong.get_many([song.song_id, other.song_id])
+        assert UsdbSong.get_cached(song.song_id)
+
+        stats = UsdbSong.cache_stats()
+        assert (stats.hits, stats.misses) == (1, 2)
+
+
+def test_cache_drops_changed_and_deleted_songs(song: UsdbSong) -> None:
+    other = attrs.evolve(song, song_id=SongId(song.song_id + 1), sync_meta=None)
+    with db.managed_connection(":memory:"):
+        UsdbSong.clear_cache()
+        UsdbSong.upsert_many([song, other])
+
+        events.SongsChanged([song.song_id]).process()
+        assert UsdbSong.cache_stats().size == 1
+        events.SongDeleted(other.song_id).process()
+        assert UsdbSong.cache_stats().size == 0
+
+
+def test_shared_values_are_interned(song: UsdbSong) -> None:
+    # built at runtime, so the string is not interned by the compiler
+    language = " Esperanto ".strip()
+    other = attrs.evolve(song, language=language)
+    assert other.language is song.language
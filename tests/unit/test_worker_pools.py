@@ -0,0 +1,29 @@
+"""Tests for the shared worker pools."""
+
+import threading
+
+from usdb_syncer.worker_pools import WorkerPool
+
+
+def _thread_name() -> str:
+    return threading.current_thread().name
+
+
+def test_run_uses_pool_thread() -> None:
+    assert WorkerPool.FFMPEG.run(_thread_name).startswith("ffmpeg_")
+
+
+def test_run_from_own_pool_does_not_deadlock() -> None:
+    def nested() -> str:
+        return WorkerPool.SEPARATION.run(_thread_name)
+
+    # the separation pool has a single worker, which is busy running `nested`
+    name = WorkerPool.SEPARATION.submit(nested).result(timeout=5)
+    assert name.startswith("separation_")
+
+
+def test_pools_are_separate() -> None:
+    def nested() -> str:
+        return WorkerPool.FFMPEG.run(_thread_name)
+
+    assert WorkerPool.NETWORK.run(nested).startswith("ffmpeg_")
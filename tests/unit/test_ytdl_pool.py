@@ -0,0 +1,108 @@
+"""Tests for reusing yt-dlp instances and extraction results."""
+
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+from unittest import mock
+
+import pytest
+
+from usdb_syncer import ytdl_pool
+
+
+class FakeYoutubeDL:
+    """Counts instances and extractions."""
+
+    instances = 0
+    extractions = 0
+
+    def __init__(self, params: dict[str, Any]) -> None:
+        self.params = params
+        self.cookiejar = mock.Mock()
+        FakeYoutubeDL.instances += 1
+
+    def extract_info(self, url: str, **_kwargs: Any) -> dict[str, Any]:
+        FakeYoutubeDL.extractions += 1
+        time.sleep(0.05)
+        return {"url": url, "formats": [{"format_id": "1"}]}
+
+    def __enter__(self) -> "FakeYoutubeDL":
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        pass
+
+    def process_ie_result(self, info: dict[str, Any], **_kwargs: Any) -> dict[str, Any]:
+        return info
+
+    def prepare_filename(self, info: dict[str, Any]) -> str:
+        return info["url"]
+
+
+@pytest.fixture(autouse=True)
+def fake_ytdl() -> Iterator[None]:
+    FakeYoutubeDL.instances = FakeYoutubeDL.extractions = 0
+    ytdl_pool.clear_cache()
+    with (
+        mock.patch("yt_dlp.YoutubeDL", FakeYoutubeDL),
+        mock.patch.object(ytdl_pool, "_local", threading.local()),
+    ):
+        yield
+    ytdl_pool.clear_cache()
+
+
+def test_concurrent_extractions_of_same_url_are_shared() -> None:
+    results: list[dict[str, Any]] = []
+
+    def extract() -> None:
+        results.append(ytdl_pool.extract_info("https://a", {}, cookies=False))
+
+    threads = [threading.Thread(target=extract) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeYoutubeDL.extractions == 1
+    # every caller gets its own copy to process
+    results[0]["formats"].clear()
+    assert results[1]["formats"] == [{"format_id": "1"}]
+
+
+def test_extractor_is_reused_per_thread_and_profile() -> None:
+    ytdl_pool.extract_info("https://a", {"format": "a"}, cookies=False)
+    ytdl_pool.extract_info("https://b", {"format": "b"}, cookies=False)
+    assert FakeYoutubeDL.instances == 1
+
+    ytdl_pool.extract_info("https://c", {"verbose": True}, cookies=False)
+    assert FakeYoutubeDL.instances == 2
+
+
+def test_expired_info_is_extracted_again() -> None:
+    ytdl_pool.extract_info("https://a", {}, cookies=False)
+    with mock.patch.object(ytdl_pool, "INFO_CACHE_SECS", 0):
+        ytdl_pool.extract_info("https://a", {}, cookies=True)
+        ytdl_pool.extract_info("https://a", {}, cookies=True)
+    ytdl_pool.extract_info("https://a", {}, cookies=False)
+    assert FakeYoutubeDL.extractions == 3
+
+
+def test_download_reuses_cookies_of_extractor() -> None:
+    options = {"format": "a", "cookiesfrombrowser": ("firefox", None, None, None)}
+    created: list[FakeYoutubeDL] = []
+
+    def new_ydl(params: dict[str, Any]) -> FakeYoutubeDL:
+        created.append(ydl := FakeYoutubeDL(params))
+        return ydl
+
+    with mock.patch("yt_dlp.YoutubeDL", new_ydl):
+        ytdl_pool.download("https://a", options, cookies=True)
+        ytdl_pool.download("https://b", options, cookies=True)
+
+    extractor, *downloaders = created
+    assert len(downloaders) == 2
+    assert "cookiesfrombrowser" in extractor.params
+    for ydl in downloaders:
+        assert "cookiesfrombrowser" not in ydl.params
+        assert ydl.cookiejar is extractor.cookiejar